@@ -0,0 +1,56 @@
+#
+# Opens, refreshes and closes 1, 10 and 100 positions with the sync
+# MKTClient (back to back) and with AsyncMKTClient (concurrently on one
+# event loop) against the local mock IG server. Run from the repo root:
+#     python -m benchmarks.async_client
+from utils_platform.amclient import AsyncMKTClient
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer
+from benchmarks.transport import TRAILING_STOP_RULES
+import asyncio
+import time
+
+
+def bench_sync(credentials, n_positions):
+    mclient = MKTClient(credentials)
+    start = time.perf_counter()
+    open_positions = [
+        mclient.make_draft_position_from_newscode("BTC").open_position(TRAILING_STOP_RULES)
+        for _ in range(n_positions)
+    ]
+    for open_position in open_positions:
+        open_position._update_position_state()
+    for open_position in open_positions:
+        open_position.close_position()
+    return time.perf_counter() - start
+
+
+async def _open(amclient):
+    draft_position = await amclient.make_draft_position_from_newscode("BTC")
+    return await draft_position.open_position(TRAILING_STOP_RULES)
+
+
+async def bench_async(credentials, n_positions):
+    amclient = await AsyncMKTClient.create(credentials)
+    start = time.perf_counter()
+    open_positions = await asyncio.gather(*[_open(amclient) for _ in range(n_positions)])
+    await amclient.update_positions(open_positions)
+    await asyncio.gather(*[
+        open_position.close_position() for open_position in open_positions
+    ])
+    elapsed = time.perf_counter() - start
+    await amclient.close()
+    return elapsed
+
+
+if __name__ == "__main__":
+    server = MockIGServer(latency=0.005).start()
+    credentials = server.credentials()
+    for n_positions in [1, 10, 100]:
+        sync_elapsed = bench_sync(credentials, n_positions)
+        async_elapsed = asyncio.run(bench_async(credentials, n_positions))
+        print(
+            f"positions={n_positions:>4} sync={sync_elapsed:7.3f}s "
+            f"async={async_elapsed:7.3f}s speedup={sync_elapsed / async_elapsed:5.1f}x"
+        )
+    server.stop()
@@ -0,0 +1,41 @@
+#
+# Trailing-stop sweep of a ~10k rule grid over synthetic post-signal
+# minute paths, single process versus process pool. Run from the repo root:
+#     python -m benchmarks.backtest [n_events]
+from utils_research.backtest import make_grid, simulate, sweep, summarize_grid, FIELDS
+from utils_platform.mock_ig import make_market
+import numpy as np
+import time
+import sys
+
+
+def synthetic_paths(n_events, n_bars=390, seed=0):
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(-2e-4, 2e-4, (n_events, 1))
+    close = 100 * np.exp(np.cumsum(rng.normal(drift, 2e-3, (n_events, n_bars)), axis=1))
+    open_ = np.concatenate([np.full((n_events, 1), 100.0), close[:, :-1]], axis=1)
+    spread = np.abs(rng.normal(0, 1e-3, (n_events, n_bars))) * close
+    paths = {
+        "open": open_, "close": close,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread
+    }
+    return paths, np.full(n_events, 100.0)
+
+
+if __name__ == "__main__":
+    n_events = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    # Stops are attached to the opening order, so stopLevel does not vary
+    grid = make_grid(np.linspace(0.005, 0.1, 100), np.linspace(0.001, 0.05, 100), [1.05])
+    dealing_rules = make_market("E", "E")["dealingRules"]
+    paths, entry = synthetic_paths(n_events)
+    n_sample = 8
+    start = time.perf_counter()
+    simulate({f: paths[f][:n_sample] for f in FIELDS}, entry[:n_sample], grid, dealing_rules)
+    per_event = (time.perf_counter() - start) / n_sample
+    print(f"grid={len(grid['stopLevel'])} rules, events={n_events}")
+    print(f"single process: {per_event * 1e3:.1f} ms/event, ~{per_event * n_events:.0f}s projected")
+    start = time.perf_counter()
+    pnl = sweep(paths, entry, grid, dealing_rules)
+    print(f"process pool:   {time.perf_counter() - start:.1f}s")
+    print(summarize_grid(pnl, grid).head())
@@ -0,0 +1,46 @@
+#
+# Shorts every target of a report naming 1, 3 and 5 companies against a
+# local mock IG server, leg by leg and as one basket with
+# MKTClient.open_basket. Run from the repo root:
+#     python -m benchmarks.basket
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer, MockIGState, make_market
+from benchmarks.transport import TRAILING_STOP_RULES
+import time
+
+TICKERS = ["NKLA", "LKNCY", "MULN", "HYZN", "CLOV"]
+
+
+def bench_sequential(mclient, newscodes):
+    start = time.perf_counter()
+    open_positions = [
+        mclient.make_draft_position_from_newscode(newscode).open_position(TRAILING_STOP_RULES)
+        for newscode in newscodes
+    ]
+    elapsed = time.perf_counter() - start
+    for open_position in open_positions:
+        open_position.close_position()
+    return elapsed
+
+
+def bench_basket(mclient, newscodes):
+    start = time.perf_counter()
+    legs = mclient.open_basket(newscodes, TRAILING_STOP_RULES, allocation_percentage=0.5)
+    elapsed = time.perf_counter() - start
+    failed = sum(leg.error is not None for leg in legs.values())
+    mclient.close_basket({
+        newscode: leg.position for newscode, leg in legs.items() if leg.error is None
+    })
+    return elapsed, failed
+
+
+if __name__ == "__main__":
+    state = MockIGState(markets=[make_market(f"E.{ticker}", ticker) for ticker in TICKERS])
+    server = MockIGServer(latency=0.02, state=state).start()
+    mclient = MKTClient(server.credentials(), session_refresh=False)
+    for n_names in [1, 3, 5]:
+        newscodes = TICKERS[:n_names]
+        sequential = bench_sequential(mclient, newscodes)
+        basket, failed = bench_basket(mclient, newscodes)
+        print(f"names={n_names} sequential={sequential:6.3f}s basket={basket:6.3f}s failed legs={failed}")
+    server.stop()
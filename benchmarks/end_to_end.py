@@ -0,0 +1,95 @@
+#
+# Signal throughput and tail latency of the whole stream.py -> MKTClient
+# path: synthetic (or recorded log_twitter/) tweets are replayed through
+# listener_a at several rates and burst patterns, and every signal opens a
+# position on the local mock IG server (with per-endpoint latency and
+# injected errors). Run from the repo root:
+#     python -m benchmarks.end_to_end [log_dir]
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer, MockIGState, make_market
+from utils_twitter.replay import load_recorded, synthetic_lines, replay
+from utils_metrics.latency import RECORDER
+from benchmarks.transport import TRAILING_STOP_RULES
+import tempfile
+import time
+import sys
+import os
+
+TICKERS = ["ACME", "BLNK", "CRWD", "DOCU", "ETSY", "FUBO", "GME", "HOOD"]
+SCENARIOS = [
+    ("constant", 5.0),
+    ("constant", 20.0),
+    ("burst", 20.0),
+    ("poisson", 20.0)
+]
+LATENCY = {"default": 0.005, "POST positions": 0.020, "PUT positions": 0.010}
+ERROR_RATE = {"GET markets": 0.01}
+STAGES = [
+    "tweet_to_receipt", "receipt_to_dispatch", "market_resolution",
+    "order_post", "stop_put", "verification", "signal_callback",
+    "receipt_to_signal_done"
+]
+
+
+def make_on_signal(mclient, results):
+    def on_signal(record):
+        if record["ticker"] is None:
+            return
+        try:
+            draft_position = mclient.make_draft_position_from_newscode(record["ticker"])
+            draft_position.open_position(TRAILING_STOP_RULES)
+            results["opened"] += 1
+        except Exception:
+            results["failed"] += 1
+            raise
+    return on_signal
+
+
+def run_scenario(mclient, tweets, pattern, rate, local_path):
+    RECORDER.reset()
+    results = {"opened": 0, "failed": 0}
+    start = time.perf_counter()
+    pipeline = replay(
+        tweets, rate=rate, pattern=pattern, burst_size=10,
+        local_path=local_path, on_signal=make_on_signal(mclient, results),
+        verbose=False
+    )
+    elapsed = time.perf_counter() - start
+    return results, elapsed, pipeline.stats()
+
+
+def report(pattern, rate, n_tweets, results, elapsed, stats):
+    dropped = sum(stage["dropped"] for stage in stats.values())
+    print(
+        f"\n{pattern:>8} @ {rate:5.1f}/s: {n_tweets} tweets in {elapsed:6.2f}s "
+        f"({n_tweets / elapsed:6.1f}/s), opened={results['opened']} "
+        f"failed={results['failed']} dropped={dropped}"
+    )
+    snapshot = RECORDER.snapshot()
+    for stage in STAGES:
+        if stage in snapshot:
+            s = snapshot[stage]
+            print(
+                f"  {stage:<24} n={s['count']:>5} p50={s['p50'] / 1e6:8.2f}ms "
+                f"p99={s['p99'] / 1e6:8.2f}ms max={s['max'] / 1e6:8.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and os.path.isdir(sys.argv[1]):
+        tweets = load_recorded(sys.argv[1])
+    else:
+        tweets = synthetic_lines(100, TICKERS)
+    markets = [make_market(f"E.{ticker}", ticker) for ticker in TICKERS]
+    server = MockIGServer(
+        latency=LATENCY, latency_jitter=0.002, error_rate=ERROR_RATE,
+        state=MockIGState(markets, available=1e9)
+    ).start()
+    mclient = MKTClient(server.credentials())
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for pattern, rate in SCENARIOS:
+            results, elapsed, stats = run_scenario(
+                mclient, tweets, pattern, rate, tmp_dir + os.sep
+            )
+            report(pattern, rate, len(tweets), results, elapsed, stats)
+    server.stop()
@@ -0,0 +1,70 @@
+#
+# Tweets per second of the regex extract_ticker and of TickerExtractor
+# over a universe of tradeable symbols. Replays log_twitter/ records when
+# available, synthetic tweets otherwise. Run from the repo root:
+#     python -m benchmarks.extraction [log_dir] [universe.csv]
+from utils_twitter.extraction import TickerExtractor, load_universe
+from utils_twitter.processing import extract_ticker
+import random
+import string
+import json
+import time
+import sys
+import os
+
+
+def synthetic_universe(n_symbols=5000, seed=0):
+    rng = random.Random(seed)
+    universe = {}
+    while len(universe) < n_symbols:
+        symbol = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(2, 5)))
+        name = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10))).title()
+        universe[symbol] = {"name": f"{name} Inc", "aliases": [f"{name} Group"]}
+    return universe
+
+
+def synthetic_corpus(universe, n_tweets=20000, seed=0):
+    rng = random.Random(seed)
+    symbols = list(universe)
+    templates = [
+        "New report: {name} is a house of cards. We are short ${symbol}",
+        "Thread on ${symbol} and ${other} accounting irregularities",
+        "{name} insiders sold before the announcement",
+        "Our latest research is out, link in bio",
+    ]
+    corpus = []
+    for _ in range(n_tweets):
+        symbol, other = rng.sample(symbols, 2)
+        corpus.append(rng.choice(templates).format(
+            name=universe[symbol]["name"], symbol=symbol, other=other
+        ))
+    return corpus
+
+
+def load_corpus(log_dir):
+    corpus = []
+    for filename in os.listdir(log_dir):
+        with open(os.path.join(log_dir, filename), "r") as src:
+            corpus.append(json.load(src)["text"])
+    return corpus
+
+
+def throughput(fn, corpus):
+    start = time.perf_counter()
+    for tweet in corpus:
+        fn(tweet)
+    return len(corpus) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    universe = load_universe(sys.argv[2]) if len(sys.argv) > 2 else synthetic_universe()
+    if len(sys.argv) > 1 and os.path.isdir(sys.argv[1]):
+        corpus = load_corpus(sys.argv[1])
+    else:
+        corpus = synthetic_corpus(universe)
+    start = time.perf_counter()
+    extractor = TickerExtractor(universe)
+    print(f"universe={len(universe)} symbols, automaton built in {time.perf_counter() - start:.2f}s")
+    print(f"corpus={len(corpus)} tweets")
+    print(f"extract_ticker (regex)   {throughput(extract_ticker, corpus):10.0f} tweets/s")
+    print(f"TickerExtractor.extract  {throughput(extractor.extract, corpus):10.0f} tweets/s")
@@ -0,0 +1,50 @@
+#
+# Executes one signal on 1, 5 and 10 accounts, each served by its own
+# local mock IG server with a different latency, account by account and
+# with AccountFleet. Run from the repo root:
+#     python -m benchmarks.fleet
+from utils_platform.fleet import AccountFleet
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer, MockIGState
+from benchmarks.transport import TRAILING_STOP_RULES
+import time
+
+
+def start_accounts(n_accounts):
+    servers = [
+        MockIGServer(latency=0.005 + 0.002 * i, state=MockIGState(accid=f"ACC{i:02d}")).start()
+        for i in range(n_accounts)
+    ]
+    return servers, [server.credentials() for server in servers]
+
+
+def bench_sequential(credentials_list):
+    mclients = [MKTClient(credentials) for credentials in credentials_list]
+    start = time.perf_counter()
+    for mclient in mclients:
+        mclient.make_draft_position_from_newscode("BTC").open_position(TRAILING_STOP_RULES)
+    return time.perf_counter() - start
+
+
+def bench_fleet(credentials_list):
+    fleet = AccountFleet(credentials_list)
+    start = time.perf_counter()
+    results = fleet.execute("BTC", trailing_stop_rules=TRAILING_STOP_RULES)
+    elapsed = time.perf_counter() - start
+    slowest = max(result.elapsed for result in results.values())
+    failed = sum(result.error is not None for result in results.values())
+    fleet.close()
+    return elapsed, slowest, failed
+
+
+if __name__ == "__main__":
+    for n_accounts in [1, 5, 10]:
+        servers, credentials_list = start_accounts(n_accounts)
+        sequential = bench_sequential(credentials_list)
+        elapsed, slowest, failed = bench_fleet(credentials_list)
+        print(
+            f"accounts={n_accounts:>3} sequential={sequential:6.3f}s fleet={elapsed:6.3f}s "
+            f"slowest account={slowest:6.3f}s failed={failed}"
+        )
+        for server in servers:
+            server.stop()
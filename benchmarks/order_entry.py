@@ -0,0 +1,39 @@
+#
+# Opens positions against a local mock IG server with the trailing stop
+# attached to the opening order and with the multi-step flow (bare order,
+# stop amendment, position lookups), and reports the open latency and
+# the number of requests per open. Run from the repo root:
+#     python -m benchmarks.order_entry
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer
+from utils_metrics.latency import RECORDER
+from benchmarks.transport import TRAILING_STOP_RULES
+import time
+
+
+def bench(mclient, attach_stops, n_orders=20):
+    elapsed, requests = [], 0
+    for _ in range(n_orders):
+        draft_position = mclient.make_draft_position_from_newscode("BTC")
+        RECORDER.reset()
+        start = time.perf_counter()
+        open_position = draft_position.open_position(TRAILING_STOP_RULES, attach_stops=attach_stops)
+        elapsed.append(time.perf_counter() - start)
+        requests += sum(
+            stats["count"] for stage, stats in RECORDER.snapshot().items()
+            if stage.startswith("http.")
+        )
+        open_position.close_position()
+    return sorted(elapsed), requests / n_orders
+
+
+if __name__ == "__main__":
+    server = MockIGServer(latency=0.02).start()
+    mclient = MKTClient(server.credentials(), session_refresh=False)
+    for label, attach_stops in [("attached stops", True), ("multi-step", False)]:
+        elapsed, requests = bench(mclient, attach_stops)
+        print(
+            f"{label:>14}: open p50={elapsed[len(elapsed) // 2]:6.3f}s "
+            f"max={elapsed[-1]:6.3f}s requests/open={requests:4.1f}"
+        )
+    server.stop()
@@ -0,0 +1,71 @@
+#
+# Time to open a position while monitoring and market refresh threads
+# saturate a tight non-trading allowance, with priorities and, for
+# comparison, with every request at the same priority. Runs against the
+# local mock IG server. Run from the repo root:
+#     python -m benchmarks.scheduler
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer
+from utils_platform.scheduler import RequestScheduler, request_priority, MONITOR, REFRESH
+from benchmarks.transport import TRAILING_STOP_RULES
+import threading
+import time
+
+LIMITS = {
+    "trading": {"per_minute": 600, "burst": 5},
+    "non_trading": {"per_minute": 600, "burst": 5}
+}
+
+
+class SamePriorityScheduler(RequestScheduler):
+    def run(self, method, url, send, params=None, version=None, priority=None):
+        return super().run(method, url, send, params, version, priority=MONITOR)
+
+
+def background(mclient, stop):
+    def monitor():
+        with request_priority(MONITOR):
+            while not stop.is_set():
+                mclient._position_book.refresh()
+
+    def refresh():
+        with request_priority(REFRESH):
+            while not stop.is_set():
+                mclient._get_markets_from_epics(["UA.D.BTC.CASH.IP"])
+
+    threads = [threading.Thread(target=target) for target in [monitor, refresh] * 4]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def bench(credentials, scheduler_class, n_orders=5):
+    scheduler = scheduler_class(LIMITS)
+    mclient = MKTClient(credentials, scheduler=scheduler, session_refresh=False)
+    stop = threading.Event()
+    threads = background(mclient, stop)
+    time.sleep(1.0)
+    elapsed = []
+    for _ in range(n_orders):
+        start = time.perf_counter()
+        draft_position = mclient.make_draft_position_from_newscode("BTC")
+        open_position = draft_position.open_position(TRAILING_STOP_RULES)
+        elapsed.append(time.perf_counter() - start)
+        open_position.close_position()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return elapsed, scheduler.stats()
+
+
+if __name__ == "__main__":
+    server = MockIGServer(latency=0.02).start()
+    for label, scheduler_class in [
+        ("prioritized", RequestScheduler), ("same priority", SamePriorityScheduler)
+    ]:
+        elapsed, stats = bench(server.credentials(), scheduler_class)
+        print(
+            f"{label:>14}: open p50={sorted(elapsed)[len(elapsed) // 2]:6.3f}s "
+            f"max={max(elapsed):6.3f}s coalesced={stats['coalesced']}"
+        )
+    server.stop()
@@ -0,0 +1,60 @@
+#
+# Market lookups and order opens against a local mock IG server that
+# holds 3% of market responses for 1s and 20% of order responses for 3s,
+# without deadlines or hedging and with the default RequestExecutor
+# (deadlines, hedged reads, orders resolved from their confirmation).
+# Run from the repo root:
+#     python -m benchmarks.tail_latency
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer
+from utils_platform.execution import RequestExecutor
+from benchmarks.transport import TRAILING_STOP_RULES
+import time
+
+EPIC = "UA.D.BTC.CASH.IP"
+
+
+def quantiles(elapsed):
+    elapsed = sorted(elapsed)
+    return (
+        f"p50={elapsed[len(elapsed) // 2]:6.3f}s "
+        f"p99={elapsed[int(len(elapsed) * 0.99)]:6.3f}s max={elapsed[-1]:6.3f}s"
+    )
+
+
+def bench_lookups(mclient, n_lookups=300):
+    elapsed = []
+    for _ in range(n_lookups):
+        start = time.perf_counter()
+        mclient._get_market_from_epic(EPIC)
+        elapsed.append(time.perf_counter() - start)
+    return elapsed
+
+
+def bench_orders(server, mclient, n_orders=20):
+    elapsed = []
+    opened_before = len(server.state.positions)
+    for _ in range(n_orders):
+        draft_position = mclient.make_draft_position_from_newscode("BTC")
+        start = time.perf_counter()
+        draft_position.open_position(TRAILING_STOP_RULES)
+        elapsed.append(time.perf_counter() - start)
+    return elapsed, len(server.state.positions) - opened_before
+
+
+if __name__ == "__main__":
+    server = MockIGServer(
+        latency=0.01, stall_rate={"markets": 0.03, "POST positions": 0.2},
+        stall={"markets": 1.0, "POST positions": 3.0}
+    ).start()
+    for label, executor in [
+        ("no deadlines", RequestExecutor(deadlines={}, hedge_quantile=None)),
+        ("executor", RequestExecutor(deadlines={"POST positions": 0.5, "default": 2.0}))
+    ]:
+        mclient = MKTClient(server.credentials(), session_refresh=False, executor=executor)
+        lookups = bench_lookups(mclient)
+        orders, opened = bench_orders(server, mclient)
+        stats = executor.stats()
+        print(f"{label:>12}: lookups {quantiles(lookups)} hedged={stats['hedged']} won={stats['hedge_wins']}")
+        print(f"{'':>12}  orders  {quantiles(orders)} opened={opened}/{len(orders)} timeouts={stats['timeouts']}")
+    server.stop()
@@ -0,0 +1,76 @@
+#
+# Per-call and end-to-end latency of MKTClient with a pooled keep-alive
+# transport versus a fresh connection per request, measured against the
+# local mock IG server. Run from the repo root:
+#     python -m benchmarks.transport
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer
+from utils_platform.transport import Transport
+from urllib.parse import urljoin
+import statistics
+import requests
+import time
+
+
+TRAILING_STOP_RULES = {
+    "trailingStop": True,
+    "trailingStopDistance": 0.023,
+    "trailingStep": 0.01,
+    "stopLevel": 1.05,
+    "limitLevel": None
+}
+
+
+class OneShotTransport(Transport):
+    """
+    Pre-pooling behaviour: every request opens a new connection.
+    """
+
+    def request(self, method, url, headers=None, params=None, payload=None, timeout=None):
+        return requests.request(
+            method=method,
+            url=urljoin(self._root_endpoint, url),
+            headers=headers,
+            params=params,
+            json=payload,
+            timeout=timeout or self._timeout
+        )
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return (
+        f"p50={statistics.median(samples) * 1e3:7.2f}ms "
+        f"p99={samples[int(0.99 * (len(samples) - 1))] * 1e3:7.2f}ms "
+        f"max={samples[-1] * 1e3:7.2f}ms"
+    )
+
+
+def bench(credentials, transport, n_calls=200, n_trades=20):
+    mclient = MKTClient(credentials, transport=transport)
+    per_call = []
+    for _ in range(n_calls):
+        start = time.perf_counter()
+        mclient._get_market_from_epic("UA.D.BTC.CASH.IP")
+        per_call.append(time.perf_counter() - start)
+    end_to_end = []
+    for _ in range(n_trades):
+        start = time.perf_counter()
+        draft_position = mclient.make_draft_position_from_newscode("BTC")
+        open_position = draft_position.open_position(TRAILING_STOP_RULES)
+        end_to_end.append(time.perf_counter() - start)
+        open_position.close_position()
+    return per_call, end_to_end
+
+
+if __name__ == "__main__":
+    server = MockIGServer(latency=0.002, handshake_delay=0.02).start()
+    for name, transport_class in [("fresh", OneShotTransport), ("pooled", Transport)]:
+        transport = transport_class(server.root_endpoint)
+        if transport_class is Transport:
+            transport.prewarm(4)
+        per_call, end_to_end = bench(server.credentials(), transport)
+        print(f"{name:>7} per-call   {_summary(per_call)}")
+        print(f"{name:>7} end-to-end {_summary(end_to_end)}")
+        transport.close()
+    server.stop()
@@ -0,0 +1,56 @@
+#
+from utils_metrics.startup import STARTUP
+STARTUP.install_from_env()
+from utils_platform.config import credentials_demo
+from utils_platform.config import watchlist
+from utils_platform.mclient import MKTClient
+from utils_platform.transport import Transport
+from utils_platform.market_index import MarketIndex
+from utils_platform.session import TokenCache
+from utils_platform.scheduler import RequestScheduler, IG_LIMITS
+from utils_platform.streaming import IGStream
+from utils_metrics.latency import RECORDER
+
+
+# STARTUP_PROFILE=1 python run_platform.py prints import and init times once ready
+if __name__ == "__main__":
+    STARTUP.mark("imports")
+
+    with STARTUP.stage("login"):
+        transport = Transport(credentials_demo["root_endpoint"], pool_size=10, prewarm=4)
+        market_index = MarketIndex("market_index.json", ttl=300)
+        mclient = MKTClient(
+            credentials_demo, transport=transport, market_index=market_index,
+            balance_interval=10, balance_max_staleness=30,
+            token_cache=TokenCache("session_tokens.json"), scheduler=RequestScheduler(IG_LIMITS)
+        )
+    with STARTUP.stage("market_index"):
+        market_index.start(mclient, watchlist)
+    with STARTUP.stage("stream"):
+        stream = IGStream(mclient).start()
+    STARTUP.ready("ready")
+    draft_position = mclient.make_draft_position_from_newscode("BTC")
+
+
+    trailing_stop_rules = {
+        "trailingStop": True,
+        "trailingStopDistance": 0.023,
+        "trailingStep": 0.01,
+        "stopLevel": 1.05,
+        "limitLevel": None
+    }
+
+    exit_rules = {
+        "stopLoss": 0.05,
+        "takeProfit": 0.5,
+        "trailingStopDistance": 0.023,
+        "trailingStep": 0.01
+    }
+
+    open_position = draft_position.open_position(trailing_stop_rules, exit_rules)
+    RECORDER.write_json("latency_platform.json")
+    # The numpy-based monitor is only needed once a position is open
+    from utils_platform.monitor import PortfolioMonitor
+    portfolio_monitor = PortfolioMonitor(mclient, interval=1.0, stream=stream)
+    portfolio_monitor.add(open_position)
+    portfolio_monitor.run()
@@ -1,17 +1,46 @@
 #
+from utils_metrics.startup import STARTUP
+STARTUP.install_from_env()
 from utils_twitter.config import API_BEARER
 from utils_twitter.config import listening_scope
 from utils_twitter.streaming import create_headers
 from utils_twitter.streaming import get_rules
 from utils_twitter.streaming import delete_all_rules
 from utils_twitter.streaming import set_rules
-from utils_twitter.streaming import handle_stream
+from utils_twitter.streaming import handle_supervised_stream
 from utils_twitter.listeners import listener_a
+from utils_twitter.dedup import SignalFilter
+from utils_twitter.tweet_log import TweetLog
+from utils_twitter.extraction import TickerExtractor, load_universe
+from utils_metrics.latency import RECORDER
+import os
 
+# Tradeable symbols (symbol, name, aliases); cashtags alone are used without it
+UNIVERSE_PATH = "universe.csv"
 
+
+# STARTUP_PROFILE=1 python stream.py prints import and init times once listening
 if __name__ == "__main__":
-    headers = create_headers(API_BEARER)
-    current_rules = get_rules(headers)
-    delete = delete_all_rules(headers, current_rules)
-    set_ = set_rules(headers, listening_scope)
-    handle_stream(headers, listener=listener_a, local_path="log_twitter/")
+    STARTUP.mark("imports")
+    RECORDER.install_signal_toggle()
+    RECORDER.start_export("latency_stream.prom", interval=10.0)
+    with STARTUP.stage("signal_filter"):
+        signal_filter = SignalFilter("signal_filter.bin", window=24 * 3600, cooldown=3600)
+        signal_filter.start(interval=10.0)
+    with STARTUP.stage("rules"):
+        headers = create_headers(API_BEARER)
+        current_rules = get_rules(headers)
+        delete = delete_all_rules(headers, current_rules)
+        set_ = set_rules(headers, listening_scope)
+    with STARTUP.stage("tweet_log"):
+        tweet_log = TweetLog("tweet_log/")
+    ticker_extractor = None
+    if os.path.exists(UNIVERSE_PATH):
+        with STARTUP.stage("ticker_extractor"):
+            ticker_extractor = TickerExtractor(load_universe(UNIVERSE_PATH))
+    handle_supervised_stream(
+        headers, listening_scope, listener=listener_a,
+        supervisor_kwargs={"stall_timeout": 30.0, "on_connect": lambda: STARTUP.ready("listening")},
+        tweet_log=tweet_log, signal_filter=signal_filter, ticker_extractor=ticker_extractor
+    )
+    signal_filter.stop()
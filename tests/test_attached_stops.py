@@ -0,0 +1,61 @@
+#
+# Opening positions with the trailing stop attached to the order, against a
+# local mock IG server. Run from the repo root:
+#     python -m pytest tests
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer
+from benchmarks.transport import TRAILING_STOP_RULES
+import unittest
+
+EPIC = "UA.D.BTC.CASH.IP"
+
+
+class TestAttachedStops(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockIGServer().start()
+        self.state = self.server.state
+        self.mclient = MKTClient(self.server.credentials(), session_refresh=False)
+        self.draft_position = self.mclient.make_draft_position_from_newscode("BTC")
+
+    def tearDown(self):
+        self.server.stop()
+
+    def statuses(self):
+        return [confirmation["dealStatus"] for confirmation in self.state.confirms.values()]
+
+    def test_stop_is_attached_to_the_order(self):
+        open_position = self.draft_position.open_position(TRAILING_STOP_RULES)
+        deal_id = open_position._position["position"]["dealId"]
+        self.assertEqual(list(self.state.positions), [deal_id])
+        self.assertIsNotNone(self.state.positions[deal_id]["position"]["trailingStopDistance"])
+        self.assertEqual(self.statuses(), ["ACCEPTED"])
+
+    def test_rejected_stop_falls_back_to_amending(self):
+        # The broker now asks for a wider stop than the cached market allows for
+        self.state.markets[EPIC]["dealingRules"]["minNormalStopOrLimitDistance"]["value"] = 50.0
+        open_position = self.draft_position.open_position(TRAILING_STOP_RULES)
+        deal_id = open_position._position["position"]["dealId"]
+        self.assertEqual(list(self.state.positions), [deal_id])
+        stop_distance = self.state.positions[deal_id]["position"]["trailingStopDistance"]
+        self.assertIsNotNone(stop_distance)
+        self.assertEqual(open_position._position["position"]["trailingStopDistance"], stop_distance)
+        # Rejected order, bare order, stop amendment
+        self.assertEqual(self.statuses(), ["REJECTED", "ACCEPTED", "ACCEPTED"])
+
+    def test_confirmation_mismatch_closes_the_position(self):
+        open_position = self.state.open_position
+
+        def widen_stop(spec):
+            deal_reference = open_position(spec)
+            self.state.confirms[deal_reference]["stopDistance"] *= 2
+            return deal_reference
+
+        self.state.open_position = widen_stop
+        with self.assertRaisesRegex(Exception, "param mismatch: stopDistance"):
+            self.draft_position.open_position(TRAILING_STOP_RULES)
+        self.assertEqual(self.state.positions, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
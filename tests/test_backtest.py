@@ -0,0 +1,44 @@
+#
+# Trailing-stop backtester on hand-made price paths. Run from the repo root:
+#     python -m pytest tests
+from utils_research.backtest import make_grid, simulate
+from utils_platform.mock_ig import make_market
+from utils_platform.rules import trailing_stop_distances
+import numpy as np
+import unittest
+
+DEALING_RULES = make_market("E", "E")["dealingRules"]
+
+
+def spike_path(level, high):
+    """
+    One bar opening and closing at level whose high reaches high.
+    """
+    return {
+        "open": np.array([[level]]), "high": np.array([[high]]),
+        "low": np.array([[level]]), "close": np.array([[level]])
+    }
+
+
+class TestSimulate(unittest.TestCase):
+
+    def setUp(self):
+        self.level = 1000.0
+        self.grid = make_grid([0.05], [0.01], [1.2])
+        self.distance, _ = trailing_stop_distances(
+            self.level, {"trailingStopDistance": 0.05, "trailingStep": 0.01}, DEALING_RULES
+        )
+
+    def test_attached_stop_starts_at_entry_plus_distance(self):
+        paths = spike_path(self.level, self.level + self.distance + 1)
+        pnl = simulate(paths, np.array([self.level]), self.grid, DEALING_RULES)
+        self.assertAlmostEqual(pnl[0, 0], -self.distance / self.level, places=6)
+
+    def test_amended_stop_starts_at_stop_level(self):
+        paths = spike_path(self.level, self.level + self.distance + 1)
+        pnl = simulate(paths, np.array([self.level]), self.grid, DEALING_RULES, attach_stops=False)
+        self.assertAlmostEqual(pnl[0, 0], 0.0, places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+#
+# Basket sizing by weights against a local mock IG server. Run from the repo
+# root:
+#     python -m pytest tests
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer, MockIGState, make_market
+import unittest
+
+MARKETS = [make_market("UA.D.BTC.CASH.IP", "BTC"), make_market("UA.D.NKLA.CASH.IP", "NKLA")]
+
+
+class TestBasketWeights(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockIGServer(state=MockIGState(MARKETS)).start()
+        self.mclient = MKTClient(self.server.credentials(), session_refresh=False)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def sizes(self, legs):
+        return {
+            newscode: leg.position._default_position_specification["size"]
+            for newscode, leg in legs.items() if leg.error is None
+        }
+
+    def test_weights_split_the_allocation(self):
+        equal = self.sizes(self.mclient.make_draft_basket(["BTC", "NKLA"], 0.2))
+        weighted = self.sizes(
+            self.mclient.make_draft_basket(["BTC", "NKLA"], 0.2, {"BTC": 3.0, "NKLA": 1.0})
+        )
+        self.assertGreater(weighted["BTC"], equal["BTC"])
+        self.assertLess(weighted["NKLA"], equal["NKLA"])
+
+    def test_zero_weights_fail_their_legs(self):
+        legs = self.mclient.make_draft_basket(["BTC", "NKLA"], 0.2, {"BTC": 0, "NKLA": 0.0})
+        for leg in legs.values():
+            self.assertIsNone(leg.position)
+            self.assertRegex(str(leg.error), "weight must be a positive number")
+
+    def test_invalid_weight_fails_only_its_leg(self):
+        legs = self.mclient.make_draft_basket(["BTC", "NKLA"], 0.2, {"BTC": -1.0})
+        self.assertIsNotNone(legs["BTC"].error)
+        self.assertIsNone(legs["NKLA"].error)
+        self.assertEqual(
+            self.sizes(legs), self.sizes(self.mclient.make_draft_basket(["NKLA"], 0.2))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+#
+# SignalFilter duplicate and cooldown checks. Run from the repo root:
+#     python -m pytest tests
+from utils_twitter.dedup import SignalFilter, fingerprint
+from utils_twitter.pipeline import StreamPipeline
+import unittest
+import json
+import os
+
+
+def make_record(tid, text, tickers, timeline="hindenburgres"):
+    return {
+        "tid": tid, "text": text, "ticker": tickers[0] if tickers else None,
+        "tickers": tickers, "timeline": timeline
+    }
+
+
+class Lines():
+    """
+    Streamed response yielding the given records as JSON lines.
+    """
+
+    def __init__(self, records):
+        self._records = records
+
+    def iter_lines(self):
+        for record in self._records:
+            yield json.dumps(record).encode()
+
+
+class TestSignalFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.signal_filter = SignalFilter(cooldown=3600)
+
+    def accept(self, record):
+        reason = self.signal_filter.check(record)
+        if reason is None:
+            self.signal_filter.confirm(record)
+        return reason
+
+    def test_duplicates_are_rejected(self):
+        self.assertIsNone(self.signal_filter.check(make_record("1", "Short $NKLA", ["NKLA"])))
+        self.assertEqual(self.signal_filter.check(make_record("1", "other", [])), "duplicate_id")
+        self.assertEqual(
+            self.signal_filter.check(make_record("2", "RT @hindenburgres: Short $NKLA!", ["NKLA"])),
+            "duplicate_text"
+        )
+
+    def test_every_basket_ticker_enters_cooldown(self):
+        basket = make_record("1", "Short $NKLA $LAZR", ["NKLA", "LAZR"])
+        self.assertIsNone(self.accept(basket))
+        record = make_record("2", "New report on $LAZR", ["LAZR"], timeline="muddywatersre")
+        self.assertEqual(self.accept(record), "cooldown")
+
+    def test_basket_keeps_tickers_out_of_cooldown(self):
+        self.assertIsNone(self.accept(make_record("1", "Short $LAZR", ["LAZR"])))
+        record = make_record("2", "Short $LAZR and $NKLA", ["LAZR", "NKLA"])
+        self.assertIsNone(self.accept(record))
+        self.assertEqual(record["tickers"], ["NKLA"])
+        self.assertEqual(record["ticker"], "NKLA")
+        self.assertEqual(record["cooldown_tickers"], ["LAZR"])
+
+    def test_links_are_part_of_the_text(self):
+        first = make_record("1", "New report: https://t.co/AAAA", [])
+        second = make_record("2", "New report: https://t.co/BBBB", [])
+        self.assertIsNone(self.accept(first))
+        self.assertIsNone(self.accept(second))
+        retweet = make_record("3", "RT @hindenburgres: New report: https://t.co/AAAA", [])
+        self.assertEqual(self.accept(retweet), "duplicate_text")
+
+    def test_empty_text_is_not_compared(self):
+        self.assertIsNone(fingerprint(" ... "))
+        self.assertIsNone(self.accept(make_record("1", "", [])))
+        self.assertIsNone(self.accept(make_record("2", "", [])))
+
+    def test_cooldown_starts_on_confirm(self):
+        self.assertIsNone(self.signal_filter.check(make_record("1", "Short $NKLA", ["NKLA"])))
+        self.assertIsNone(self.signal_filter.check(make_record("2", "$NKLA fraud", ["NKLA"])))
+        self.signal_filter.confirm(make_record("2", "$NKLA fraud", ["NKLA"]))
+        record = make_record("3", "More on $NKLA", ["NKLA"])
+        self.assertEqual(self.signal_filter.check(record), "cooldown")
+
+    def test_failed_signal_does_not_start_cooldown(self):
+        signals = []
+
+        def on_signal(record):
+            signals.append(record["tid"])
+            if record["tid"] == "1":
+                raise Exception("Error(): order failed.")
+
+        pipeline = StreamPipeline(
+            json.loads, on_signal=on_signal, verbose=False, signal_filter=self.signal_filter
+        )
+        pipeline.run(Lines([
+            make_record("1", "Short $NKLA", ["NKLA"]),
+            make_record("2", "Nikola is a fraud $NKLA", ["NKLA"]),
+            make_record("3", "More on $NKLA", ["NKLA"])
+        ]))
+        self.assertEqual(signals, ["1", "2"])
+        self.assertEqual(pipeline.errors["dispatch"], 1)
+        self.assertEqual(pipeline.filtered, 1)
+
+    def test_filter_failure_keeps_dispatching(self):
+        signals, persisted = [], []
+        pipeline = StreamPipeline(
+            json.loads, on_signal=lambda record: signals.append(record["tid"]),
+            persist=persisted.extend, verbose=False, signal_filter=self.signal_filter
+        )
+        pipeline.run(Lines([
+            {"text": "Short $NKLA", "ticker": "NKLA", "tickers": ["NKLA"]},
+            make_record("2", "Short $LAZR", ["LAZR"])
+        ]))
+        self.assertEqual(signals, ["2"])
+        self.assertEqual(pipeline.errors["dispatch"], 1)
+        self.assertEqual([record.get("filtered") for record in persisted], ["filter_error", None])
+
+    def test_no_path_persists_nothing(self):
+        self.assertIsNone(self.signal_filter.start(interval=0.01))
+        self.signal_filter.check(make_record("1", "Short $NKLA", ["NKLA"]))
+        self.signal_filter.stop()
+        self.assertFalse(os.path.exists("None.tmp"))
+        self.assertFalse(os.path.exists("None"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+#
+# Entry prices of the event study and the backtester on bar-open stamped
+# minute bars. Run from the repo root:
+#     python -m pytest tests
+from utils_research.event_study import PriceStore, event_study
+from utils_research.backtest import load_paths
+import pandas as pd
+import tempfile
+import unittest
+import os
+
+
+class TestEntryPrice(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        bars = pd.DataFrame({
+            "timestamp": pd.date_range("2026-01-05 15:00", periods=4, freq="1min", tz="UTC"),
+            "open": [10.0, 11.0, 12.0, 13.0], "high": [11.0, 12.0, 13.0, 14.0],
+            "low": [10.0, 11.0, 12.0, 13.0], "close": [11.0, 12.0, 13.0, 14.0]
+        })
+        bars.to_parquet(os.path.join(self.tmp.name, "NKLA.parquet"))
+        # Posted half-way through the 15:01 bar
+        self.events = pd.DataFrame({
+            "created_at": [pd.Timestamp("2026-01-05 15:01:30", tz="UTC")], "ticker": ["NKLA"]
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_entry_is_last_completed_bar(self):
+        result = event_study(self.events, PriceStore(self.tmp.name), ["1min"])
+        self.assertEqual(result["entry"].iloc[0], 11.0)
+        self.assertAlmostEqual(result["ar_1min"].iloc[0], 12.0 / 11.0 - 1.0)
+
+    def test_close_stamped_bars(self):
+        result = event_study(self.events, PriceStore(self.tmp.name, bar=None), ["1min"])
+        self.assertEqual(result["entry"].iloc[0], 12.0)
+
+    def test_backtest_entry_matches(self):
+        paths, entry = load_paths(self.events, self.tmp.name, n_bars=2)
+        self.assertEqual(entry[0], 11.0)
+        self.assertEqual(list(paths["open"][0]), [11.0, 12.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+#
+# Hedged reads of RequestExecutor under the RequestScheduler rate limits and
+# resolution of orders that timed out or failed. Run from the repo root:
+#     python -m pytest tests
+from utils_platform.execution import RequestExecutor
+from utils_platform.scheduler import RequestScheduler
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer
+from benchmarks.transport import TRAILING_STOP_RULES
+from collections import namedtuple
+import threading
+import unittest
+import time
+
+Response = namedtuple("Response", ["status_code"])
+
+
+class SlowOnce():
+    """
+    send(timeout) whose first call is slow and later calls are fast.
+    """
+
+    def __init__(self, delay=0.2):
+        self._delay = delay
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def __call__(self, timeout):
+        with self._lock:
+            self.calls += 1
+            first = self.calls == 1
+        time.sleep(self._delay if first else 0.0)
+        return Response(200)
+
+
+class TestHedgedReads(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = RequestExecutor(
+            deadlines={}, hedge_budget=1.0, default_hedge_delay=0.01
+        )
+
+    def tearDown(self):
+        self.executor.close()
+
+    def test_admitted_hedge_is_sent(self):
+        send = SlowOnce()
+        self.executor.send("GET", "markets/E", send, admit=lambda: True)
+        self.assertEqual(send.calls, 2)
+        self.assertEqual(self.executor.hedged, 1)
+
+    def test_throttled_hedge_is_skipped(self):
+        send = SlowOnce()
+        self.executor.send("GET", "markets/E", send, admit=lambda: False)
+        self.assertEqual(send.calls, 1)
+        self.assertEqual(self.executor.hedged, 0)
+        self.assertEqual(self.executor.hedges_throttled, 1)
+
+    def test_hedges_take_scheduler_tokens(self):
+        scheduler = RequestScheduler({"non_trading": {"per_minute": 3}}, reserve=0)
+        admit = lambda: scheduler.try_admit("GET", "markets/E")
+        for expected_calls in [2, 1]:
+            send = SlowOnce()
+            scheduler.run(
+                "GET", "markets/E", lambda: self.executor.send("GET", "markets/E", send, admit)
+            )
+            self.assertEqual(send.calls, expected_calls)
+        self.assertEqual(scheduler.admitted["non_trading.hedge"], 1)
+
+
+class TestOrderResolution(unittest.TestCase):
+
+    def start(self, **server_kwargs):
+        self.server = MockIGServer(**server_kwargs).start()
+        self.addCleanup(self.server.stop)
+        executor = RequestExecutor(
+            deadlines={"POST positions": 0.3, "default": 2.0}, confirm_timeout=0.5
+        )
+        self.mclient = MKTClient(
+            self.server.credentials(), session_refresh=False, executor=executor
+        )
+        return self.mclient.make_draft_position_from_newscode("BTC")
+
+    def test_timed_out_order_is_resolved_not_resubmitted(self):
+        draft_position = self.start(stall_rate={"POST positions": 1.0}, stall=1.0)
+        open_position = draft_position.open_position(TRAILING_STOP_RULES)
+        self.assertEqual(self.mclient._executor.timeouts, 1)
+        deal_id = open_position._position["position"]["dealId"]
+        self.assertEqual(list(self.server.state.positions), [deal_id])
+
+    def test_server_error_is_resolved(self):
+        draft_position = self.start(error_rate={"POST positions": 1.0})
+        with self.assertRaisesRegex(Exception, "unconfirmed, not resubmitted"):
+            draft_position.open_position(TRAILING_STOP_RULES)
+        self.assertEqual(self.server.state.positions, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
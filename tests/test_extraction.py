@@ -0,0 +1,50 @@
+#
+# Universe-aware ticker extraction. Run from the repo root:
+#     python -m pytest tests
+from utils_twitter.extraction import TickerExtractor
+from utils_twitter.listeners import extract_basics
+import unittest
+import json
+
+UNIVERSE = {
+    "TGT": {"name": "Target Corp", "aliases": []},
+    "NKLA": {"name": "Nikola Corp", "aliases": []}
+}
+
+
+class TestTickerExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.extractor = TickerExtractor(UNIVERSE)
+
+    def test_common_word_in_prose_is_not_a_ticker(self):
+        self.assertEqual(self.extractor.extract_tickers("Our price target is $5"), [])
+        self.assertEqual(self.extractor.extract_tickers("Target is the word of the day."), [])
+
+    def test_corroborated_common_word_is_a_ticker(self):
+        self.assertEqual(self.extractor.extract_tickers("Today we are short target"), ["TGT"])
+        self.assertEqual(self.extractor.extract_tickers("New report on Target"), ["TGT"])
+        self.assertEqual(self.extractor.extract_tickers("Target Corp misled investors"), ["TGT"])
+        self.assertEqual(self.extractor.extract_tickers("Our price target for $TGT"), ["TGT"])
+
+    def test_proper_name_is_a_ticker(self):
+        self.assertEqual(self.extractor.extract_tickers("Nikola is an ocean of lies"), ["NKLA"])
+
+    def test_offsets_survive_lowercase_expansion(self):
+        # "İ".lower() is two characters long
+        self.assertEqual(self.extractor.extract_tickers("İİİİİİİİ target"), [])
+        self.assertEqual(self.extractor.extract_tickers("İİİ, we see Target"), ["TGT"])
+        self.assertEqual(self.extractor.extract_tickers("İSTANBUL $NKLA"), ["NKLA"])
+
+    def test_listener_uses_the_extractor(self):
+        line = json.dumps({
+            "data": {"id": "1", "text": "Nikola: an ocean of lies"},
+            "matching_rules": [{"tag": "hindenburgres"}]
+        })
+        self.assertEqual(extract_basics(line)["tickers"], [])
+        record = extract_basics(line, self.extractor)
+        self.assertEqual((record["ticker"], record["tickers"]), ("NKLA", ["NKLA"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
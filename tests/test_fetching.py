@@ -0,0 +1,109 @@
+#
+# TimelineStore updates and loads with a stubbed timeline fetcher. Run from
+# the repo root:
+#     python -m pytest tests
+from utils_twitter import fetching
+from utils_twitter.fetching import TimelineStore, attributes
+from unittest import mock
+import pandas as pd
+import tempfile
+import unittest
+import os
+
+
+def make_page(timeline, ids):
+    return pd.DataFrame({
+        "created_at": pd.to_datetime([1600000000 + i for i in ids], unit="s"),
+        "full_text": [f"tweet {i}" for i in ids],
+        "id": ids,
+        "retweet_count": [0] * len(ids),
+        "favorite_count": [0] * len(ids),
+        "timeline": timeline
+    }, columns=attributes + ["timeline"])
+
+
+class FakeTimelines():
+    """
+    iter_timeline_pages stand-in serving fixed tweet ids per timeline,
+    newest page first, in pages of page_size. Raises after fail_after
+    pages if set, like an interrupted run.
+    """
+
+    def __init__(self, ids, page_size=2):
+        self.ids = ids
+        self.page_size = page_size
+        self.fail_after = None
+        self.calls = []
+
+    def __call__(self, timeline, since_id=None):
+        self.calls.append((timeline, since_id))
+        ids = [i for i in self.ids[timeline] if since_id is None or i > since_id]
+        ids.sort(reverse=True)
+        for n, start in enumerate(range(0, len(ids), self.page_size)):
+            if self.fail_after is not None and n >= self.fail_after:
+                raise Exception("Error(429): rate limited.")
+            yield make_page(timeline, ids[start:start + self.page_size])
+        yield make_page(timeline, [])
+
+
+class TestTimelineStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "timelines")
+        self.timelines = FakeTimelines({"hindenburgres": [1, 2, 3], "muddywatersre": [10]})
+        patcher = mock.patch.object(fetching, "iter_timeline_pages", self.timelines)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_update_is_incremental(self):
+        store = TimelineStore(self.path)
+        self.assertEqual(store.update("hindenburgres"), 3)
+        self.assertEqual(store.since_id("hindenburgres"), 3)
+        self.timelines.ids["hindenburgres"] += [4, 5]
+        store = TimelineStore(self.path)
+        self.assertEqual(store.update("hindenburgres"), 2)
+        self.assertEqual(store.update("hindenburgres"), 0)
+        self.assertEqual(
+            self.timelines.calls,
+            [("hindenburgres", None), ("hindenburgres", 3), ("hindenburgres", 5)]
+        )
+        self.assertEqual(sorted(store.load()["id"]), [1, 2, 3, 4, 5])
+
+    def test_partition_layout(self):
+        store = TimelineStore(self.path)
+        self.assertEqual(store.update_all(["hindenburgres", "muddywatersre"]), {
+            "hindenburgres": 3, "muddywatersre": 1
+        })
+        self.assertEqual(
+            sorted(os.listdir(self.path)),
+            ["_state.json", "timeline=hindenburgres", "timeline=muddywatersre"]
+        )
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.path, "timeline=hindenburgres"))),
+            ["part-1-1.parquet", "part-2-3.parquet"]
+        )
+        tweet_df = store.load(timelines=["muddywatersre"])
+        self.assertEqual(tweet_df["id"].tolist(), [10])
+        self.assertEqual(tweet_df["timeline"].astype(str).tolist(), ["muddywatersre"])
+        self.assertEqual(store.load(columns=["id"]).columns.tolist(), ["id"])
+
+    def test_load_drops_tweets_of_interrupted_runs(self):
+        store = TimelineStore(self.path)
+        self.timelines.fail_after = 1
+        with self.assertRaises(Exception):
+            store.update("hindenburgres")
+        self.assertIsNone(store.since_id("hindenburgres"))
+        self.timelines.fail_after = None
+        # A new tweet shifts the pages: 2 and 3 are written again
+        self.timelines.ids["hindenburgres"].append(4)
+        self.assertEqual(store.update("hindenburgres"), 4)
+        self.assertEqual(len(pd.read_parquet(self.path)), 6)
+        self.assertEqual(sorted(store.load()["id"]), [1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+#
+# Modules whose dependencies import the standard library platform module
+# must import from the repo root, where the benchmarks are run. Run from
+# the repo root:
+#     python -m pytest tests
+import subprocess
+import unittest
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_from_root(module):
+    return subprocess.run(
+        [sys.executable, "-c", f"import {module}"], cwd=ROOT, capture_output=True, text=True
+    )
+
+
+class TestImportsFromRoot(unittest.TestCase):
+
+    def assertImports(self, module):
+        result = import_from_root(module)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_async_client(self):
+        self.assertImports("benchmarks.async_client")
+
+    def test_backtest(self):
+        self.assertImports("benchmarks.backtest")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+#
+# LatencyRecorder signal toggle. Run from the repo root:
+#     python -m pytest tests
+from utils_metrics.latency import LatencyRecorder
+import subprocess
+import unittest
+import signal
+import sys
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WITHOUT_SIGUSR1 = """
+import signal
+del signal.SIGUSR1
+from utils_metrics.latency import LatencyRecorder
+print(LatencyRecorder().install_signal_toggle())
+"""
+
+
+class TestSignalToggle(unittest.TestCase):
+
+    @unittest.skipUnless(hasattr(signal, "SIGUSR1"), "no SIGUSR1 on this platform")
+    def test_sigusr1_toggles_recording(self):
+        previous = signal.getsignal(signal.SIGUSR1)
+        self.addCleanup(signal.signal, signal.SIGUSR1, previous)
+        recorder = LatencyRecorder()
+        self.assertTrue(recorder.install_signal_toggle())
+        os.kill(os.getpid(), signal.SIGUSR1)
+        self.assertFalse(recorder.enabled)
+        os.kill(os.getpid(), signal.SIGUSR1)
+        self.assertTrue(recorder.enabled)
+
+    def test_platform_without_sigusr1(self):
+        result = subprocess.run(
+            [sys.executable, "-c", WITHOUT_SIGUSR1], cwd=ROOT, capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
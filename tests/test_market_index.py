@@ -0,0 +1,82 @@
+#
+# MarketIndex expiry against a local mock IG server. Run from the repo root:
+#     python -m pytest tests
+from utils_platform.mclient import MKTClient
+from utils_platform.market_index import MarketIndex
+from utils_platform.mock_ig import MockIGServer
+import tempfile
+import unittest
+import time
+import os
+
+EPIC = "UA.D.BTC.CASH.IP"
+
+
+class TestMarketIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockIGServer().start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "market_index.json")
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def client(self, market_index):
+        return MKTClient(
+            self.server.credentials(), market_index=market_index, session_refresh=False
+        )
+
+    def resolve(self, market_index):
+        return self.client(market_index)._get_market_from_newscode("BTC")
+
+    def test_fresh_entry_is_served_from_the_index(self):
+        market_index = MarketIndex(self.path, ttl=300)
+        self.resolve(market_index)
+        self.server.state.set_price(EPIC, 90.0, 90.1)
+        self.assertEqual(self.resolve(market_index)["snapshot"]["bid"], 100.0)
+
+    def test_expired_snapshot_is_fetched_again(self):
+        market_index = MarketIndex(self.path, ttl=0)
+        self.resolve(market_index)
+        self.assertIsNone(market_index.get("BTC"))
+        self.assertEqual(market_index.epic("BTC"), EPIC)
+        self.server.state.set_price(EPIC, 90.0, 90.1)
+        self.assertEqual(self.resolve(market_index)["snapshot"]["bid"], 90.0)
+
+    def test_expired_static_details_are_not_served(self):
+        market_index = MarketIndex(self.path, ttl=300, max_age=0)
+        self.resolve(market_index)
+        self.assertIsNone(market_index.get("BTC"))
+        self.assertIsNone(market_index.epic("BTC"))
+
+    def test_refresh_renews_entries_about_to_expire(self):
+        market_index = MarketIndex(self.path, ttl=300)
+        mclient = self.client(market_index)
+        mclient._get_market_from_newscode("BTC")
+        self.server.state.set_price(EPIC, 90.0, 90.1)
+        market_index.refresh(mclient)
+        self.assertEqual(market_index.get("BTC")["snapshot"]["bid"], 100.0)
+        market_index.refresh(mclient, margin=300)
+        self.assertEqual(market_index.get("BTC")["snapshot"]["bid"], 90.0)
+
+    def test_background_refresh_keeps_entries_fresh(self):
+        market_index = MarketIndex(self.path, ttl=0.8)
+        mclient = self.client(market_index)
+        with self.assertRaises(Exception):
+            market_index.start(mclient, ["BTC"], interval=0.4)
+        market_index.start(mclient, ["BTC"])
+        self.addCleanup(market_index.stop)
+        deadline = time.monotonic() + 5.0
+        while market_index.get("BTC") is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        misses = 0
+        for _ in range(200):
+            misses += market_index.get("BTC") is None
+            time.sleep(0.01)
+        self.assertEqual(misses, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
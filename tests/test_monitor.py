@@ -0,0 +1,63 @@
+#
+# PortfolioMonitor exits against a local mock IG server. Run from the repo
+# root:
+#     python -m pytest tests
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer
+from utils_platform.monitor import PortfolioMonitor
+from benchmarks.transport import TRAILING_STOP_RULES
+import unittest
+
+
+class TestPortfolioMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockIGServer().start()
+        self.mclient = MKTClient(self.server.credentials(), session_refresh=False)
+        draft_position = self.mclient.make_draft_position_from_newscode("BTC")
+        self.open_position = draft_position.open_position(TRAILING_STOP_RULES, {"takeProfit": 0.01})
+        self.deal_id = self.open_position._position["position"]["dealId"]
+        self.monitor = PortfolioMonitor(self.mclient, interval=0.0)
+        self.monitor.add(self.open_position)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def tick(self, offer):
+        self.server.state.positions[self.deal_id]["market"]["offer"] = offer
+        self.mclient._position_book._refreshed_at = None
+        return self.monitor.tick()
+
+    def test_position_without_quote_is_kept(self):
+        self.assertEqual(self.tick(None), [])
+        self.assertEqual(len(self.monitor), 1)
+
+    def test_failed_close_is_retried(self):
+        def close_position():
+            raise Exception("Error: position failed to close.")
+
+        self.open_position.close_position = close_position
+        self.assertEqual(self.tick(50.0), [])
+        self.assertEqual(len(self.monitor), 1)
+        del self.open_position.close_position
+        self.assertEqual(self.tick(50.0), [self.open_position])
+        self.assertEqual(len(self.monitor), 0)
+        self.assertNotIn(self.deal_id, self.server.state.positions)
+
+    def test_failed_refresh_is_retried(self):
+        self.server.error_rate = {"GET positions": 1.0}
+        self.assertEqual(self.tick(50.0), [])
+        self.assertEqual(len(self.monitor), 1)
+        self.server.error_rate = 0.0
+        self.assertEqual(self.tick(50.0), [self.open_position])
+        self.assertEqual(len(self.monitor), 0)
+
+    def test_position_closed_elsewhere_is_dropped(self):
+        self.server.state.close_position({"dealId": self.deal_id})
+        self.mclient._position_book._refreshed_at = None
+        self.assertEqual(self.monitor.tick(), [])
+        self.assertEqual(len(self.monitor), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+#
+# Cashtag extraction. Run from the repo root:
+#     python -m pytest tests
+from utils_twitter.processing import extract_ticker, extract_tickers
+import unittest
+
+
+class TestCashtags(unittest.TestCase):
+
+    def test_class_and_exchange_suffixes(self):
+        self.assertEqual(
+            extract_tickers("Short $BRK.B, $RIO.L and $BRK-B"), ["BRK.B", "RIO.L", "BRK-B"]
+        )
+
+    def test_sentence_after_cashtag_is_not_a_suffix(self):
+        self.assertEqual(extract_ticker("Short $NKLA.The report is out"), "NKLA")
+        self.assertEqual(extract_ticker("Short $NKLA.Our report is out"), "NKLA")
+
+    def test_distinct_tickers(self):
+        self.assertEqual(
+            extract_ticker("$NKLA and $nkla and $LAZR", all_tickers=True), ["NKLA", "LAZR"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
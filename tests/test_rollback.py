@@ -0,0 +1,85 @@
+#
+# all_or_none rollbacks of baskets and fleets against local mock IG
+# servers. Run from the repo root:
+#     python -m pytest tests
+from utils_platform.mclient import MKTClient
+from utils_platform.fleet import AccountFleet
+from utils_platform.mock_ig import MockIGServer, MockIGState, make_market
+from benchmarks.transport import TRAILING_STOP_RULES
+import unittest
+
+MARKETS = [make_market("UA.D.BTC.CASH.IP", "BTC"), make_market("UA.D.NKLA.CASH.IP", "NKLA")]
+
+
+class TestBasketRollback(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockIGServer(state=MockIGState(MARKETS)).start()
+        self.mclient = MKTClient(self.server.credentials(), session_refresh=False)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_opened_legs_report_rollback(self):
+        legs = self.mclient.open_basket(
+            ["BTC", "NKLA", "UNKNOWN"], TRAILING_STOP_RULES, all_or_none=True
+        )
+        self.assertIsNotNone(legs["UNKNOWN"].error)
+        self.assertFalse(legs["UNKNOWN"].rolled_back)
+        for newscode in ["BTC", "NKLA"]:
+            self.assertIsNone(legs[newscode].error)
+            self.assertTrue(legs[newscode].rolled_back)
+            self.assertIsNone(legs[newscode].rollback_error)
+        self.assertEqual(self.server.state.positions, {})
+
+    def test_failed_rollback_is_reported(self):
+        state = self.server.state
+        open_position = state.open_position
+
+        def open_and_close(spec):
+            deal_reference = open_position(spec)
+            if spec["epic"] == "UA.D.NKLA.CASH.IP":
+                state.close_position({"dealId": state.confirms[deal_reference]["dealId"]})
+            return deal_reference
+
+        state.open_position = open_and_close
+        legs = self.mclient.open_basket(
+            ["BTC", "NKLA", "UNKNOWN"], TRAILING_STOP_RULES, all_or_none=True
+        )
+        self.assertTrue(legs["BTC"].rolled_back)
+        self.assertFalse(legs["NKLA"].rolled_back)
+        self.assertIsNotNone(legs["NKLA"].rollback_error)
+
+
+class TestFleetRollback(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = [
+            MockIGServer(state=MockIGState(MARKETS, accid=accid)).start()
+            for accid in ["ACC01", "ACC02"]
+        ]
+        self.fleet = AccountFleet(
+            [server.credentials() for server in self.servers], session_refresh=False
+        )
+
+    def tearDown(self):
+        self.fleet.close()
+        for server in self.servers:
+            server.stop()
+
+    def test_opened_accounts_report_rollback(self):
+        self.servers[1].error_rate = {"POST positions": 1.0}
+        self.fleet.clients["ACC02"]._executor.confirm_timeout = 0.2
+        results = self.fleet.execute(
+            newscode="NKLA", trailing_stop_rules=TRAILING_STOP_RULES, all_or_none=True
+        )
+        self.assertIsNotNone(results["ACC02"].error)
+        self.assertFalse(results["ACC02"].rolled_back)
+        self.assertIsNone(results["ACC01"].error)
+        self.assertTrue(results["ACC01"].rolled_back)
+        self.assertIsNone(results["ACC01"].rollback_error)
+        self.assertEqual(self.servers[0].state.positions, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
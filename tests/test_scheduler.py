@@ -0,0 +1,170 @@
+#
+# RequestScheduler priorities, order reserve, promotion and GET coalescing.
+# Run from the repo root:
+#     python -m pytest tests
+from utils_platform.scheduler import (
+    RequestScheduler, limit_class, ORDER, MONITOR, REFRESH
+)
+import threading
+import unittest
+import time
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+class Calls():
+    """
+    send() factory recording the order in which requests went out,
+    optionally holding them until release().
+    """
+
+    def __init__(self, hold=False):
+        self.sent = []
+        self._lock = threading.Lock()
+        self._released = threading.Event()
+        if not hold:
+            self._released.set()
+
+    def send(self, label):
+        def _send():
+            with self._lock:
+                self.sent.append(label)
+            self._released.wait()
+            return {"label": label}
+        return _send
+
+    def release(self):
+        self._released.set()
+
+
+class TestRequestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.threads = []
+        self.results = {}
+
+    def tearDown(self):
+        self.join()
+
+    def join(self):
+        for thread in self.threads:
+            thread.join(timeout=5.0)
+
+    def start(self, name, scheduler, url, send, priority):
+        def _run():
+            self.results[name] = scheduler.run("GET", url, send, priority=priority)
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def queued(self, scheduler):
+        return sum(scheduler.stats()["depth"]["non_trading"].values())
+
+    def empty_scheduler(self, reserve=0):
+        """
+        Scheduler whose bucket refills a token every 0.1s and has none
+        for the next 0.3s, so requests queue up.
+        """
+        scheduler = RequestScheduler(
+            {"non_trading": {"per_minute": 600, "burst": 1}}, reserve=reserve
+        )
+        scheduler._buckets["non_trading"].tokens = -2.0
+        return scheduler
+
+    def test_limit_classes(self):
+        self.assertIsNone(limit_class("POST", "session"))
+        self.assertEqual(limit_class("POST", "positions/otc"), "trading")
+        self.assertEqual(limit_class("GET", "positions"), "non_trading")
+        self.assertEqual(limit_class("GET", "markets/E"), "non_trading")
+
+    def test_queued_requests_are_served_by_priority(self):
+        scheduler = self.empty_scheduler()
+        calls = Calls()
+        for i, priority in enumerate([REFRESH, MONITOR, ORDER]):
+            self.start(priority, scheduler, f"markets/{priority}", calls.send(priority), priority)
+            wait_for(lambda: self.queued(scheduler) == i + 1)
+        wait_for(lambda: len(calls.sent) == 3)
+        self.assertEqual(calls.sent, [ORDER, MONITOR, REFRESH])
+        self.assertEqual(
+            scheduler.stats()["admitted"],
+            {"non_trading.order": 1, "non_trading.monitor": 1, "non_trading.refresh": 1}
+        )
+
+    def test_reserve_is_kept_for_orders(self):
+        scheduler = RequestScheduler({"non_trading": {"per_minute": 600, "burst": 3}}, reserve=2)
+        calls = Calls()
+        scheduler.run("GET", "markets/A", calls.send("monitor"), priority=MONITOR)
+        start = time.monotonic()
+        scheduler.run("GET", "markets/B", calls.send("order"), priority=ORDER)
+        self.assertLess(time.monotonic() - start, 0.05)
+        start = time.monotonic()
+        scheduler.run("GET", "markets/C", calls.send("monitor"), priority=MONITOR)
+        # Down to one token, a monitoring read waits until three are back
+        self.assertGreater(time.monotonic() - start, 0.15)
+
+    def test_joining_caller_promotes_queued_request(self):
+        scheduler = self.empty_scheduler()
+        calls = Calls()
+        self.start("refresh", scheduler, "markets/A", calls.send("A"), REFRESH)
+        wait_for(lambda: self.queued(scheduler) == 1)
+        self.start("monitor", scheduler, "markets/B", calls.send("B"), MONITOR)
+        wait_for(lambda: self.queued(scheduler) == 2)
+        self.start("order", scheduler, "markets/A", calls.send("A again"), ORDER)
+        wait_for(lambda: scheduler.coalesced == 1)
+        wait_for(lambda: len(calls.sent) == 2)
+        self.join()
+        self.assertEqual(calls.sent, ["A", "B"])
+        self.assertIs(self.results["order"], self.results["refresh"])
+
+    def test_identical_gets_are_coalesced(self):
+        scheduler = RequestScheduler()
+        calls = Calls(hold=True)
+        self.start("first", scheduler, "markets/A", calls.send("first"), MONITOR)
+        wait_for(lambda: len(calls.sent) == 1)
+        self.start("monitor", scheduler, "markets/A", calls.send("monitor"), MONITOR)
+        wait_for(lambda: scheduler.coalesced == 1)
+        # An order-path read never joins a request already on the wire
+        self.start("order", scheduler, "markets/A", calls.send("order"), ORDER)
+        wait_for(lambda: len(calls.sent) == 2)
+        self.start("other", scheduler, "markets/B", calls.send("other"), MONITOR)
+        wait_for(lambda: len(calls.sent) == 3)
+        calls.release()
+        self.join()
+        self.assertEqual(scheduler.coalesced, 1)
+        self.assertIs(self.results["monitor"], self.results["first"])
+        self.assertEqual(self.results["order"], {"label": "order"})
+
+    def test_failure_reaches_every_joined_caller(self):
+        scheduler = RequestScheduler()
+        released = threading.Event()
+        errors = []
+
+        def send():
+            released.wait()
+            raise Exception("Error(500): injected")
+
+        def _run():
+            try:
+                scheduler.run("GET", "markets/A", send, priority=MONITOR)
+            except Exception as exc:
+                errors.append(exc)
+
+        for _ in range(2):
+            thread = threading.Thread(target=_run, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        wait_for(lambda: scheduler.coalesced == 1)
+        released.set()
+        self.join()
+        self.assertEqual(len(errors), 2)
+        self.assertIs(errors[0], errors[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
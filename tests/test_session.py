@@ -0,0 +1,119 @@
+#
+# Session tokens: the on-disk TokenCache, re-login on 401 and the background
+# refresh, against a local mock IG server. Run from the repo root:
+#     python -m pytest tests
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer
+from utils_platform.session import TokenCache, SessionTokens, SESSION_LIFETIME
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import unittest
+import stat
+import time
+import json
+import os
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "tokens.json")
+        self.cache = TokenCache(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def mode(self):
+        return stat.S_IMODE(os.stat(self.path).st_mode)
+
+    def test_file_is_owner_only(self):
+        self.cache.put("a", {"headers": {"CST": "1"}, "issued_at": 0.0})
+        self.assertEqual(self.mode(), 0o600)
+
+    def test_replace_keeps_owner_only_and_leaves_no_temporary_file(self):
+        with open(self.path, "w") as out:
+            json.dump({"a": {"headers": {"CST": "1"}, "issued_at": 0.0}}, out)
+        os.chmod(self.path, 0o644)
+        self.cache.put("b", {"headers": {"CST": "2"}, "issued_at": 1.0})
+        self.assertEqual(self.mode(), 0o600)
+        self.assertEqual(os.listdir(self.tmp.name), ["tokens.json"])
+        self.assertEqual(self.cache.get("a")["headers"], {"CST": "1"})
+        self.assertEqual(self.cache.get("b")["headers"], {"CST": "2"})
+
+    def test_evict(self):
+        self.cache.put("a", {"headers": {"CST": "1"}, "issued_at": 0.0})
+        self.cache.evict("a")
+        self.assertIsNone(self.cache.get("a"))
+
+    def test_unreadable_file_is_empty(self):
+        with open(self.path, "w") as out:
+            out.write('{"a": ')
+        self.assertIsNone(self.cache.get("a"))
+
+
+class TestSessionTokens(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = TokenCache(os.path.join(self.tmp.name, "tokens.json"))
+        self.server = MockIGServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def client(self, **kwargs):
+        return MKTClient(
+            self.server.credentials(), token_cache=self.cache, session_refresh=False, **kwargs
+        )
+
+    def test_cached_tokens_are_reused(self):
+        first = self.client()
+        second = self.client()
+        self.assertEqual(self.server.state.logins, 1)
+        self.assertEqual(second._session_tokens.headers, first._session_tokens.headers)
+        second._get_positions()
+
+    def test_expired_cached_tokens_are_replaced(self):
+        first = self.client()
+        key = first._session_tokens._key
+        entry = self.cache.get(key)
+        self.cache.put(key, {**entry, "issued_at": time.time() - SESSION_LIFETIME})
+        second = self.client()
+        self.assertEqual(self.server.state.logins, 2)
+        self.assertNotEqual(second._session_tokens.headers, entry["headers"])
+
+    def test_rejected_request_logs_in_again(self):
+        mclient = self.client()
+        self.server.state.expire_sessions()
+        self.assertEqual(mclient._get_positions(), [])
+        self.assertEqual(mclient._session_tokens.logins, 2)
+        entry = self.cache.get(mclient._session_tokens._key)
+        self.assertEqual(entry["headers"], mclient._session_tokens.headers)
+
+    def test_concurrent_rejections_log_in_once(self):
+        mclient = self.client()
+        self.server.state.expire_sessions()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: mclient._get_positions(), range(8)))
+        self.assertEqual(results, [[]] * 8)
+        self.assertEqual(mclient._session_tokens.logins, 2)
+
+    def test_background_refresh(self):
+        mclient = self.client()
+        tokens = SessionTokens(mclient, lifetime=0.4, refresh_margin=0.2)
+        tokens.obtain()
+        first = tokens.headers
+        tokens.start()
+        self.addCleanup(tokens.stop)
+        deadline = time.monotonic() + 5.0
+        while tokens.logins < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreaterEqual(tokens.logins, 2)
+        self.assertNotEqual(tokens.headers, first)
+        self.assertTrue(self.server.state.authenticated(tokens.headers))
+
+
+if __name__ == "__main__":
+    unittest.main()
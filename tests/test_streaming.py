@@ -0,0 +1,77 @@
+#
+# Position book reconciliation over a local mock IG server and mock
+# Lightstreamer server. Run from the repo root:
+#     python -m pytest tests
+from utils_platform.mclient import MKTClient
+from utils_platform.mock_ig import MockIGServer
+from utils_platform.mock_lightstreamer import MockLightstreamerServer
+from utils_platform.monitor import PortfolioMonitor
+from utils_platform.streaming import IGStream
+from benchmarks.transport import TRAILING_STOP_RULES
+import unittest
+import time
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class TestPositionBookReconciliation(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockIGServer().start()
+        self.lightstreamer = MockLightstreamerServer(self.server.state).start()
+        self.mclient = MKTClient(self.server.credentials(), session_refresh=False)
+        self.stream = IGStream(self.mclient, backoff_base=0.01).start()
+        self.book = self.mclient._position_book
+        draft_position = self.mclient.make_draft_position_from_newscode("BTC")
+        self.open_position = draft_position.open_position(TRAILING_STOP_RULES)
+        self.deal_id = self.open_position._position["position"]["dealId"]
+
+    def tearDown(self):
+        self.stream.close()
+        self.lightstreamer.stop()
+        self.server.stop()
+
+    def close_unseen(self):
+        """
+        Closes the position on the IG side without its update reaching the
+        stream, as when it is published during a reconnect gap.
+        """
+        state = self.server.state
+        state.listeners.remove(self.lightstreamer.publish)
+        try:
+            state.close_position({"dealId": self.deal_id})
+        finally:
+            state.listeners.append(self.lightstreamer.publish)
+
+    def test_streamed_close_drops_position(self):
+        self.server.state.close_position({"dealId": self.deal_id})
+        self.assertTrue(wait_for(lambda: self.book.get_by_deal_id(self.deal_id) is None))
+
+    def test_reconnect_refreshes_book(self):
+        self.close_unseen()
+        self.assertIsNotNone(self.book.get_by_deal_id(self.deal_id))
+        self.lightstreamer.drop()
+        self.assertTrue(wait_for(lambda: self.stream.client.sessions > 1))
+        self.assertTrue(wait_for(lambda: self.book.get_by_deal_id(self.deal_id) is None))
+
+    def test_monitor_reconciles_while_connected(self):
+        monitor = PortfolioMonitor(
+            self.mclient, interval=0.01, stream=self.stream, reconcile_interval=0.05
+        )
+        monitor.add(self.open_position)
+        monitor.tick()
+        self.close_unseen()
+        self.assertTrue(self.stream.connected)
+        self.assertTrue(wait_for(lambda: monitor.tick() == [] and not len(monitor)))
+        self.assertIsNone(self.book.get_by_deal_id(self.deal_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
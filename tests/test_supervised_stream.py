@@ -0,0 +1,77 @@
+#
+# SupervisedStream against a local mock Twitter stream server: stalls,
+# dropped connections and backfill of the tweets missed meanwhile. Run
+# from the repo root:
+#     python -m pytest tests
+from utils_twitter.mock_stream import MockStreamServer
+from utils_twitter.streaming import SupervisedStream
+import threading
+import unittest
+import queue
+import time
+import json
+
+RULE = {"value": "from:hindenburgres", "tag": "hindenburgres"}
+
+
+class TestSupervisedStream(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockStreamServer(keepalive_interval=0.05).start()
+        self.stream = SupervisedStream(
+            {}, [RULE], stall_timeout=0.3, backoff_base=0.01, **self.server.supervisor_kwargs()
+        )
+        self.received = queue.Queue()
+        self.thread = threading.Thread(target=self._read, daemon=True)
+        self.thread.start()
+        # The first tweet can only be backfilled once another has been seen
+        deadline = time.monotonic() + 5.0
+        while not self.server._connections and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.first_id = self.server.feed("first report", RULE)
+        self.assertEqual(self.next_id(), self.first_id)
+
+    def tearDown(self):
+        self.stream.close()
+        self.server.stop()
+        self.thread.join(2.0)
+
+    def _read(self):
+        for line in self.stream.iter_lines():
+            self.received.put(json.loads(line)["data"]["id"])
+
+    def next_id(self, timeout=5.0):
+        return self.received.get(timeout=timeout)
+
+    def assertNothingMore(self):
+        with self.assertRaises(queue.Empty):
+            self.next_id(timeout=0.5)
+
+    def test_stall_reconnects_and_backfills(self):
+        self.server.stall(1.0)
+        missed_id = self.server.feed("report during stall", RULE)
+        self.assertEqual(self.next_id(), missed_id)
+        self.assertGreaterEqual(self.stream.reconnects, 1)
+        self.assertEqual(self.stream.backfilled, 1)
+        live_id = self.server.feed("report after stall", RULE)
+        self.assertEqual(self.next_id(), live_id)
+        self.assertNothingMore()
+
+    def test_drop_reconnects_and_backfills(self):
+        self.server.drop()
+        missed_id = self.server.feed("report during drop", RULE)
+        self.assertEqual(self.next_id(), missed_id)
+        self.assertGreaterEqual(self.stream.reconnects, 1)
+        live_id = self.server.feed("report after drop", RULE)
+        self.assertEqual(self.next_id(), live_id)
+        self.assertNothingMore()
+
+    def test_backfill_is_not_delivered_twice(self):
+        self.server.drop()
+        self.assertNothingMore()
+        self.assertGreaterEqual(self.stream.reconnects, 1)
+        self.assertEqual(self.stream.backfilled, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
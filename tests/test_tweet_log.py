@@ -0,0 +1,97 @@
+#
+# TweetLog append, crash recovery, rotation, queries and migration. Run from
+# the repo root:
+#     python -m pytest tests
+from utils_twitter.tweet_log import TweetLog, TweetLogReader, migrate, list_segments, INDEX_ENTRY
+import tempfile
+import unittest
+import json
+import os
+
+
+def make_record(tid, text, tickers, timestamp="2024-01-02 15:30:00", timeline="hindenburgres"):
+    return {
+        "tid": tid, "text": text, "ticker": tickers[0] if tickers else None,
+        "tickers": tickers, "timeline": timeline, "timestamp": timestamp
+    }
+
+
+RECORDS = [
+    make_record("1", "Short $NKLA and $LAZR", ["NKLA", "LAZR"]),
+    make_record("2", "New report on $LAZR", ["LAZR"], "2024-01-02 16:00:00", "muddywatersre"),
+    make_record("3", "No ticker here", [], "2024-01-03 09:00:00"),
+]
+
+
+class TestTweetLog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "tweet_log")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, records, **kwargs):
+        tweet_log = TweetLog(self.path, **kwargs)
+        tweet_log.append(records)
+        tweet_log.close()
+
+    def reader(self):
+        reader = TweetLogReader(self.path)
+        self.addCleanup(reader.close)
+        return reader
+
+    def tids(self, **filters):
+        return [record["tid"] for record in self.reader().query(**filters)]
+
+    def test_append_and_query(self):
+        self.write(RECORDS)
+        reader = self.reader()
+        self.assertEqual(len(reader), 3)
+        self.assertEqual([record["tid"] for record in reader.scan()], ["1", "2", "3"])
+        self.assertEqual(reader.get("2"), RECORDS[1])
+        self.assertEqual(self.tids(timeline="hindenburgres"), ["1", "3"])
+        self.assertEqual(self.tids(start="2024-01-02 15:45:00", end="2024-01-03 00:00:00"), ["2"])
+        self.assertEqual(reader.count(timeline="muddywatersre"), 1)
+
+    def test_every_basket_ticker_is_indexed(self):
+        self.write(RECORDS)
+        self.assertEqual(self.tids(ticker="NKLA"), ["1"])
+        self.assertEqual(self.tids(ticker="LAZR"), ["1", "2"])
+        self.assertEqual(self.reader().count(ticker="LAZR"), 2)
+
+    def test_recovery_after_partial_writes(self):
+        self.write(RECORDS[:2])
+        base = os.path.join(self.path, "segment_000000")
+        with open(f"{base}.log", "ab") as log:
+            log.write((json.dumps(RECORDS[2]) + "\n").encode() + b'{"tid": "4", "te')
+        with open(f"{base}.idx", "r+b") as idx:
+            # Keep NKLA's entry of the basket and half of LAZR's
+            idx.truncate(INDEX_ENTRY.size + INDEX_ENTRY.size // 2)
+        self.write([make_record("5", "Short $HYLN", ["HYLN"])])
+        self.assertEqual([record["tid"] for record in self.reader().scan()], ["1", "2", "3", "5"])
+        self.assertEqual(self.tids(ticker="LAZR"), ["1", "2"])
+
+    def test_rotation(self):
+        tweet_log = TweetLog(self.path, segment_bytes=1)
+        for record in RECORDS:
+            tweet_log.append([record])
+        tweet_log.close()
+        self.assertEqual(list_segments(self.path), [0, 1, 2, 3])
+        self.assertEqual([record["tid"] for record in self.reader().scan()], ["1", "2", "3"])
+        self.assertEqual(self.tids(ticker="LAZR"), ["1", "2"])
+
+    def test_migrate(self):
+        log_dir = os.path.join(self.tmp.name, "log_twitter")
+        os.makedirs(log_dir)
+        for record in reversed(RECORDS):
+            with open(os.path.join(log_dir, f"{record['timeline']}___{record['tid']}.txt"), "w") as dst:
+                json.dump(record, dst)
+        self.assertEqual(migrate(log_dir, self.path), 3)
+        self.assertEqual([record["tid"] for record in self.reader().scan()], ["1", "2", "3"])
+        self.assertEqual(self.tids(ticker="LAZR"), ["1", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+#
+from contextlib import contextmanager
+from functools import wraps
+import threading
+import bisect
+import signal
+import json
+import time
+import os
+
+# Log-linear bucket bounds in ns: 4 buckets per power of two from 1us to ~70s
+BUCKET_BOUNDS = [int(1000 * 2 ** (i / 4)) for i in range(4 * 27)]
+QUANTILES = [0.5, 0.9, 0.99]
+
+
+class Histogram():
+    """
+    Fixed-bucket latency histogram. Recording is a bisect and three
+    additions; quantiles are read back as bucket upper bounds.
+    """
+
+    __slots__ = ["counts", "count", "total", "max"]
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def quantile(self, q):
+        if not self.count:
+            return 0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(BUCKET_BOUNDS[i], self.max) if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+
+class LatencyRecorder():
+    """
+    In-process registry of per-stage latency histograms (monotonic,
+    nanosecond resolution). Recording can be switched off and on at
+    runtime, and an optional hook receives every (stage, ns) sample,
+    e.g. to feed a profiler or a trace log.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._hook = None
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def record(self, stage, ns):
+        if not self.enabled:
+            return
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        histogram.record(ns)
+        if self._hook is not None:
+            self._hook(stage, ns)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the enclosed block as stage name.
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - start)
+
+    def timed(self, name):
+        """
+        Decorator timing every call of the function as stage name.
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter_ns() - start)
+            return wrapper
+        return decorator
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def set_hook(self, hook):
+        """
+        Installs (or removes with None) the per-sample profiling hook.
+        """
+        self._hook = hook
+
+    def install_signal_toggle(self, signum=None):
+        """
+        Toggles recording whenever the process receives signum (SIGUSR1
+        by default). Returns False, installing nothing, on platforms
+        without SIGUSR1 (e.g. Windows).
+        """
+        if signum is None:
+            signum = getattr(signal, "SIGUSR1", None)
+            if signum is None:
+                return False
+
+        def _toggle(_signum, _frame):
+            self.enabled = not self.enabled
+        signal.signal(signum, _toggle)
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def snapshot(self):
+        """
+        Returns {stage: {count, mean, p50, p90, p99, max}} in nanoseconds.
+        """
+        snapshot = {}
+        for stage, histogram in list(self._histograms.items()):
+            snapshot[stage] = {
+                "count": histogram.count,
+                "mean": histogram.total // histogram.count if histogram.count else 0,
+                **{f"p{int(q * 100)}": histogram.quantile(q) for q in QUANTILES},
+                "max": histogram.max
+            }
+        return snapshot
+
+    def to_prometheus(self, metric="signal_stage_latency_seconds"):
+        """
+        Renders the histograms in the Prometheus text exposition format.
+        """
+        lines = [f"# TYPE {metric} summary"]
+        for stage, histogram in sorted(self._histograms.items()):
+            for q in QUANTILES:
+                lines.append(
+                    f'{metric}{{stage="{stage}",quantile="{q}"}} {histogram.quantile(q) / 1e9:.9f}'
+                )
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram.total / 1e9:.9f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {histogram.count}')
+        lines.append(f"# TYPE {metric}_max gauge")
+        for stage, histogram in sorted(self._histograms.items()):
+            lines.append(f'{metric}_max{{stage="{stage}"}} {histogram.max / 1e9:.9f}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        _atomic_write(path, self.to_prometheus())
+
+    def write_json(self, path):
+        _atomic_write(path, json.dumps(self.snapshot()))
+
+    def start_export(self, path, interval=10.0):
+        """
+        Rewrites path every interval seconds from a daemon thread, as JSON
+        if path ends with .json and as Prometheus text otherwise.
+        """
+        write = self.write_json if path.endswith(".json") else self.write_prometheus
+
+        def _run():
+            while True:
+                time.sleep(interval)
+                write(path)
+
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        return thread
+
+
+def _atomic_write(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as out:
+        out.write(text)
+    os.replace(tmp_path, path)
+
+
+RECORDER = LatencyRecorder()
@@ -0,0 +1,162 @@
+#
+from contextlib import contextmanager
+import threading
+import time
+import sys
+import os
+
+# Setting this environment variable turns the startup profile on
+PROFILE_ENV = "STARTUP_PROFILE"
+
+
+class _TimedLoader():
+    """
+    Proxy around a module loader that times module creation and execution.
+    """
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        with self._profiler._timing(spec.name):
+            return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self._profiler._timing(module.__name__):
+            self._loader.exec_module(module)
+
+
+class _TimingFinder():
+    """
+    First entry of sys.meta_path: resolves specs through the other finders
+    and wraps their loaders in a _TimedLoader.
+    """
+
+    def __init__(self, profiler):
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, self._profiler)
+            return spec
+        return None
+
+
+class StartupProfiler():
+    """
+    Startup profile of a process: import time per module (cumulative and
+    own, excluding nested imports) once installed, and the duration and
+    completion time of named init stages. Stages and marks are always
+    recorded, imports only after install(), and ready() prints the
+    report only when profiling is on.
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter_ns()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._finder = None
+        self._reported = False
+        self.imports = {}
+        self.stages = {}
+
+    @property
+    def enabled(self):
+        return self._finder is not None
+
+    def install(self):
+        """
+        Starts timing imports. Modules imported before are not measured,
+        so this should run before the first heavy import.
+        """
+        if self._finder is None:
+            self._origin = time.perf_counter_ns()
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+        return self
+
+    def install_from_env(self):
+        if os.environ.get(PROFILE_ENV):
+            self.install()
+        return self
+
+    def uninstall(self):
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self._finder = None
+
+    @contextmanager
+    def _timing(self, name):
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                cumulative, own = self.imports.get(name, (0, 0))
+                self.imports[name] = (cumulative + elapsed, own + elapsed - nested)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Records the duration of an init stage and when it completed.
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            with self._lock:
+                self.stages[name] = (end - start, end - self._origin)
+
+    def mark(self, name):
+        """
+        Records the first time name is reached, e.g. "listening".
+        """
+        at = time.perf_counter_ns() - self._origin
+        with self._lock:
+            self.stages.setdefault(name, (None, at))
+
+    def ready(self, name):
+        """
+        Marks name and prints the report once if profiling is on.
+        """
+        self.mark(name)
+        if self.enabled and not self._reported:
+            self._reported = True
+            print(self.report())
+
+    def report(self, top=25):
+        """
+        Formats the stages in completion order and the top imports by
+        cumulative time, in milliseconds since install.
+        """
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1][1])
+            imports = sorted(self.imports.items(), key=lambda item: -item[1][0])[:top]
+        lines = ["Startup profile (ms since install):", f"  {'stage':<32}{'took':>10}{'at':>10}"]
+        for name, (took, at) in stages:
+            took = "" if took is None else f"{took / 1e6:.1f}"
+            lines.append(f"  {name:<32}{took:>10}{at / 1e6:>10.1f}")
+        lines.append(f"  {'import':<32}{'cumul.':>10}{'self':>10}")
+        for name, (cumulative, own) in imports:
+            lines.append(f"  {name:<32}{cumulative / 1e6:>10.1f}{own / 1e6:>10.1f}")
+        return "\n".join(lines)
+
+
+STARTUP = StartupProfiler()
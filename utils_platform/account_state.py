@@ -0,0 +1,94 @@
+#
+from .scheduler import request_priority, MONITOR
+import threading
+import time
+
+
+class AccountState():
+    """
+    Keeps a local snapshot of the account balance (available funds,
+    deposit/margin and P/L) so that position sizing reads memory instead
+    of waiting on the accounts endpoint.
+    """
+
+    def __init__(self, mclient, interval=None, max_staleness=30.0):
+        """
+        interval is the background refresh period in seconds (no background
+        refresh if None), max_staleness is the maximum age of a snapshot
+        before a read falls back to a synchronous fetch.
+        """
+        self._mcl = mclient
+        self._interval = interval
+        self._max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._balance = None
+        self._updated_at = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """
+        Fetches the account balance and replaces the snapshot.
+        """
+        balance = self._mcl._get_account_balance()
+        with self._lock:
+            self._balance = balance
+            self._updated_at = time.monotonic()
+        return balance
+
+    def age(self):
+        """
+        Returns the age of the snapshot in seconds, None if never fetched.
+        """
+        updated_at = self._updated_at
+        if updated_at is None:
+            return None
+        return time.monotonic() - updated_at
+
+    def balance(self):
+        """
+        Returns the balance snapshot, fetching it synchronously only when
+        it is missing or older than max_staleness.
+        """
+        age = self.age()
+        if age is None or age > self._max_staleness:
+            return self.refresh()
+        return self._balance
+
+    def notify_deal(self):
+        """
+        Signals that a deal changed the balance. Wakes the background
+        refresher, or invalidates the snapshot if there is none.
+        """
+        if self._thread is not None:
+            self._wake.set()
+        else:
+            with self._lock:
+                self._updated_at = None
+
+    @request_priority(MONITOR)
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                pass
+            self._wake.wait(self._interval)
+            self._wake.clear()
+
+    def start(self, interval=None):
+        """
+        Starts the background refresher.
+        """
+        self._interval = interval or self._interval
+        if self._interval is None:
+            err_msg = "Error(): a refresh interval is required."
+            raise Exception(err_msg)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
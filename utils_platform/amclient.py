@@ -0,0 +1,385 @@
+#
+from .mclient import MKTClient, DraftPosition
+from utils_metrics.latency import RECORDER
+from urllib.parse import urljoin
+import asyncio
+import aiohttp
+import json
+import time
+
+
+class AsyncResponse():
+    """
+    Body and headers of a completed aiohttp request, read while the
+    connection was still held so it can be used like a requests response.
+    """
+
+    def __init__(self, status_code, headers, text):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncMKTClient(MKTClient):
+    """
+    asyncio counterpart of MKTClient. Independent requests (market lookup
+    and balance, or the state of many positions) run concurrently on a
+    single event loop over a shared aiohttp connection pool.
+    """
+
+    def __init__(self, credentials: dict, pool_size=100, timeout=10.0, market_index=None):
+        """
+        Stores credentials and prepares the connection pool. Use
+        AsyncMKTClient.create to get a logged-in instance.
+        """
+        self._api_key = credentials["api_key"]
+        self._user_login = credentials["user_login"]
+        self._password = credentials["password"]
+        self._accid = credentials["accid"]
+        self._root_endpoint = credentials["root_endpoint"]
+        self._market_index = market_index
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=pool_size),
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        )
+
+    @classmethod
+    async def create(cls, credentials: dict, **kwargs):
+        """
+        Instantiates the client and logs in.
+        """
+        amclient = cls(credentials, **kwargs)
+        await amclient._login()
+        amclient._set_local_headers()
+        return amclient
+
+    async def close(self):
+        await self._session.close()
+
+    async def _login(self):
+        """
+        Sends a login request and sets common headers.
+        """
+        response = await self._post(
+            url="session",
+            headers={
+                "Content-Type": "application/json; charset=UTF-8",
+                "Accept": "application/json; charset=UTF-8",
+                "X-IG-API-KEY": self._api_key,
+                "Version": "2"
+            },
+            payload={
+                "identifier": self._user_login,
+                "password": self._password
+            }
+        )
+
+        self._common_headers = {
+            "Content-Type": "application/json; charset=UTF-8",
+            "Accept": "application/json; charset=UTF-8",
+            "X-IG-API-KEY": self._api_key,
+            "X-SECURITY-TOKEN": response.headers["X-SECURITY-TOKEN"],
+            "CST": response.headers["CST"]
+        }
+
+    async def _request(self, method, url, headers, params=None, payload=None):
+        """
+        Sends a request over the shared session, times it per method and
+        endpoint and raises on non-200.
+        """
+        start = time.perf_counter_ns()
+        async with self._session.request(
+            method,
+            urljoin(self._root_endpoint, url),
+            headers=headers,
+            params=params,
+            json=payload
+        ) as response:
+            text = await response.text()
+            RECORDER.record(f"http.{method}.{url.split('/')[0]}", time.perf_counter_ns() - start)
+            if response.status != 200:
+                err_msg = f"Error({response.status}): {text}"
+                raise Exception(err_msg)
+            return AsyncResponse(response.status, response.headers, text)
+
+    async def _get(self, url, headers, params):
+        return await self._request("GET", url, headers, params=params)
+
+    async def _post(self, url, headers, payload):
+        return await self._request("POST", url, headers, payload=payload)
+
+    async def _delete(self, url, headers, payload):
+        return await self._request("DELETE", url, headers, payload=payload)
+
+    async def _put(self, url, headers, payload):
+        return await self._request("PUT", url, headers, payload=payload)
+
+    async def _get_market_from_epic(self, epic):
+        """
+        Gets market details given an epic identificator.
+        """
+        response_market = await self._get(
+            url=f"markets/{epic}",
+            headers=self._headers_get_market_from_epic,
+            params=None
+        )
+        return response_market.json()
+
+    async def _get_markets_from_epics(self, epics):
+        """
+        Gets market details for a batch of epics in a single request.
+        """
+        response_markets = await self._get(
+            url="markets",
+            headers=self._headers_get_markets_from_epics,
+            params={"epics": ",".join(epics)}
+        )
+        return response_markets.json()["marketDetails"]
+
+    async def _get_market_from_newscode(self, newscode):
+        """
+        Resolves a newscode from the market index when available,
+        otherwise searches the service and stores the result in the index.
+        Expired index entries are fetched again by their epic.
+        """
+        if self._market_index is None:
+            return await self._search_market_from_newscode(newscode)
+        market = self._market_index.get(newscode)
+        if market is None:
+            epic = self._market_index.epic(newscode)
+            if epic is not None:
+                market = await self._get_market_from_epic(epic)
+            else:
+                market = await self._search_market_from_newscode(newscode)
+            self._market_index.put(newscode, market)
+        return market
+
+    async def _search_market_from_newscode(self, newscode):
+        """
+        Searches service database for a key-word term and fetches
+        the details of the single matching epic.
+        """
+        response_market_search = await self._get(
+            url = "markets",
+            headers=self._headers_search_newscode,
+            params={"searchTerm": newscode}
+        )
+        matching_markets = response_market_search.json()["markets"]
+        if len(matching_markets) != 1:
+            err_msg = f"Error({len(matching_markets)}): nonunique result."
+            raise Exception(err_msg)
+        return await self._get_market_from_epic(matching_markets[0]['epic'])
+
+    async def _get_positions(self):
+        """
+        Fetches the list of open positions for the current account.
+        """
+        response = await self._get(
+            url="positions",
+            headers=self._headers_get_positions,
+            params=None
+        )
+        return response.json()["positions"]
+
+    async def _get_position_from_deal_reference(self, deal_reference, silent_fail=False):
+        """
+        Fetches open positions and looks up a specific deal_reference.
+        """
+        positions_list = await self._get_positions()
+        for pos in positions_list:
+            if pos["position"]["dealReference"] == deal_reference:
+                return pos
+        if silent_fail:
+            return None
+        err_msg = f"Error(): position not found, silent_fail=False"
+        raise Exception(err_msg)
+
+    async def _get_account_balance(self):
+        """
+        Fetches current account status (balance, deposit, P/L).
+        """
+        response = await self._get(
+            url="accounts",
+            headers=self._headers_get_account_balance,
+            params=None
+        )
+        for acc in response.json()["accounts"]:
+            if acc["accountId"] == self._accid:
+                return acc["balance"]
+
+    async def make_draft_position_from_newscode(self, newscode):
+        """
+        Returns an AsyncDraftPosition. Market lookup and account
+        balance are fetched concurrently.
+        """
+        market, balance = await asyncio.gather(
+            self._get_market_from_newscode(newscode),
+            self._get_account_balance()
+        )
+        return AsyncDraftPosition(self, market, balance)
+
+    async def make_draft_position_from_epic(self, epic):
+        """
+        Returns an AsyncDraftPosition. Market lookup and account
+        balance are fetched concurrently.
+        """
+        market, balance = await asyncio.gather(
+            self._get_market_from_epic(epic),
+            self._get_account_balance()
+        )
+        return AsyncDraftPosition(self, market, balance)
+
+    async def update_positions(self, open_positions):
+        """
+        Refreshes the state of many open positions concurrently.
+        """
+        await asyncio.gather(*[
+            open_position._update_position_state() for open_position in open_positions
+        ])
+
+
+class AsyncDraftPosition(AsyncMKTClient, DraftPosition):
+    """
+    asyncio counterpart of DraftPosition. Keeps the same specification,
+    trailing stop clamps and close-on-mismatch verification.
+    """
+
+    def __init__(self, amclient, market, balance):
+        """
+        Initializes a draft for a given market, sized from the account
+        balance fetched alongside it.
+        """
+        self._mcl = amclient
+        self._market = market
+        self._balance = balance
+        self._inherit_headers()
+        self._set_local_headers()
+
+        self._set_default_position_specification()
+
+    def _inherit_headers(self):
+        """
+        Inherits common headers and the session from parent AsyncMKTClient.
+        """
+        self._root_endpoint = self._mcl._root_endpoint
+        self._accid = self._mcl._accid
+        self._session = self._mcl._session
+
+        self._common_headers = self._mcl._common_headers
+        self._headers_get_market_from_epic = self._mcl._headers_get_market_from_epic
+        self._headers_get_account_balance = self._mcl._headers_get_account_balance
+        self._headers_get_positions = self._mcl._headers_get_positions
+
+    def _get_available_funds(self):
+        return self._balance["available"]
+
+    async def _set_position_trailing_stop_rules(self, trailing_stop_rules):
+        """
+        Sends a PUT request to update specification of a newly opened
+        position.
+        """
+        self._make_trailing_stop_request(trailing_stop_rules)
+        await self._put(
+            url=urljoin("positions/", f"otc/{self._position['position']['dealId']}"),
+            headers=self._headers_manage_position,
+            payload=self._trailing_stop_request
+        )
+
+    async def _check_position_specification(self):
+        """
+        Verifies the open position against the requested specification.
+        Closes the position otherwise.
+        """
+        err = self._find_specification_mismatch()
+        if err:
+            await self.close_position()
+            raise Exception(f"Position closed due to param mismatch: {err}.")
+
+    async def open_position(self, trailing_stop_rules=None, exit_rules=None):
+        """
+        Opens the position, sets trailing stop rules and verifies the
+        executed specification. Returns an AsyncOpenPosition object.
+        """
+        response = await self._post(
+            url=urljoin("positions/", "otc"),
+            headers=self._headers_manage_position,
+            payload=self._default_position_specification
+        )
+        deal_reference = response.json()["dealReference"]
+        self._position = await self._get_position_from_deal_reference(deal_reference)
+        await self._set_position_trailing_stop_rules(trailing_stop_rules)
+        self._position = await self._get_position_from_deal_reference(deal_reference)
+        await self._check_position_specification()
+        return AsyncOpenPosition(self, exit_rules=exit_rules)
+
+    async def close_position(self):
+        """
+        Closes the position.
+        """
+        response = await self._post(
+            url=urljoin("positions/", "otc"),
+            headers=self._headers_close_position,
+            payload={
+                "dealId": self._position["position"]["dealId"],
+                "size": self._position["position"]["size"],
+                "direction": "BUY",
+                "orderType": "MARKET"
+            }
+        )
+        deal_reference = response.json()["dealReference"]
+        position = await self._get_position_from_deal_reference(deal_reference, True)
+        if position is not None:
+            err_msg = f"Error: position failed to close."
+            raise Exception(err_msg)
+
+
+class AsyncOpenPosition(AsyncDraftPosition):
+    """
+    asyncio counterpart of OpenPosition.
+    """
+
+    def __init__(self, draft_position, exit_rules=None):
+        """
+        Requires AsyncDraftPosition instance to inherit open position
+        specification and headers.
+        """
+        self._dp = draft_position
+        self._market = self._dp._market
+        self._position = self._dp._position
+        self._exit_rules = exit_rules
+        self._inherit_headers()
+
+    def _inherit_headers(self):
+        """
+        Inherits headers and the session from the parent AsyncDraftPosition.
+        """
+        self._root_endpoint = self._dp._root_endpoint
+        self._accid = self._dp._accid
+        self._session = self._dp._session
+        self._common_headers = self._dp._common_headers
+        self._headers_manage_position = self._dp._headers_manage_position
+        self._headers_get_positions = self._dp._headers_get_positions
+        self._headers_close_position = self._dp._headers_close_position
+
+    async def _update_position_state(self):
+        """
+        Calls position from reference and updates self._position state.
+        """
+        deal_reference = self._position["position"]["dealReference"]
+        self._position = await self._get_position_from_deal_reference(deal_reference)
+
+    async def monitor(self, interval=1.0):
+        """
+        Polls the position state until it is no longer open, e.g. after
+        the stop was hit. Many positions can be monitored on one loop.
+        """
+        deal_reference = self._position["position"]["dealReference"]
+        while True:
+            position = await self._get_position_from_deal_reference(deal_reference, True)
+            if position is None:
+                return self._position
+            self._position = position
+            await asyncio.sleep(interval)
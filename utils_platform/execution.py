@@ -0,0 +1,185 @@
+#
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils_metrics.latency import Histogram
+import threading
+import requests
+import secrets
+import time
+
+# Deadline (seconds) of a whole request, by "METHOD segment", "segment" or
+# "default". Order POSTs running out of time are resolved from their deal
+# confirmation, see DraftPosition._submit_deal.
+DEADLINES = {
+    "POST session": 10.0,
+    "POST positions": 3.0,
+    "PUT positions": 3.0,
+    "default": 2.0
+}
+
+
+def new_deal_reference():
+    """
+    Client-side dealReference of an order, so that an order whose response
+    never arrived can be looked up instead of being submitted again.
+    """
+    return "ASB" + secrets.token_hex(8).upper()
+
+
+class RequestExecutor():
+    """
+    Sends the REST requests of an MKTClient under per-endpoint deadlines,
+    so a slow IG response fails in bounded time instead of hanging the
+    signal path. Reads are hedged: when a GET got no answer within the
+    hedge_quantile latency of its endpoint, or failed, a duplicate is sent
+    and the first good response wins. Hedges are capped at hedge_budget of
+    all reads, so they cannot multiply the load on a struggling service,
+    and each one must be admitted by the caller's rate limits (see send).
+    Writes are sent once.
+    """
+
+    def __init__(
+        self, deadlines=None, hedge_quantile=0.95, hedge_budget=0.05,
+        min_samples=20, default_hedge_delay=0.25, min_hedge_delay=0.002,
+        confirm_timeout=10.0, confirm_interval=0.1, max_workers=32
+    ):
+        """
+        deadlines maps endpoints to seconds (DEADLINES by default) and
+        hedge_quantile=None turns hedging off. Until an endpoint has
+        min_samples observed latencies, reads are hedged after
+        default_hedge_delay. confirm_timeout and confirm_interval bound the
+        confirmation polling of orders that timed out.
+        """
+        self._deadlines = DEADLINES if deadlines is None else deadlines
+        self._hedge_quantile = hedge_quantile
+        self._hedge_budget = hedge_budget
+        self._min_samples = min_samples
+        self._default_hedge_delay = default_hedge_delay
+        self._min_hedge_delay = min_hedge_delay
+        self.confirm_timeout = confirm_timeout
+        self.confirm_interval = confirm_interval
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._latency = {}
+        self.reads = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.hedges_throttled = 0
+        self.timeouts = 0
+
+    def deadline_for(self, endpoint):
+        for key in [endpoint, endpoint.split(" ")[1], "default"]:
+            if key in self._deadlines:
+                return self._deadlines[key]
+        return None
+
+    def hedge_delay(self, endpoint):
+        """
+        Seconds after which a read of endpoint is hedged: the
+        hedge_quantile of its observed latency, None without hedging.
+        """
+        if self._hedge_quantile is None:
+            return None
+        with self._lock:
+            histogram = self._latency.get(endpoint)
+            if histogram is None or histogram.count < self._min_samples:
+                return self._default_hedge_delay
+            return max(histogram.quantile(self._hedge_quantile) / 1e9, self._min_hedge_delay)
+
+    def _observe(self, endpoint, ns):
+        with self._lock:
+            if endpoint not in self._latency:
+                self._latency[endpoint] = Histogram()
+            self._latency[endpoint].record(ns)
+
+    def _take_hedge(self, admit):
+        with self._lock:
+            if self.hedged >= self._hedge_budget * self.reads:
+                return False
+        if admit is not None and not admit():
+            with self._lock:
+                self.hedges_throttled += 1
+            return False
+        with self._lock:
+            self.hedged += 1
+        return True
+
+    def _attempt(self, endpoint, send, timeout):
+        start = time.perf_counter_ns()
+        response = send(timeout)
+        if response.status_code < 500:
+            self._observe(endpoint, time.perf_counter_ns() - start)
+        return response
+
+    def send(self, method, url, send, admit=None):
+        """
+        Calls send(timeout) and returns its response, hedged for GETs.
+        Raises requests.exceptions.Timeout once the deadline of the
+        endpoint has passed; a write may still have reached the service.
+        admit() is called before sending a hedge and must take it out of
+        the rate limits (e.g. RequestScheduler.try_admit); the hedge is
+        skipped when it returns False.
+        """
+        endpoint = f"{method} {url.split('/')[0]}"
+        deadline = self.deadline_for(endpoint)
+        hedge = method == "GET" and self._hedge_quantile is not None
+        if hedge:
+            with self._lock:
+                self.reads += 1
+        if deadline is None and not hedge:
+            return self._attempt(endpoint, send, None)
+        end = None if deadline is None else time.monotonic() + deadline
+        hedge_at = time.monotonic() + self.hedge_delay(endpoint) if hedge else None
+        attempts = {self._pool.submit(self._attempt, endpoint, send, deadline): 0}
+        pending = set(attempts)
+        failure = None
+        while True:
+            now = time.monotonic()
+            if end is not None and now >= end:
+                with self._lock:
+                    self.timeouts += 1
+                err_msg = f"Error(timeout): {endpoint} exceeded its {deadline}s deadline."
+                raise requests.exceptions.Timeout(err_msg)
+            wake = [t for t in [end, hedge_at] if t is not None]
+            done, pending = wait(
+                pending, timeout=min(wake) - now if wake else None, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as exc:
+                    failure = exc
+                    continue
+                if response.status_code < 500:
+                    if attempts[future]:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return response
+                failure = response
+            if hedge_at is not None and (not pending or time.monotonic() >= hedge_at):
+                hedge_at = None
+                if self._take_hedge(admit):
+                    timeout = None if end is None else max(end - time.monotonic(), 0.001)
+                    future = self._pool.submit(self._attempt, endpoint, send, timeout)
+                    attempts[future] = 1
+                    pending.add(future)
+            if not pending:
+                if isinstance(failure, Exception):
+                    raise failure
+                return failure
+
+    def stats(self):
+        """
+        Returns the read, hedge, throttled hedge and timeout counts and the
+        current hedge delay per read endpoint.
+        """
+        with self._lock:
+            endpoints = [endpoint for endpoint in self._latency if endpoint.startswith("GET ")]
+            counts = {
+                "reads": self.reads, "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins, "hedges_throttled": self.hedges_throttled,
+                "timeouts": self.timeouts
+            }
+        return {**counts, "hedge_delay": {endpoint: self.hedge_delay(endpoint) for endpoint in endpoints}}
+
+    def close(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,159 @@
+#
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+from .mclient import MKTClient, DraftPosition
+from .scheduler import request_priority, ORDER
+from utils_metrics.latency import RECORDER
+import time
+
+# rolled_back and rollback_error record the all_or_none rollback of an opened position
+AccountResult = namedtuple(
+    "AccountResult", ["accid", "position", "error", "elapsed", "rolled_back", "rollback_error"],
+    defaults=[False, None]
+)
+
+
+class AccountFleet():
+    """
+    Runs a signal on several IG accounts at once. Every account keeps its
+    own authenticated MKTClient (session, balance, position book and rate
+    limits), the market is resolved once and shared, and sizing, opening,
+    stop amendment and verification run in parallel, one thread per
+    account, so a signal takes about as long as the slowest account.
+    """
+
+    def __init__(self, credentials_list, market_index=None, **client_kwargs):
+        """
+        Logs every account in concurrently. client_kwargs are passed to
+        each MKTClient (a Transport should not be shared between accounts
+        on different endpoints). Accounts failing to log in are kept in
+        self.failed with their exception.
+        """
+        self._market_index = market_index
+        self._pool = ThreadPoolExecutor(max_workers=max(len(credentials_list), 1))
+        self.clients = {}
+        self.failed = {}
+        futures = {
+            credentials["accid"]: self._pool.submit(
+                MKTClient, credentials, market_index=market_index, **client_kwargs
+            )
+            for credentials in credentials_list
+        }
+        for accid, future in futures.items():
+            try:
+                self.clients[accid] = future.result()
+            except Exception as exc:
+                self.failed[accid] = exc
+
+    def __len__(self):
+        return len(self.clients)
+
+    def _map(self, fn, items):
+        """
+        Runs fn(accid, item) for every (accid, item) concurrently and
+        returns one AccountResult per account; exceptions are captured.
+        """
+        def _run(accid, item):
+            start = time.perf_counter()
+            try:
+                return AccountResult(accid, fn(accid, item), None, time.perf_counter() - start)
+            except Exception as exc:
+                return AccountResult(accid, None, exc, time.perf_counter() - start)
+
+        futures = [self._pool.submit(_run, accid, item) for accid, item in items.items()]
+        return {result.accid: result for result in (future.result() for future in futures)}
+
+    @request_priority(ORDER)
+    def resolve_market(self, newscode=None, epic=None):
+        """
+        Resolves the market once, through the first account that can.
+        """
+        errors = []
+        for mclient in self.clients.values():
+            try:
+                if epic is not None:
+                    return mclient._get_market_from_epic(epic)
+                return mclient._get_market_from_newscode(newscode)
+            except Exception as exc:
+                errors.append(exc)
+        err_msg = f"Error(): market resolution failed on every account: {errors}"
+        raise Exception(err_msg)
+
+    @request_priority(ORDER)
+    def _draft(self, accid, market, allocations=None):
+        """
+        Sizes a DraftPosition on the shared market from the balance of
+        one account, with its share of available funds if in allocations.
+        """
+        draft_position = DraftPosition(self.clients[accid], market)
+        if allocations and accid in allocations:
+            draft_position._default_position_specification["size"] = (
+                draft_position._calculate_position_size(allocations[accid])
+            )
+        return draft_position
+
+    def make_draft_positions(self, market, allocations=None):
+        """
+        Sizes a DraftPosition on the shared market for every account from
+        its own balance. allocations optionally maps accid to the share of
+        available funds (DraftPosition default otherwise).
+        """
+        return self._map(
+            lambda accid, mclient: self._draft(accid, market, allocations), self.clients
+        )
+
+    def open_positions(self, draft_positions, trailing_stop_rules=None, exit_rules=None):
+        """
+        Opens, amends and verifies every draft position concurrently.
+        draft_positions maps accid to DraftPosition.
+        """
+        return self._map(
+            lambda accid, draft_position: draft_position.open_position(trailing_stop_rules, exit_rules),
+            draft_positions
+        )
+
+    def close_positions(self, open_positions):
+        """
+        Closes every position concurrently. open_positions maps accid to
+        OpenPosition.
+        """
+        def _close(accid, open_position):
+            open_position.close_position()
+            return open_position
+
+        return self._map(_close, open_positions)
+
+    def execute(
+        self, newscode=None, epic=None, trailing_stop_rules=None,
+        exit_rules=None, allocations=None, all_or_none=False
+    ):
+        """
+        Executes one signal on every account and returns an AccountResult
+        per account holding the OpenPosition or the error. Accounts are
+        independent: a failing account does not delay or stop the others.
+        With all_or_none, positions opened on the successful accounts are
+        closed again if any account failed; their results then carry
+        rolled_back=True, or the rollback_error of a failed close.
+        """
+        with RECORDER.stage("fleet.market_resolution"):
+            market = self.resolve_market(newscode, epic)
+
+        def _open(accid, mclient):
+            draft_position = self._draft(accid, market, allocations)
+            return draft_position.open_position(trailing_stop_rules, exit_rules)
+
+        with RECORDER.stage("fleet.execution"):
+            results = self._map(_open, self.clients)
+        if all_or_none and any(result.error is not None for result in results.values()):
+            opened = {
+                accid: result.position for accid, result in results.items()
+                if result.error is None
+            }
+            for accid, closed in self.close_positions(opened).items():
+                results[accid] = results[accid]._replace(
+                    rolled_back=closed.error is None, rollback_error=closed.error
+                )
+        return results
+
+    def close(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,200 @@
+#
+from concurrent.futures import ThreadPoolExecutor
+from .scheduler import request_priority, REFRESH
+import threading
+import json
+import time
+import os
+
+
+EPICS_BATCH_SIZE = 50
+
+
+class MarketIndex():
+    """
+    On-disk, memory-loaded index mapping newscodes to epics together with
+    static instrument and dealingRules details. A hit resolves a newscode
+    without any network call; the volatile snapshot is kept fresh in the
+    background, and an entry whose snapshot is older than ttl is not
+    served until it is fetched again.
+    """
+
+    def __init__(self, path, ttl=300, max_age=7 * 24 * 3600):
+        """
+        ttl is the maximum age (seconds) of a snapshot before it is
+        re-fetched, max_age is the maximum age of the static details
+        before an entry is evicted and must be resolved again.
+        """
+        self._path = path
+        self._ttl = ttl
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._load()
+
+    def _load(self):
+        """
+        Loads the index from disk if it exists.
+        """
+        if os.path.exists(self._path):
+            with open(self._path, "r") as src:
+                self._entries = json.load(src)
+
+    def save(self):
+        """
+        Atomically writes the index to disk.
+        """
+        with self._lock:
+            data = json.dumps(self._entries)
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w") as out:
+            out.write(data)
+        os.replace(tmp_path, self._path)
+
+    def _live_entry(self, newscode):
+        """
+        Returns the entry of newscode unless its static details are older
+        than max_age.
+        """
+        entry = self._entries.get(newscode)
+        if entry is None or time.time() - entry["static_at"] > self._max_age:
+            return None
+        return entry
+
+    def get(self, newscode):
+        """
+        Returns a markets/{epic}-like dict for the newscode, or None when
+        it is unknown or expired (snapshot older than ttl, static details
+        older than max_age). Never touches the network.
+        """
+        entry = self._live_entry(newscode)
+        if entry is None or time.time() - entry["snapshot_at"] > self._ttl:
+            return None
+        return {
+            "instrument": entry["instrument"],
+            "dealingRules": entry["dealingRules"],
+            "snapshot": entry["snapshot"]
+        }
+
+    def epic(self, newscode):
+        """
+        Returns the epic of the newscode while its static details are
+        younger than max_age, so an expired snapshot is fetched from
+        markets/{epic} without searching the newscode again.
+        """
+        entry = self._live_entry(newscode)
+        return None if entry is None else entry["epic"]
+
+    def put(self, newscode, market):
+        """
+        Stores a market fetched from markets/{epic}.
+        """
+        now = time.time()
+        entry = {
+            "epic": market["instrument"]["epic"],
+            "instrument": market["instrument"],
+            "dealingRules": market["dealingRules"],
+            "snapshot": market["snapshot"],
+            "static_at": now,
+            "snapshot_at": now
+        }
+        with self._lock:
+            self._entries[newscode] = entry
+
+    def evict(self, newscode):
+        with self._lock:
+            self._entries.pop(newscode, None)
+
+    def __contains__(self, newscode):
+        return newscode in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def prewarm(self, mclient, watchlist, max_workers=4):
+        """
+        Resolves every newscode of the watchlist missing from the index.
+        Failed lookups are skipped and retried on the next prewarm.
+        """
+        missing = [newscode for newscode in watchlist if newscode not in self]
+
+        @request_priority(REFRESH)
+        def _resolve(newscode):
+            try:
+                self.put(newscode, mclient._search_market_from_newscode(newscode))
+            except Exception:
+                pass
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(_resolve, missing))
+        self.save()
+
+    @request_priority(REFRESH)
+    def refresh(self, mclient, margin=0.0):
+        """
+        Re-fetches only the snapshot of entries older than ttl - margin,
+        i.e. expiring within margin seconds, batched through
+        markets?epics=. Entries whose epic is no longer returned
+        (delisted) or whose static details are older than max_age are evicted.
+        """
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.items())
+        for newscode, entry in entries:
+            if now - entry["static_at"] > self._max_age:
+                self.evict(newscode)
+        stale = {
+            entry["epic"]: newscode for newscode, entry in entries
+            if now - entry["snapshot_at"] > self._ttl - margin
+            and now - entry["static_at"] <= self._max_age
+        }
+        epics = list(stale)
+        for i in range(0, len(epics), EPICS_BATCH_SIZE):
+            batch = epics[i:i + EPICS_BATCH_SIZE]
+            try:
+                market_details = mclient._get_markets_from_epics(batch)
+            except Exception:
+                continue
+            fetched = {
+                market["instrument"]["epic"]: market["snapshot"]
+                for market in market_details
+            }
+            with self._lock:
+                for epic in batch:
+                    newscode = stale[epic]
+                    if newscode not in self._entries:
+                        continue
+                    if epic not in fetched:
+                        self._entries.pop(newscode)
+                        continue
+                    self._entries[newscode]["snapshot"] = fetched[epic]
+                    self._entries[newscode]["snapshot_at"] = time.time()
+        self.save()
+
+    def start(self, mclient, watchlist=(), interval=None):
+        """
+        Starts a daemon thread that prewarms the watchlist and then
+        refreshes the index every interval seconds (ttl / 4 by default,
+        must be below ttl / 2). Each run refreshes the entries that would
+        expire within two intervals, since an entry it skips is only
+        refreshed by the next run, so served entries never expire.
+        """
+        interval = interval or self._ttl / 4
+        if not 0 < 2 * interval < self._ttl:
+            err_msg = f"Error({interval}): refresh interval must be below ttl / 2."
+            raise Exception(err_msg)
+
+        def _run():
+            self.prewarm(mclient, watchlist)
+            while not self._stop.wait(interval):
+                self.refresh(mclient, margin=2 * interval)
+                self.prewarm(mclient, watchlist)
+
+        self._thread = threading.Thread(target=_run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
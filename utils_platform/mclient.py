@@ -1,11 +1,32 @@
 #
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
 from copy import copy
-import numpy as np
 import requests
+import math
 import json
 import time
 from urllib.parse import urljoin, urlencode
 from datetime import datetime, timedelta
+from .transport import Transport
+from .account_state import AccountState
+from .position_book import PositionBook
+from .rules import trailing_stop_distances
+from .session import SessionTokens, SESSION_LIFETIME
+from .scheduler import RequestScheduler, request_priority, ORDER, MONITOR
+from .execution import RequestExecutor, new_deal_reference
+from utils_metrics.latency import RECORDER
+
+# rolled_back and rollback_error record the all_or_none rollback of an opened leg
+BasketLeg = namedtuple(
+    "BasketLeg", ["newscode", "position", "error", "elapsed", "rolled_back", "rollback_error"],
+    defaults=[False, None]
+)
+# Deal rejections caused by a stop attached to the opening order
+ATTACHED_STOP_REJECTIONS = {
+    "ATTACHED_ORDER_LEVEL_ERROR", "ATTACHED_ORDER_TRAILING_STOP_ERROR",
+    "STOP_OR_LIMIT_NOT_ALLOWED"
+}
 
 
 class MKTClient():
@@ -14,27 +35,67 @@ class MKTClient():
     methods necessary for automated trading.
     """
 
-    def __init__(self, credentials: dict):
+    def __init__(
+        self, credentials: dict, transport=None, market_index=None,
+        balance_interval=None, balance_max_staleness=30.0, token_cache=None,
+        session_lifetime=SESSION_LIFETIME, session_refresh=True, scheduler=None,
+        executor=None
+    ):
         """ 
         Connection credentials are required to authenticate with the API. 
         Credentials and API root endpoint must match the desired account type.
+        An optional Transport can be passed to control connection pooling,
+        otherwise a default keep-alive transport is created. An optional
+        MarketIndex resolves known newscodes without network calls.
+        The account balance is refreshed in the background every
+        balance_interval seconds and read synchronously only when older
+        than balance_max_staleness.
+        Session tokens are reused from an optional TokenCache when still
+        fresh and, with session_refresh, renewed in the background before
+        session_lifetime runs out.
+        Every request goes through a RequestScheduler, which enforces rate
+        limits by priority when built with limits (e.g. IG_LIMITS), and is
+        then sent by a RequestExecutor, which applies per-endpoint deadlines
+        and hedges slow reads.
         """
         self._api_key = credentials["api_key"]
         self._user_login = credentials["user_login"]
         self._password = credentials["password"]
         self._accid = credentials["accid"]
         self._root_endpoint = credentials["root_endpoint"]
-        self._login()
+        if transport is None:
+            transport = Transport(self._root_endpoint)
+        self._transport = transport
+        self._scheduler = scheduler or RequestScheduler()
+        self._executor = executor or RequestExecutor()
+        self._market_index = market_index
+        self._common_headers = {
+            "Content-Type": "application/json; charset=UTF-8",
+            "Accept": "application/json; charset=UTF-8",
+            "X-IG-API-KEY": self._api_key
+        }
         self._set_local_headers()
+        self._session_tokens = SessionTokens(
+            self, cache=token_cache, lifetime=session_lifetime
+        )
+        self._session_tokens.obtain()
+        if session_refresh:
+            self._session_tokens.start()
+        self._account_state = AccountState(
+            self, interval=balance_interval, max_staleness=balance_max_staleness
+        )
+        if balance_interval is not None:
+            self._account_state.start()
+        self._position_book = PositionBook(self)
 
     def _login(self):
         """ 
         Sends a login request using the credentials from the init.
-        Receives headers and body containing session-specific credentials
-        required to interact with the service. Sets common headers.
+        Returns the session-specific CST and X-SECURITY-TOKEN headers
+        required to interact with the service.
         """
-        response = self._post(
-            url="session",
+        response = self._request(
+            "POST", "session",
             headers={
                 "Content-Type": "application/json; charset=UTF-8",
                 "Accept": "application/json; charset=UTF-8",
@@ -44,87 +105,116 @@ class MKTClient():
             payload={
                 "identifier": self._user_login, 
                 "password": self._password
-            }
+            },
+            authenticated=False
         )
-
-        self._common_headers = {
-            "Content-Type": "application/json; charset=UTF-8",
-            "Accept": "application/json; charset=UTF-8",
-            "X-IG-API-KEY": self._api_key,
+        return {
             "X-SECURITY-TOKEN": response.headers["X-SECURITY-TOKEN"],
             "CST": response.headers["CST"]
         }
 
+    def _get_session_details(self):
+        """
+        Fetches details of the current session, e.g. the
+        lightstreamerEndpoint used for streaming.
+        """
+        response = self._get(url="session", headers=self._headers_get_session, params=None)
+        return response.json()
+
+    def _check_session(self):
+        """
+        Returns True if the service accepts the current session tokens.
+        """
+        try:
+            self._request("GET", "session", self._headers_get_session, retry_login=False)
+            return True
+        except Exception:
+            return False
+
     def _set_local_headers(self):
         """
-        Given session-specific common_headers, sets "local" headers
-        for each method by updating the API version parameter.
+        Given common_headers, sets "local" headers for each method by
+        updating the API version parameter. Session tokens are added to
+        every request by _request.
         """
+        self._headers_get_session = copy(self._common_headers)
         self._headers_search_newscode = copy(self._common_headers)
         self._headers_get_market_from_epic = copy(self._common_headers)
+        self._headers_get_markets_from_epics = copy(self._common_headers)
         self._headers_get_account_balance = copy(self._common_headers)
         self._headers_get_positions = copy(self._common_headers)
+        self._headers_get_confirmation = copy(self._common_headers)
 
+        self._headers_get_session.update({"Version": "1"})
         self._headers_search_newscode.update({"Version": "1"})
         self._headers_get_market_from_epic.update({"Version": "3"})
+        self._headers_get_markets_from_epics.update({"Version": "2"})
         self._headers_get_account_balance.update({"Version": "1"})
         self._headers_get_positions.update({"Version": "2"})
-
-    def _get(self, url, headers, params):
-        """
-        Parses the full url and sends a GET request.
-        """
-        response = requests.get(
-            url=urljoin(self._root_endpoint, url),
-            headers=headers, 
-            params=params
+        self._headers_get_confirmation.update({"Version": "1"})
+
+    def _request(
+        self, method, url, headers, params=None, payload=None,
+        authenticated=True, retry_login=True
+    ):
+        """
+        Sends a request over the pooled transport with the current session
+        tokens once the scheduler admits it, within the deadline of the
+        executor, times it per method and endpoint and raises on any
+        non-200 response (requests.exceptions.HTTPError carrying it). A
+        request rejected with 401 logs in again and is retried once with
+        the new tokens.
+        """
+        tokens = None
+        if authenticated:
+            tokens = self._session_tokens.headers
+            headers = {**headers, **tokens}
+        start = time.perf_counter_ns()
+        response = self._scheduler.run(
+            method, url,
+            lambda: self._executor.send(
+                method, url,
+                lambda timeout: self._transport.request(
+                    method, url, headers=headers, params=params, payload=payload, timeout=timeout
+                ),
+                admit=lambda: self._scheduler.try_admit(method, url)
+            ),
+            params=params, version=headers.get("Version")
         )
+        RECORDER.record(f"http.{method}.{url.split('/')[0]}", time.perf_counter_ns() - start)
+        if response.status_code == 401 and authenticated and retry_login:
+            self._session_tokens.refresh(stale=tokens)
+            return self._request(
+                method, url, headers, params=params, payload=payload, retry_login=False
+            )
         if response.status_code != 200:
             err_msg = f"Error({response.status_code}): {response.text}"
-            raise Exception(err_msg)
+            raise requests.exceptions.HTTPError(err_msg, response=response)
         return response
 
+    def _get(self, url, headers, params):
+        """
+        Sends a GET request over the pooled transport.
+        """
+        return self._request("GET", url, headers, params=params)
+
     def _post(self, url, headers, payload):
         """
-        Parses the full url and sends a POST request.
+        Sends a POST request over the pooled transport.
         """
-        response = requests.post(
-            url=urljoin(self._root_endpoint, url),
-            headers=headers, 
-            json=payload
-        )
-        if response.status_code != 200:
-            err_msg = f"Error({response.status_code}): {response.text}"
-            raise Exception(err_msg)
-        return response
+        return self._request("POST", url, headers, payload=payload)
     
     def _delete(self, url, headers, payload):
         """
-        Parses the full url and sends a DELETE request.
+        Sends a DELETE request over the pooled transport.
         """
-        response = requests.delete(
-            url=urljoin(self._root_endpoint, url),
-            headers=headers, 
-            json=payload
-        )
-        if response.status_code != 200:
-            err_msg = f"Error({response.status_code}): {response.text}"
-            raise Exception(err_msg)
-        return response
+        return self._request("DELETE", url, headers, payload=payload)
 
     def _put(self, url, headers, payload):
         """
-        Parses the full url and sends a PUT request.
+        Sends a PUT request over the pooled transport.
         """
-        response = requests.put(
-            url=urljoin(self._root_endpoint, url),
-            headers=headers, 
-            json=payload
-        )
-        if response.status_code != 200:
-            err_msg = f"Error({response.status_code}): {response.text}"
-            raise Exception(err_msg)
-        return response
+        return self._request("PUT", url, headers, payload=payload)
 
     def _get_market_from_epic(self, epic):
         """
@@ -137,7 +227,36 @@ class MKTClient():
         )
         return response_market.json()
 
+    def _get_markets_from_epics(self, epics):
+        """
+        Gets market details for a batch of epics in a single request.
+        """
+        response_markets = self._get(
+            url="markets",
+            headers=self._headers_get_markets_from_epics,
+            params={"epics": ",".join(epics)}
+        )
+        return response_markets.json()["marketDetails"]
+
     def _get_market_from_newscode(self, newscode):
+        """
+        Resolves a newscode from the market index when available,
+        otherwise searches the service and stores the result in the index.
+        Expired index entries are fetched again by their epic.
+        """
+        if self._market_index is None:
+            return self._search_market_from_newscode(newscode)
+        market = self._market_index.get(newscode)
+        if market is None:
+            epic = self._market_index.epic(newscode)
+            if epic is not None:
+                market = self._get_market_from_epic(epic)
+            else:
+                market = self._search_market_from_newscode(newscode)
+            self._market_index.put(newscode, market)
+        return market
+
+    def _search_market_from_newscode(self, newscode):
         """
         Searches service database for a key-word term. Used for finding 
         an internal "epic" identificator and details for a given newscode.
@@ -165,18 +284,37 @@ class MKTClient():
         )
         return response.json()["positions"]
 
-    def _get_position_from_deal_reference(self, deal_reference, silent_fail=False):
+    def _get_deal_confirmation(self, deal_reference):
+        """
+        Fetches the confirmation of a deal given its dealReference.
+        """
+        response = self._get(
+            url=f"confirms/{deal_reference}",
+            headers=self._headers_get_confirmation,
+            params=None
+        )
+        return response.json()
+
+    def _confirm_deal(self, deal_reference):
+        """
+        Resolves a deal through the shared position book and raises
+        if the deal was not accepted.
+        """
+        confirmation = self._position_book.confirm(deal_reference)
+        if confirmation["dealStatus"] != "ACCEPTED":
+            err_msg = f"Error({confirmation['dealStatus']}): {confirmation.get('reason')}"
+            raise Exception(err_msg)
+        return confirmation
+
+    def _get_position_from_deal_reference(self, deal_reference, silent_fail=False, max_age=0.0):
         """
-        Updates the internal attribute of open positions,
-        scans it and fetches a specific deal_reference.
+        Looks up a specific deal_reference in the shared position book,
+        refreshing the book when it is older than max_age.
         """
-        positions_list = self._get_positions()
-        match = None
-        for pos in positions_list :
-            if pos["position"]["dealReference"] == deal_reference:
-                match = pos
-                return match
-        if match is None:
+        match = self._position_book.lookup(deal_reference, max_age=max_age)
+        if match is not None:
+            return match
+        else:
             if silent_fail:
                 return None
             else:
@@ -199,21 +337,124 @@ class MKTClient():
             else:
                 pass
 
+    @request_priority(ORDER)
     def make_draft_position_from_newscode(self, newscode):
         """
         Returns a DraftPosition object populated with market
         details and local headers from the MKTClient instance.
         """
-        market = self._get_market_from_newscode(newscode)
-        return DraftPosition(self, market)
+        with RECORDER.stage("market_resolution"):
+            market = self._get_market_from_newscode(newscode)
+        with RECORDER.stage("sizing"):
+            return DraftPosition(self, market)
 
+    @request_priority(ORDER)
     def make_draft_position_from_epic(self, epic):
         """
         Returns a DraftPosition object populated with market
         details and local headers from the MKTClient instance.
         """
-        market = self._get_market_from_epic(epic)
-        return DraftPosition(self, market)
+        with RECORDER.stage("market_resolution"):
+            market = self._get_market_from_epic(epic)
+        with RECORDER.stage("sizing"):
+            return DraftPosition(self, market)
+
+    def _map_legs(self, fn, items):
+        """
+        Runs fn(item) for every newscode: item concurrently, one thread per
+        leg, and returns a BasketLeg per newscode; exceptions are captured
+        so a failing leg never stops the others.
+        """
+        def _run(newscode, item):
+            start = time.perf_counter()
+            try:
+                return BasketLeg(newscode, fn(item), None, time.perf_counter() - start)
+            except Exception as exc:
+                return BasketLeg(newscode, None, exc, time.perf_counter() - start)
+
+        with ThreadPoolExecutor(max_workers=max(len(items), 1)) as pool:
+            futures = [pool.submit(_run, newscode, item) for newscode, item in items.items()]
+            return {leg.newscode: leg for leg in (future.result() for future in futures)}
+
+    def make_draft_basket(self, newscodes, allocation_percentage=0.05, weights=None):
+        """
+        Resolves the markets of several newscodes concurrently and splits
+        allocation_percentage across the resolved ones, equally or in
+        proportion to weights (newscode: weight). A leg whose weight is not
+        a positive number fails. Every leg is sized from the same balance
+        snapshot, before any of them trades. Returns a BasketLeg per
+        newscode holding the DraftPosition or the error.
+        """
+        newscodes = list(dict.fromkeys(newscodes))
+        with RECORDER.stage("basket.market_resolution"):
+            legs = self._map_legs(
+                self.make_draft_position_from_newscode, dict(zip(newscodes, newscodes))
+            )
+        weights = weights or {}
+        resolved = []
+        for newscode, leg in legs.items():
+            if leg.error is not None:
+                continue
+            weight = weights.get(newscode, 1.0)
+            if not (weight > 0 and math.isfinite(weight)):
+                err_msg = f"Error({weight}): basket weight must be a positive number."
+                legs[newscode] = leg._replace(position=None, error=Exception(err_msg))
+                continue
+            resolved.append(newscode)
+        total_weight = sum(weights.get(newscode, 1.0) for newscode in resolved)
+        for newscode in resolved:
+            draft_position = legs[newscode].position
+            share = allocation_percentage * weights.get(newscode, 1.0) / total_weight
+            size = draft_position._calculate_position_size(share)
+            if size < draft_position._market["dealingRules"]["minDealSize"]["value"]:
+                err_msg = f"Error({size}): allocation below the minimum deal size."
+                legs[newscode] = legs[newscode]._replace(position=None, error=Exception(err_msg))
+                continue
+            draft_position._default_position_specification["size"] = size
+        return legs
+
+    def open_basket(
+        self, newscodes, trailing_stop_rules=None, exit_rules=None,
+        allocation_percentage=0.05, weights=None, all_or_none=False
+    ):
+        """
+        Shorts every target of a multi-name signal at once and returns a
+        BasketLeg per newscode holding the OpenPosition or the error.
+        Markets are resolved and sized as in make_draft_basket, then every
+        leg is opened, amended and verified on its own, concurrently, so a
+        basket takes about as long as its slowest leg. With all_or_none,
+        the opened legs are closed again if any leg failed; they then carry
+        rolled_back=True, or the rollback_error of a failed close.
+        """
+        legs = self.make_draft_basket(newscodes, allocation_percentage, weights)
+        draft_positions = {
+            newscode: leg.position for newscode, leg in legs.items() if leg.error is None
+        }
+        with RECORDER.stage("basket.execution"):
+            legs.update(self._map_legs(
+                lambda draft_position: draft_position.open_position(trailing_stop_rules, exit_rules),
+                draft_positions
+            ))
+        if all_or_none and any(leg.error is not None for leg in legs.values()):
+            closed_legs = self.close_basket({
+                newscode: leg.position for newscode, leg in legs.items() if leg.error is None
+            })
+            for newscode, closed in closed_legs.items():
+                legs[newscode] = legs[newscode]._replace(
+                    rolled_back=closed.error is None, rollback_error=closed.error
+                )
+        return legs
+
+    def close_basket(self, open_positions):
+        """
+        Closes every position concurrently. open_positions maps newscode to
+        OpenPosition.
+        """
+        def _close(open_position):
+            open_position.close_position()
+            return open_position
+
+        return self._map_legs(_close, open_positions)
 
 
 
@@ -244,11 +485,18 @@ class DraftPosition(MKTClient):
         """
         self._root_endpoint = self._mcl._root_endpoint
         self._accid = self._mcl._accid
+        self._transport = self._mcl._transport
+        self._scheduler = self._mcl._scheduler
+        self._executor = self._mcl._executor
+        self._session_tokens = self._mcl._session_tokens
+        self._account_state = self._mcl._account_state
+        self._position_book = self._mcl._position_book
 
         self._common_headers = self._mcl._common_headers
         self._headers_get_market_from_epic = self._mcl._headers_get_market_from_epic
         self._headers_get_account_balance = self._mcl._headers_get_account_balance
         self._headers_get_positions = self._mcl._headers_get_positions
+        self._headers_get_confirmation = self._mcl._headers_get_confirmation
 
     def _set_local_headers(self):
         """
@@ -262,12 +510,18 @@ class DraftPosition(MKTClient):
         self._headers_close_position.update({"Version": "1"})
         self._headers_close_position.update({"_method": "DELETE"})
 
+    def _get_available_funds(self):
+        """
+        Reads available funds from the local account snapshot kept by AccountState.
+        """
+        return self._account_state.balance()["available"]
+
     def _calculate_position_size(self, allocation_percentage=0.05):
         """
         Given margin details and last seen high price of the instrument, 
         calculates position size w.r.t. to set account balance allocation percentage.
         """
-        avaiable_funds = self._get_account_balance()["available"]
+        avaiable_funds = self._get_available_funds()
         margin_factor = self._market["instrument"]["marginFactor"]
         high = self._market["snapshot"]["high"]
         leveraged_available_funds = avaiable_funds / (margin_factor / 100.0)
@@ -294,41 +548,64 @@ class DraftPosition(MKTClient):
             "quoteId": None, "currencyCode": "USD", "expiry": "-"
         }
 
-    def _set_position_trailing_stop_rules(self, trailing_stop_rules):
+    def _make_trailing_stop_request(self, trailing_stop_rules):
         """
-        Sends a PUT request to update specification of a newly opened
-        position.
+        Converts relative trailing stop rules into the amendment request of
+        the open position, clamped to the minimum distances of the market.
         """
         level = self._position["position"]["level"]
-        min_step_distance_p = self._market["dealingRules"]["minStepDistance"]["value"]
-        min_stop_distance_pct = (
-            self._market["dealingRules"]["minNormalStopOrLimitDistance"]["value"]
+        trailing_stop_distance_p, step_distance_p = trailing_stop_distances(
+            level, trailing_stop_rules, self._market["dealingRules"]
         )
-        min_stop_distance_p = level * (min_stop_distance_pct / 100.0) + 20
-
-        our_trailing_stop_distance_pct = trailing_stop_rules["trailingStopDistance"]
-        our_step_distance_pct = trailing_stop_rules["trailingStep"]
-        our_trailing_stop_distance_p = level * our_trailing_stop_distance_pct
-        our_step_distance_p = level * our_step_distance_pct
 
         self._trailing_stop_request = {
             "trailingStop": True,
-            "trailingStopDistance": max(our_trailing_stop_distance_p, min_stop_distance_p),
-            "trailingStopIncrement": max(our_step_distance_p, min_step_distance_p),
+            "trailingStopDistance": trailing_stop_distance_p,
+            "trailingStopIncrement": step_distance_p,
             "stopLevel": trailing_stop_rules["stopLevel"] * level
             # "limitLevel": trailing_stop_rules["limitLevel"] * level
         }
+        return self._trailing_stop_request
+
+    def _make_attached_stop_request(self, trailing_stop_rules):
+        """
+        Converts relative trailing stop rules into the stop fields of the
+        opening order. Distances are computed from the cached market
+        snapshot (bid for a short) and clamped to the minimum distances of
+        the market; IG takes a trailing stop at open as a distance, so the
+        absolute stopLevel rule only applies to amended stops.
+        """
+        snapshot = self._market["snapshot"]
+        direction = self._default_position_specification["direction"]
+        level = snapshot["bid"] if direction == "SELL" else snapshot["offer"]
+        stop_distance_p, step_distance_p = trailing_stop_distances(
+            level, trailing_stop_rules, self._market["dealingRules"]
+        )
+        self._attached_stop_request = {
+            "trailingStop": True,
+            "stopDistance": stop_distance_p,
+            "trailingStopIncrement": step_distance_p,
+            "stopLevel": None
+        }
+        return self._attached_stop_request
 
+    def _set_position_trailing_stop_rules(self, trailing_stop_rules):
+        """
+        Sends a PUT request to update specification of a newly opened
+        position.
+        """
+        self._make_trailing_stop_request(trailing_stop_rules)
         response = self._put(
             url=urljoin("positions/", f"otc/{self._position['position']['dealId']}"),
             headers=self._headers_manage_position,
             payload=self._trailing_stop_request
         )
 
-    def _check_position_specification(self):
+    def _find_specification_mismatch(self):
         """
-        Verifies the parameters of an open position match the specification
-        provided at the position opening.
+        Compares the parameters of an open position with the specification
+        provided at the position opening. Returns the mismatching parameter
+        or False.
         """
         requested_specification = {
             **self._default_position_specification, 
@@ -351,29 +628,160 @@ class DraftPosition(MKTClient):
             != executed_specification["trailingStep"]
         ):
             err = param
+        return err
+
+    def _find_confirmation_mismatch(self, confirmation, specification):
+        """
+        Compares an accepted deal confirmation with the specification of
+        the opening order, allowing the broker to round the stop distance.
+        Returns the mismatching parameter or False.
+        """
+        err = False
+        for param in ["size", "direction", "epic"]:
+            if specification[param] != confirmation[param]:
+                err = param
+        if specification["trailingStop"]:
+            if not confirmation.get("trailingStop"):
+                err = "trailingStop"
+            elif confirmation.get("stopDistance") is not None and not math.isclose(
+                confirmation["stopDistance"], specification["stopDistance"], rel_tol=0.01
+            ):
+                err = "stopDistance"
+            elif confirmation.get("stopDistance") is None and confirmation.get("stopLevel") is None:
+                err = "stopDistance"
+        return err
+
+    def _position_from_confirmation(self, confirmation, specification):
+        """
+        Builds the /positions entry of a position opened with attached
+        stops from its deal confirmation and the cached market.
+        """
+        snapshot = self._market["snapshot"]
+        return {
+            "position": {
+                "createdDate": confirmation.get("date"),
+                "dealId": confirmation["dealId"],
+                "dealReference": confirmation["dealReference"],
+                "size": confirmation["size"],
+                "direction": confirmation["direction"],
+                "level": confirmation["level"],
+                "currency": specification["currencyCode"],
+                "controlledRisk": False,
+                "stopLevel": confirmation.get("stopLevel"),
+                "limitLevel": confirmation.get("limitLevel"),
+                "trailingStep": specification["trailingStopIncrement"],
+                "trailingStopDistance": confirmation.get("stopDistance")
+            },
+            "market": {
+                "epic": confirmation["epic"],
+                "instrumentName": self._market["instrument"]["name"],
+                "expiry": specification["expiry"],
+                "marketStatus": snapshot["marketStatus"],
+                "bid": snapshot["bid"],
+                "offer": snapshot["offer"],
+                "high": snapshot["high"],
+                "low": snapshot["low"]
+            }
+        }
 
+    def _submit_deal(self, specification):
+        """
+        Sends an opening order under a client-side dealReference and
+        returns the reference. If the POST gets no answer within its
+        deadline or fails with a server error (5xx), the order may still
+        have been executed, so instead of submitting it again its
+        confirmation is polled until IG knows the deal; an order never
+        seen within confirm_timeout raises and was not placed. A client
+        error (4xx) means the order was refused and is raised at once.
+        """
+        deal_reference = specification.get("dealReference") or new_deal_reference()
+        try:
+            response = self._post(
+                url=urljoin("positions/", "otc"),
+                headers=self._headers_manage_position,
+                payload={**specification, "dealReference": deal_reference}
+            )
+            return response.json()["dealReference"]
+        except requests.exceptions.RequestException as exc:
+            if exc.response is not None and exc.response.status_code < 500:
+                raise
+            with RECORDER.stage("deal_resolution"):
+                deadline = time.monotonic() + self._executor.confirm_timeout
+                while True:
+                    try:
+                        self._get_deal_confirmation(deal_reference)
+                        return deal_reference
+                    except Exception:
+                        if time.monotonic() >= deadline:
+                            err_msg = f"Error(timeout): order {deal_reference} unconfirmed, not resubmitted."
+                            raise Exception(err_msg)
+                        time.sleep(self._executor.confirm_interval)
+        finally:
+            self._account_state.notify_deal()
+
+    def _open_with_attached_stops(self, trailing_stop_rules, exit_rules):
+        """
+        Opens the position with its trailing stop in the opening order and
+        verifies it from the deal confirmation: two requests, and the
+        position is never open without its stop. Returns None, with
+        nothing opened, if the broker rejected the attached stop.
+        """
+        specification = dict(self._default_position_specification)
+        if trailing_stop_rules is not None:
+            specification.update(self._make_attached_stop_request(trailing_stop_rules))
+        with RECORDER.stage("order_post"):
+            deal_reference = self._submit_deal(specification)
+            confirmation = self._position_book.confirm(deal_reference)
+        if confirmation["dealStatus"] != "ACCEPTED":
+            if confirmation.get("reason") in ATTACHED_STOP_REJECTIONS:
+                return None
+            err_msg = f"Error({confirmation['dealStatus']}): {confirmation.get('reason')}"
+            raise Exception(err_msg)
+        with RECORDER.stage("verification"):
+            self._position = self._position_book.add(
+                self._position_from_confirmation(confirmation, specification)
+            )
+            err = self._find_confirmation_mismatch(confirmation, specification)
+            if err:
+                self.close_position()
+                raise Exception(f"Position closed due to param mismatch: {err}.")
+        return OpenPosition(self, exit_rules=exit_rules)
+
+    def _check_position_specification(self):
+        """
+        Verifies the parameters of an open position match the specification
+        provided at the position opening. Closes the position otherwise.
+        """
+        err = self._find_specification_mismatch()
         if err:
             self.close_position()
             raise Exception(f"Position closed due to param mismatch: {err}.")
 
-    def open_position(self, trailing_stop_rules=None, exit_rules=None):
+    @request_priority(ORDER)
+    def open_position(self, trailing_stop_rules=None, exit_rules=None, attach_stops=True):
         """
         Opens a position with given parameters provided in position specification. 
-        Verifies the successful opening by looking up the returned dealReference in 
-        the list of open positions. Returns an OpenPosition object.
-        """
-        response = self._post(
-            url=urljoin("positions/", "otc"),
-            headers=self._headers_manage_position,
-            payload=self._default_position_specification
-        )
-        deal_reference = response.json()["dealReference"]
-        self._position = self._get_position_from_deal_reference(deal_reference)
-        self._set_position_trailing_stop_rules(trailing_stop_rules)
-        self._position = self._get_position_from_deal_reference(deal_reference)
-        self._check_position_specification()
+        With attach_stops, the trailing stop is sent with the opening order and
+        checked against the deal confirmation. Otherwise, or if the broker rejects
+        the attached stop, the bare position is opened, its stop amended and the
+        result verified in the shared position book. Returns an OpenPosition object.
+        """
+        if attach_stops:
+            open_position = self._open_with_attached_stops(trailing_stop_rules, exit_rules)
+            if open_position is not None:
+                return open_position
+        with RECORDER.stage("order_post"):
+            deal_reference = self._submit_deal(self._default_position_specification)
+            self._confirm_deal(deal_reference)
+            self._position = self._get_position_from_deal_reference(deal_reference)
+        with RECORDER.stage("stop_put"):
+            self._set_position_trailing_stop_rules(trailing_stop_rules)
+        with RECORDER.stage("verification"):
+            self._position = self._get_position_from_deal_reference(deal_reference)
+            self._check_position_specification()
         return OpenPosition(self, exit_rules=exit_rules)
 
+    @request_priority(ORDER)
     def close_position(self):
         """
         Closes the position.
@@ -389,8 +797,9 @@ class DraftPosition(MKTClient):
             }
         )
         deal_reference = response.json()["dealReference"]
-        position = self._get_position_from_deal_reference(deal_reference, True)
-        if position is not None:
+        self._account_state.notify_deal()
+        confirmation = self._position_book.confirm(deal_reference)
+        if confirmation["dealStatus"] != "ACCEPTED":
             err_msg = f"Error: position failed to close."
             raise Exception(err_msg)
 
@@ -410,6 +819,7 @@ class OpenPosition(DraftPosition):
         self._market = self._dp._market
         self._position = self._dp._position
         self._exit_rules = exit_rules
+        self._stream = None
         self._inherit_headers()
         self._set_local_headers()
 
@@ -419,14 +829,42 @@ class OpenPosition(DraftPosition):
         """
         self._root_endpoint = self._dp._root_endpoint
         self._accid = self._dp._accid
+        self._transport = self._dp._transport
+        self._scheduler = self._dp._scheduler
+        self._executor = self._dp._executor
+        self._session_tokens = self._dp._session_tokens
+        self._account_state = self._dp._account_state
+        self._position_book = self._dp._position_book
         self._common_headers = self._dp._common_headers
         self._headers_manage_position = self._dp._headers_manage_position
         self._headers_get_positions = self._dp._headers_get_positions
         self._headers_close_position = self._dp._headers_close_position
 
+    @request_priority(MONITOR)
     def _update_position_state(self):
         """
         Calls position from reference and updates self._position state.
-        """
+        Lookups within the book's min_interval share a single refresh.
+        Positions tracked by a connected IGStream are read from the book
+        without polling.
+        """
+        if self._stream is not None and self._stream.connected:
+            position = self._position_book.get_by_deal_id(self._position["position"]["dealId"])
+            if position is not None:
+                self._position = position
+                return
         deal_reference = self._position["position"]["dealReference"]
-        self._position = self._get_position_from_deal_reference(deal_reference)
+        self._position = self._get_position_from_deal_reference(
+            deal_reference, max_age=self._position_book._min_interval
+        )
+
+    def monitor(self, interval=1.0, stream=None):
+        """
+        Monitors this position alone until its exit rules are hit or it
+        is closed elsewhere, from pushed updates if an IGStream is given.
+        Use PortfolioMonitor for many positions.
+        """
+        from .monitor import PortfolioMonitor
+        portfolio_monitor = PortfolioMonitor(self._dp._mcl, interval=interval, stream=stream)
+        portfolio_monitor.add(self)
+        portfolio_monitor.run()
@@ -0,0 +1,431 @@
+#
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from copy import deepcopy
+import threading
+import random
+import json
+import time
+import secrets
+import sys
+
+
+ROOT_PATH = "/gateway/deal/"
+
+
+def make_market(epic, newscode, bid=100.0, offer=100.1, margin_factor=20):
+    """
+    Builds a markets/{epic} style document for the mock server.
+    """
+    return {
+        "instrument": {
+            "epic": epic,
+            "name": newscode,
+            "newsCode": newscode,
+            "marginFactor": margin_factor,
+            "marginFactorUnit": "PERCENTAGE",
+            "currencies": [{"code": "USD"}]
+        },
+        "dealingRules": {
+            "minStepDistance": {"unit": "POINTS", "value": 1.0},
+            "minNormalStopOrLimitDistance": {"unit": "PERCENTAGE", "value": 2.0},
+            "minDealSize": {"unit": "POINTS", "value": 1.0}
+        },
+        "snapshot": {
+            "marketStatus": "TRADEABLE",
+            "bid": bid,
+            "offer": offer,
+            "high": offer,
+            "low": bid,
+            "updateTime": "00:00:00"
+        }
+    }
+
+
+class MockIGState():
+    """
+    In-memory accounts, markets and positions served by the mock.
+    """
+
+    def __init__(self, markets=None, accid="ACC01", available=10000.0):
+        self.lock = threading.Lock()
+        self.accid = accid
+        self.markets = {}
+        for market in (markets or [make_market("UA.D.BTC.CASH.IP", "BTC")]):
+            self.markets[market["instrument"]["epic"]] = market
+        self.balance = {
+            "balance": available, "deposit": 0.0,
+            "profitLoss": 0.0, "available": available
+        }
+        self.positions = {}
+        self.confirms = {}
+        self.sessions = {}
+        self.logins = 0
+        self.listeners = []
+        self.lightstreamer_endpoint = None
+
+    def publish(self, item, values):
+        """
+        Passes an update of a streaming item (e.g. "MARKET:{epic}") to the
+        listeners, i.e. the mock streaming server.
+        """
+        for listener in list(self.listeners):
+            listener(item, values)
+
+    def _publish_trade(self, deal_reference, status):
+        confirmation = self.confirms[deal_reference]
+        opu = {
+            "dealReference": deal_reference,
+            "dealId": confirmation["dealId"],
+            "dealStatus": confirmation["dealStatus"],
+            "status": status,
+            **{
+                key: confirmation[key]
+                for key in ["epic", "level", "size", "direction", "stopLevel", "limitLevel"]
+            }
+        }
+        self.publish(f"TRADE:{self.accid}", {
+            "CONFIRMS": json.dumps(confirmation), "OPU": json.dumps(opu)
+        })
+
+    def set_price(self, epic, bid, offer):
+        """
+        Moves the market of epic and the positions on it, and streams the
+        new prices.
+        """
+        with self.lock:
+            snapshot = self.markets[epic]["snapshot"]
+            snapshot.update({
+                "bid": bid, "offer": offer,
+                "high": max(snapshot["high"], offer), "low": min(snapshot["low"], bid),
+                "updateTime": time.strftime("%H:%M:%S")
+            })
+            for position in self.positions.values():
+                if position["market"]["epic"] == epic:
+                    position["market"].update({
+                        key: snapshot[key] for key in ["bid", "offer", "high", "low"]
+                    })
+        self.publish(f"MARKET:{epic}", self.market_values(epic))
+
+    def market_values(self, epic):
+        snapshot = self.markets[epic]["snapshot"]
+        return {
+            "BID": snapshot["bid"], "OFFER": snapshot["offer"],
+            "HIGH": snapshot["high"], "LOW": snapshot["low"],
+            "MARKET_STATE": snapshot["marketStatus"], "UPDATE_TIME": snapshot["updateTime"]
+        }
+
+    def login(self):
+        cst, token = secrets.token_hex(16), secrets.token_hex(16)
+        with self.lock:
+            self.sessions[cst] = token
+            self.logins += 1
+        return {"CST": cst, "X-SECURITY-TOKEN": token}
+
+    def authenticated(self, headers):
+        cst = headers.get("CST")
+        return cst is not None and self.sessions.get(cst) == headers.get("X-SECURITY-TOKEN")
+
+    def expire_sessions(self):
+        """
+        Invalidates every issued token, as after an expiry on the IG side.
+        """
+        with self.lock:
+            self.sessions = {}
+
+    def confirm(self, deal_reference, deal_id, status, affected_status, position=None, reason="SUCCESS"):
+        position = position or {}
+        self.confirms[deal_reference] = {
+            "dealReference": deal_reference,
+            "dealId": deal_id,
+            "dealStatus": "ACCEPTED" if reason == "SUCCESS" else "REJECTED",
+            "status": status,
+            "reason": reason,
+            "epic": position.get("epic"),
+            "level": position.get("level"),
+            "size": position.get("size"),
+            "direction": position.get("direction"),
+            "stopLevel": position.get("stopLevel"),
+            "limitLevel": position.get("limitLevel"),
+            "stopDistance": position.get("trailingStopDistance"),
+            "trailingStop": position.get("trailingStopDistance") is not None,
+            "affectedDeals": [{"dealId": deal_id, "status": affected_status}]
+        }
+
+    def open_position(self, spec):
+        market = self.markets[spec["epic"]]
+        deal_reference = spec.get("dealReference") or secrets.token_hex(8).upper()
+        deal_id = "DIAAAA" + secrets.token_hex(6).upper()
+        level = market["snapshot"]["bid"]
+        min_stop_distance_pct = market["dealingRules"]["minNormalStopOrLimitDistance"]["value"]
+        if spec.get("stopDistance") is not None and spec["stopDistance"] < level * min_stop_distance_pct / 100.0:
+            with self.lock:
+                self.confirm(deal_reference, None, None, "REJECTED", reason="ATTACHED_ORDER_LEVEL_ERROR")
+            return deal_reference
+        position = {
+            "position": {
+                "contractSize": 1.0,
+                "createdDate": time.strftime("%Y/%m/%d %H:%M:%S:000"),
+                "dealId": deal_id,
+                "dealReference": deal_reference,
+                "size": spec["size"],
+                "direction": spec["direction"],
+                "level": level,
+                "currency": spec.get("currencyCode", "USD"),
+                "controlledRisk": False,
+                "stopLevel": spec.get("stopLevel"),
+                "limitLevel": spec.get("limitLevel"),
+                "trailingStep": spec.get("trailingStopIncrement"),
+                "trailingStopDistance": spec.get("stopDistance")
+            },
+            "market": {
+                "epic": spec["epic"],
+                "instrumentName": market["instrument"]["name"],
+                "expiry": "-",
+                "marketStatus": market["snapshot"]["marketStatus"],
+                "bid": market["snapshot"]["bid"],
+                "offer": market["snapshot"]["offer"],
+                "high": market["snapshot"]["high"],
+                "low": market["snapshot"]["low"]
+            }
+        }
+        with self.lock:
+            self.positions[deal_id] = position
+            self.confirm(
+                deal_reference, deal_id, "OPEN", "OPENED",
+                {**position["position"], "epic": spec["epic"]}
+            )
+        self._publish_trade(deal_reference, "OPEN")
+        return deal_reference
+
+    def close_position(self, spec):
+        deal_reference = secrets.token_hex(8).upper()
+        with self.lock:
+            closed = self.positions.pop(spec["dealId"], None)
+            if closed is None:
+                self.confirm(deal_reference, spec["dealId"], None, "UNKNOWN", reason="UNKNOWN")
+            else:
+                self.confirm(
+                    deal_reference, spec["dealId"], "CLOSED", "FULLY_CLOSED",
+                    {**closed["position"], "epic": closed["market"]["epic"]}
+                )
+        if closed is not None:
+            self._publish_trade(deal_reference, "DELETED")
+        return deal_reference
+
+    def amend_position(self, deal_id, spec):
+        with self.lock:
+            position = self.positions[deal_id]["position"]
+            position["stopLevel"] = spec.get("stopLevel")
+            position["limitLevel"] = spec.get("limitLevel")
+            position["trailingStopDistance"] = spec.get("trailingStopDistance")
+            position["trailingStep"] = spec.get("trailingStopIncrement")
+            deal_reference = secrets.token_hex(8).upper()
+            self.confirm(
+                deal_reference, deal_id, "AMENDED", "AMENDED",
+                {**position, "epic": self.positions[deal_id]["market"]["epic"]}
+            )
+        self._publish_trade(deal_reference, "UPDATED")
+        return deal_reference
+
+
+class MockIGHandler(BaseHTTPRequestHandler):
+    """
+    Implements the subset of the IG REST API used by MKTClient.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+    _stall = 0.0
+
+    def setup(self):
+        super().setup()
+        # Emulates the TCP+TLS setup cost paid by every new connection.
+        if self.server.handshake_delay:
+            time.sleep(self.server.handshake_delay)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        if self._stall:
+            time.sleep(self._stall)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _read_payload(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length))
+
+    def _route(self):
+        url = urlparse(self.path)
+        path = url.path
+        if path.startswith(ROOT_PATH):
+            path = path[len(ROOT_PATH):]
+        return path.strip("/"), parse_qs(url.query)
+
+    def _handle(self):
+        path, query = self._route()
+        payload = self._read_payload()
+        state = self.server.state
+        method = self.command
+        if method == "POST" and self.headers.get("_method") == "DELETE":
+            method = "DELETE"
+        endpoint = f"{method} {path.split('/')[0]}"
+        delay = self.server.latency_for(endpoint)
+        if delay:
+            time.sleep(delay)
+        self._stall = 0.0
+        if random.random() < self.server.lookup(self.server.stall_rate, endpoint):
+            self._stall = self.server.lookup(self.server.stall, endpoint)
+        if random.random() < self.server.lookup(self.server.error_rate, endpoint):
+            return self._send(500, {"errorCode": "error.mock.injected"})
+
+        if path == "session" and method == "POST":
+            return self._send(200, {
+                "currentAccountId": state.accid,
+                "lightstreamerEndpoint": state.lightstreamer_endpoint
+            }, state.login())
+        if not state.authenticated(self.headers):
+            return self._send(401, {"errorCode": "error.security.client-token-invalid"})
+        if path == "session" and method == "GET":
+            return self._send(200, {
+                "clientId": "mock", "accountId": state.accid,
+                "lightstreamerEndpoint": state.lightstreamer_endpoint
+            })
+        if path == "markets" and method == "GET" and "epics" in query:
+            epics = query["epics"][0].split(",")
+            found = [state.markets[epic] for epic in epics if epic in state.markets]
+            return self._send(200, {"marketDetails": found})
+        if path == "markets" and method == "GET":
+            term = query.get("searchTerm", [""])[0]
+            found = [
+                {"epic": epic, "instrumentName": market["instrument"]["name"]}
+                for epic, market in state.markets.items()
+                if market["instrument"]["newsCode"] == term
+            ]
+            return self._send(200, {"markets": found})
+        if path.startswith("markets/") and method == "GET":
+            market = state.markets.get(path[len("markets/"):])
+            if market is None:
+                return self._send(404, {"errorCode": "error.service.marketdata.instrument.epic.unavailable"})
+            return self._send(200, market)
+        if path == "accounts" and method == "GET":
+            return self._send(200, {"accounts": [
+                {"accountId": state.accid, "balance": dict(state.balance)}
+            ]})
+        if path.startswith("confirms/") and method == "GET":
+            confirmation = state.confirms.get(path[len("confirms/"):])
+            if confirmation is None:
+                return self._send(404, {"errorCode": "error.confirms.deal-not-found"})
+            return self._send(200, confirmation)
+        if path == "positions" and method == "GET":
+            with state.lock:
+                positions = deepcopy(list(state.positions.values()))
+            return self._send(200, {"positions": positions})
+        if path == "positions/otc" and method == "POST":
+            return self._send(200, {"dealReference": state.open_position(payload)})
+        if path == "positions/otc" and method == "DELETE":
+            return self._send(200, {"dealReference": state.close_position(payload)})
+        if path.startswith("positions/otc/") and method == "PUT":
+            deal_reference = state.amend_position(path[len("positions/otc/"):], payload)
+            return self._send(200, {"dealReference": deal_reference})
+        return self._send(404, {"errorCode": "error.mock.unknown-endpoint"})
+
+    def do_HEAD(self):
+        self._send(200)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_PUT(self):
+        self._handle()
+
+    def do_DELETE(self):
+        self._handle()
+
+
+class MockIGServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the IG REST API. latency is added to every request
+    and handshake_delay to every new connection.
+
+    latency, latency_jitter and error_rate are either a number applied to
+    every endpoint or a dict keyed by "METHOD segment" (e.g. "POST positions"),
+    "segment" (e.g. "markets") or "default". latency_jitter adds a uniform
+    random delay on top of latency; error_rate is the probability of an
+    injected HTTP 500. stall_rate and stall (same forms) inject slow tails:
+    with probability stall_rate a response is held for stall seconds after
+    the request took effect, as when IG is slow to answer an order.
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(
+        self, host="127.0.0.1", port=0, latency=0.0, handshake_delay=0.0,
+        state=None, latency_jitter=0.0, error_rate=0.0, stall_rate=0.0, stall=0.0
+    ):
+        super().__init__((host, port), MockIGHandler)
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.handshake_delay = handshake_delay
+        self.state = state or MockIGState()
+        self._thread = None
+
+    @staticmethod
+    def lookup(setting, endpoint):
+        if not isinstance(setting, dict):
+            return setting
+        for key in [endpoint, endpoint.split(" ")[1], "default"]:
+            if key in setting:
+                return setting[key]
+        return 0.0
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up on a stalled response have closed the connection
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def latency_for(self, endpoint):
+        jitter = self.lookup(self.latency_jitter, endpoint)
+        return self.lookup(self.latency, endpoint) + (random.uniform(0, jitter) if jitter else 0.0)
+
+    @property
+    def root_endpoint(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{ROOT_PATH}"
+
+    def credentials(self):
+        """
+        Returns a credentials dict accepted by MKTClient.
+        """
+        return {
+            "api_key": "mock", "user_login": "mock", "password": "mock",
+            "accid": self.state.accid, "root_endpoint": self.root_endpoint
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,190 @@
+#
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+import threading
+import secrets
+import queue
+
+LS_PATH = "/lightstreamer/"
+# Characters left as is in encoded values; "|", "%", "#", "$" and "^" are escaped
+SAFE_CHARS = " !\"&'()*+,-./:;<=>?@[\\]_`{}~"
+
+
+def encode_value(value):
+    if value is None:
+        return "#"
+    if value == "":
+        return "$"
+    return quote(str(value), safe=SAFE_CHARS)
+
+
+class MockLightstreamerHandler(BaseHTTPRequestHandler):
+    """
+    Serves create_session.txt (the chunked update stream) and control.txt
+    (add, delete and destroy) of the TLCP text protocol.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _form(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode() if length else ""
+        return {key: values[0] for key, values in parse_qs(body).items()}
+
+    def _reply(self, text):
+        body = text.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/enriched; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        form = self._form()
+        if url.path == LS_PATH + "create_session.txt":
+            return self._stream(form)
+        if url.path == LS_PATH + "control.txt":
+            return self._reply(self.server.control(query.get("LS_session"), form) + "\r\n")
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _write(self, line):
+        chunk = line.encode() + b"\r\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.flush()
+
+    def _stream(self, form):
+        server = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/enriched; charset=UTF-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.close_connection = True
+        if not server.authenticate(form.get("LS_user"), form.get("LS_password")):
+            self._write("CONERR,1,Invalid credentials")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        keepalive = int(form.get("LS_keepalive_millis", 5000))
+        session_id, lines = server._open_session()
+        try:
+            self._write(f"CONOK,{session_id},50000,{keepalive},*")
+            while True:
+                try:
+                    line = lines.get(timeout=keepalive / 1000.0)
+                except queue.Empty:
+                    line = "KALIVE"
+                if line is None:
+                    self._write("END,31,closed")
+                    return
+                self._write(line)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            server._close_session(session_id)
+
+
+class MockLightstreamerServer(ThreadingHTTPServer):
+    """
+    Local stand-in for IG's streaming endpoint. Updates published by a
+    MockIGState (prices set with set_price, position opens, amendments and
+    closes) are pushed to the subscribed MARKET and TRADE items. The
+    password must carry tokens issued by the mock IG server.
+    """
+
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, state, host="127.0.0.1", port=0):
+        super().__init__((host, port), MockLightstreamerHandler)
+        self.state = state
+        self._lock = threading.Lock()
+        self._sessions = {}
+        state.listeners.append(self.publish)
+        state.lightstreamer_endpoint = self.endpoint
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def authenticate(self, user, password):
+        tokens = dict(part.split("-", 1) for part in (password or "").split("|") if "-" in part)
+        return user == self.state.accid and self.state.authenticated({
+            "CST": tokens.get("CST"), "X-SECURITY-TOKEN": tokens.get("XST")
+        })
+
+    def _open_session(self):
+        session_id = "S" + secrets.token_hex(8)
+        with self._lock:
+            self._sessions[session_id] = {"lines": queue.Queue(), "subscriptions": {}}
+            return session_id, self._sessions[session_id]["lines"]
+
+    def _close_session(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def control(self, session_id, form):
+        request_id = form.get("LS_reqId")
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            return f"REQERR,{request_id},20,Session not found"
+        op = form.get("LS_op")
+        if op == "destroy":
+            session["lines"].put(None)
+        elif op == "delete":
+            session["subscriptions"].pop(form["LS_subId"], None)
+            session["lines"].put(f"UNSUB,{form['LS_subId']}")
+        elif op == "add":
+            items = form["LS_group"].split(" ")
+            fields = form["LS_schema"].split(" ")
+            session["subscriptions"][form["LS_subId"]] = (items, fields)
+            session["lines"].put(f"SUBOK,{form['LS_subId']},{len(items)},{len(fields)}")
+            if form.get("LS_snapshot") == "true":
+                for index, item in enumerate(items):
+                    if item.startswith("MARKET:") and item[7:] in self.state.markets:
+                        session["lines"].put(self._update(
+                            form["LS_subId"], index, fields, self.state.market_values(item[7:])
+                        ))
+        else:
+            return f"REQERR,{request_id},15,Unsupported operation"
+        return f"REQOK,{request_id}"
+
+    @staticmethod
+    def _update(sub_id, index, fields, values):
+        return f"U,{sub_id},{index + 1}," + "|".join(
+            encode_value(values.get(field)) if field in values else "" for field in fields
+        )
+
+    def publish(self, item, values):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            for sub_id, (items, fields) in list(session["subscriptions"].items()):
+                if item in items:
+                    session["lines"].put(self._update(sub_id, items.index(item), fields, values))
+
+    def drop(self):
+        """
+        Ends every open session, which makes clients reconnect.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            session["lines"].put(None)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.drop()
+        self.shutdown()
+        self.server_close()
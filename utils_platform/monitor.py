@@ -0,0 +1,168 @@
+#
+from .scheduler import request_priority, MONITOR
+import numpy as np
+import time
+
+
+class PortfolioMonitor():
+    """
+    Monitors every open position of one MKTClient. Each tick makes a
+    single position book refresh and evaluates exit and trailing rules
+    for the whole book at once on NumPy arrays.
+
+    Supported exit_rules (fractions of the entry level, missing = off):
+        "stopLoss", "takeProfit", "trailingStopDistance", "trailingStep",
+        "maxHoldingTime" (seconds).
+
+    With a connected IGStream the book is kept current by pushed prices
+    and position updates, so ticks make no requests and run() wakes up on
+    every update instead of sleeping a full interval. The book is still
+    refreshed every reconcile_interval seconds, in case an update was lost.
+    """
+
+    _rule_names = [
+        "stopLoss", "takeProfit", "trailingStopDistance",
+        "trailingStep", "maxHoldingTime"
+    ]
+
+    def __init__(self, mclient, interval=1.0, stream=None, reconcile_interval=30.0):
+        self._mcl = mclient
+        self._position_book = mclient._position_book
+        self._interval = interval
+        self._reconcile_interval = reconcile_interval
+        self._stream = stream
+        self._open_positions = []
+        self._deal_ids = []
+        self._sign = np.empty(0)
+        self._entry = np.empty(0)
+        self._best = np.empty(0)
+        self._stop = np.empty(0)
+        self._pnl = np.empty(0)
+        self._opened_at = np.empty(0)
+        self._rules = np.empty((0, len(self._rule_names)))
+
+    def __len__(self):
+        return len(self._open_positions)
+
+    def add(self, open_position):
+        """
+        Starts tracking an OpenPosition using its exit_rules.
+        """
+        position = open_position._position["position"]
+        exit_rules = open_position._exit_rules or {}
+        sign = 1.0 if position["direction"] == "BUY" else -1.0
+        entry = float(position["level"])
+        rules = [
+            np.nan if exit_rules.get(name) is None else float(exit_rules[name])
+            for name in self._rule_names
+        ]
+        stop_loss = rules[0]
+        self._open_positions.append(open_position)
+        self._deal_ids.append(position["dealId"])
+        self._sign = np.append(self._sign, sign)
+        self._entry = np.append(self._entry, entry)
+        self._best = np.append(self._best, sign * entry)
+        self._stop = np.append(
+            self._stop, -np.inf if np.isnan(stop_loss) else sign * entry - stop_loss * entry
+        )
+        self._pnl = np.append(self._pnl, 0.0)
+        self._opened_at = np.append(self._opened_at, time.time())
+        self._rules = np.vstack([self._rules, rules])
+        if self._stream is not None:
+            self._stream.track(open_position)
+
+    def _keep(self, mask):
+        self._open_positions = [p for p, k in zip(self._open_positions, mask) if k]
+        self._deal_ids = [d for d, k in zip(self._deal_ids, mask) if k]
+        for name in ["_sign", "_entry", "_best", "_stop", "_pnl", "_opened_at", "_rules"]:
+            setattr(self, name, getattr(self, name)[mask])
+
+    @request_priority(MONITOR)
+    def _collect_prices(self):
+        """
+        Refreshes the position book once and returns the closing price of
+        each tracked position (offer for shorts, bid for longs), NaN when
+        there is no quote (market closed or halted), and a boolean mask of
+        positions no longer in the book.
+        """
+        max_age = self._position_book._min_interval
+        if self._stream is not None and self._stream.connected:
+            max_age = self._reconcile_interval
+        self._position_book.refresh(max_age=max_age)
+        prices = np.full(len(self), np.nan)
+        missing = np.zeros(len(self), dtype=bool)
+        for i, deal_id in enumerate(self._deal_ids):
+            pos = self._position_book.get_by_deal_id(deal_id)
+            if pos is None:
+                missing[i] = True
+                continue
+            self._open_positions[i]._position = pos
+            side = "bid" if self._sign[i] > 0 else "offer"
+            if pos["market"][side] is not None:
+                prices[i] = pos["market"][side]
+        return prices, missing
+
+    def evaluate(self, prices, now=None):
+        """
+        Updates trailing state with the given closing prices and returns
+        a boolean mask of positions whose exit rules are hit.
+        """
+        now = time.time() if now is None else now
+        stop_loss, take_profit, trailing_distance, trailing_step, max_holding = self._rules.T
+        x = self._sign * prices
+        step = np.where(np.isnan(trailing_step), 0.0, trailing_step) * self._entry
+        improved = x - self._best >= step
+        self._best = np.where(improved, x, self._best)
+        trailing_stop = self._best - trailing_distance * np.abs(self._best)
+        self._stop = np.where(
+            np.isnan(trailing_stop), self._stop, np.maximum(self._stop, trailing_stop)
+        )
+        self._pnl = (x - self._sign * self._entry) / self._entry
+        with np.errstate(invalid="ignore"):
+            exit_mask = (
+                (x <= self._stop)
+                | (self._pnl >= take_profit)
+                | (now - self._opened_at >= max_holding)
+            )
+        return exit_mask & ~np.isnan(prices)
+
+    def tick(self):
+        """
+        Runs one monitoring step: refresh, evaluate, close positions
+        hitting their exit rules and drop positions closed elsewhere.
+        Positions without a quote are kept, and so are positions whose
+        close failed, which is retried on the next tick. A failed refresh
+        leaves every position tracked and is retried on the next tick as
+        well. Returns the list of positions closed by the monitor.
+        """
+        if not len(self):
+            return []
+        try:
+            prices, missing = self._collect_prices()
+        except Exception as exc:
+            print(f"Refreshing positions failed, retrying next tick: {exc}")
+            return []
+        exit_mask = self.evaluate(prices)
+        closed = []
+        done = missing.copy()
+        for i in np.flatnonzero(exit_mask & ~missing):
+            try:
+                self._open_positions[i].close_position()
+            except Exception as exc:
+                print(f"Closing {self._deal_ids[i]} failed, retrying next tick: {exc}")
+                continue
+            closed.append(self._open_positions[i])
+            done[i] = True
+        self._keep(~done)
+        return closed
+
+    def run(self):
+        """
+        Ticks every interval seconds until no position is left.
+        """
+        while len(self):
+            self.tick()
+            if self._stream is not None and self._stream.connected:
+                self._stream.wait_update(self._interval)
+            else:
+                time.sleep(self._interval)
@@ -0,0 +1,160 @@
+#
+import threading
+import time
+
+# Position fields carried by streamed open position updates (OPU)
+OPU_FIELDS = ["level", "size", "direction", "stopLevel", "limitLevel", "trailingStopDistance"]
+# Streamed MARKET fields and their name in the market part of a position
+PRICE_FIELDS = {"BID": "bid", "OFFER": "offer", "HIGH": "high", "LOW": "low", "MARKET_STATE": "marketStatus"}
+
+
+class PositionBook():
+    """
+    Local book of open positions indexed by dealReference and dealId.
+    Shared by all positions derived from one MKTClient, so a single
+    /positions refresh serves every lookup made within min_interval.
+    """
+
+    def __init__(self, mclient, min_interval=0.5):
+        """
+        min_interval is the age (seconds) below which the book is
+        considered fresh enough for monitoring lookups.
+        """
+        self._mcl = mclient
+        self._min_interval = min_interval
+        self._lock = threading.Lock()
+        self._by_deal_id = {}
+        self._reference_to_deal_id = {}
+        self._confirmations = {}
+        self._refreshed_at = None
+
+    def age(self):
+        if self._refreshed_at is None:
+            return None
+        return time.monotonic() - self._refreshed_at
+
+    def refresh(self, max_age=0.0):
+        """
+        Fetches /positions unless the book is younger than max_age, then
+        applies the difference: new positions are stored, known ones are
+        updated in place, so every holder of the position dict sees the
+        change, and positions no longer returned are dropped. The fetch
+        runs outside the lock, so a refresh waiting on the request
+        scheduler never blocks more urgent lookups; concurrent fetches are
+        coalesced by the scheduler and a response older than the applied
+        one is discarded.
+        """
+        age = self.age()
+        if age is not None and age < max_age:
+            return
+        started_at = time.monotonic()
+        positions_list = self._mcl._get_positions()
+        with self._lock:
+            if self._refreshed_at is not None and started_at < self._refreshed_at:
+                return
+            seen = set()
+            for pos in positions_list:
+                deal_id = pos["position"]["dealId"]
+                seen.add(deal_id)
+                known = self._by_deal_id.get(deal_id)
+                if known is None:
+                    self._by_deal_id[deal_id] = pos
+                else:
+                    known["position"].update(pos["position"])
+                    known["market"].update(pos["market"])
+                self._reference_to_deal_id[pos["position"]["dealReference"]] = deal_id
+            for deal_id in set(self._by_deal_id) - seen:
+                self._drop(deal_id)
+            self._refreshed_at = started_at
+
+    def _drop(self, deal_id):
+        pos = self._by_deal_id.pop(deal_id, None)
+        if pos is not None:
+            self._reference_to_deal_id.pop(pos["position"]["dealReference"], None)
+
+    def confirm(self, deal_reference):
+        """
+        Resolves a new deal through the deal-confirmation endpoint and
+        records the dealId of its dealReference. Closed affected deals
+        are dropped from the book right away.
+        """
+        confirmation = self._mcl._get_deal_confirmation(deal_reference)
+        with self._lock:
+            self._confirmations[deal_reference] = confirmation
+            if confirmation["dealStatus"] == "ACCEPTED":
+                self._reference_to_deal_id[deal_reference] = confirmation["dealId"]
+                for deal in confirmation.get("affectedDeals") or []:
+                    if deal["status"] in ("FULLY_CLOSED", "DELETED"):
+                        self._drop(deal["dealId"])
+        return confirmation
+
+    def apply_update(self, opu):
+        """
+        Applies a streamed open position update: deleted positions are
+        dropped and updated ones amended in place, so every holder of the
+        position dict sees the change. New positions are only indexed by
+        dealReference until the next refresh fetches their details.
+        """
+        deal_id = opu["dealId"]
+        with self._lock:
+            if opu.get("status") == "DELETED":
+                self._drop(deal_id)
+                return
+            if opu.get("dealReference"):
+                self._reference_to_deal_id[opu["dealReference"]] = deal_id
+            pos = self._by_deal_id.get(deal_id)
+            if pos is None:
+                return
+            for field in OPU_FIELDS:
+                if field in opu:
+                    pos["position"][field] = opu[field]
+
+    def apply_price(self, epic, values):
+        """
+        Writes streamed prices ({BID, OFFER, ...}) into the market part of
+        every position on epic.
+        """
+        with self._lock:
+            for pos in self._by_deal_id.values():
+                if pos["market"]["epic"] != epic:
+                    continue
+                for field, key in PRICE_FIELDS.items():
+                    value = values.get(field)
+                    if value is None:
+                        continue
+                    pos["market"][key] = value if field == "MARKET_STATE" else float(value)
+
+    def add(self, pos):
+        """
+        Stores a position known from its deal confirmation, so it is served
+        before a refresh returns it. Returns the stored position, which is
+        the one already in the book if a refresh or update came first.
+        """
+        deal_id = pos["position"]["dealId"]
+        with self._lock:
+            self._reference_to_deal_id[pos["position"]["dealReference"]] = deal_id
+            return self._by_deal_id.setdefault(deal_id, pos)
+
+    def get_by_deal_id(self, deal_id):
+        return self._by_deal_id.get(deal_id)
+
+    def get_by_reference(self, deal_reference):
+        deal_id = self._reference_to_deal_id.get(deal_reference)
+        if deal_id is None:
+            return None
+        return self._by_deal_id.get(deal_id)
+
+    def lookup(self, deal_reference, max_age=0.0):
+        """
+        Returns the position of a dealReference. The book is refreshed when
+        older than max_age, and once more if the reference is still unknown.
+        """
+        self.refresh(max_age=max_age)
+        pos = self.get_by_reference(deal_reference)
+        if pos is None and max_age > 0:
+            self.refresh()
+            pos = self.get_by_reference(deal_reference)
+        return pos
+
+    def __len__(self):
+        return len(self._by_deal_id)
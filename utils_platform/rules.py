@@ -0,0 +1,29 @@
+#
+
+# Absolute buffer (points) added on top of the broker's minimum stop distance
+STOP_DISTANCE_BUFFER = 20
+
+
+def min_trailing_distances(level, dealing_rules):
+    """
+    Given the opening level of a position and the dealingRules of its
+    market, returns the minimum (stop distance, trailing step) in points
+    accepted for a trailing stop. level may be a float or a NumPy array.
+    """
+    min_step_distance_p = dealing_rules["minStepDistance"]["value"]
+    min_stop_distance_pct = dealing_rules["minNormalStopOrLimitDistance"]["value"]
+    min_stop_distance_p = level * (min_stop_distance_pct / 100.0) + STOP_DISTANCE_BUFFER
+    return min_stop_distance_p, min_step_distance_p
+
+
+def trailing_stop_distances(level, trailing_stop_rules, dealing_rules):
+    """
+    Converts the relative trailingStopDistance and trailingStep of
+    trailing_stop_rules into the (stop distance, trailing step) in points
+    at level, clamped to the minimum distances of the market.
+    """
+    min_stop_distance_p, min_step_distance_p = min_trailing_distances(level, dealing_rules)
+    return (
+        max(level * trailing_stop_rules["trailingStopDistance"], min_stop_distance_p),
+        max(level * trailing_stop_rules["trailingStep"], min_step_distance_p)
+    )
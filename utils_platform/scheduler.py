@@ -0,0 +1,239 @@
+#
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from utils_metrics.latency import RECORDER
+import itertools
+import threading
+import heapq
+import time
+
+# Request priorities, lower is served first
+ORDER = 0
+DEFAULT = 1
+MONITOR = 2
+REFRESH = 3
+PRIORITY_NAMES = {ORDER: "order", DEFAULT: "default", MONITOR: "monitor", REFRESH: "refresh"}
+
+# IG per-account allowances (requests per minute)
+IG_LIMITS = {
+    "trading": {"per_minute": 100},
+    "non_trading": {"per_minute": 30}
+}
+
+_priority = ContextVar("request_priority", default=DEFAULT)
+
+
+@contextmanager
+def request_priority(priority):
+    """
+    Sends the requests made within the block (in this thread) at priority.
+    Also usable as a method decorator.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def limit_class(method, url):
+    """
+    Returns the IG limit class of a request: "trading" for deal requests,
+    None for the login and "non_trading" for everything else.
+    """
+    if url == "session" and method == "POST":
+        return None
+    if method != "GET" and url.startswith(("positions/otc", "workingorders")):
+        return "trading"
+    return "non_trading"
+
+
+class TokenBucket():
+    """
+    Refills per_minute tokens a minute, up to burst (per_minute by default).
+    """
+
+    def __init__(self, per_minute, burst=None):
+        self._rate = per_minute / 60.0
+        self.capacity = burst or per_minute
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def wait_time(self, reserve=0):
+        """
+        Seconds until a token can be taken while leaving reserve tokens.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        missing = 1 + min(reserve, self.capacity - 1) - self.tokens
+        return max(missing, 0.0) / self._rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class RequestScheduler():
+    """
+    Admits every REST request of an MKTClient against token buckets per
+    limit class, serving waiting requests by priority (deals before
+    monitoring before cache refreshes). Requests below reserve_from
+    priority cannot take the last reserve tokens of a bucket, which are
+    kept for orders. Identical GETs are coalesced into one request.
+    Without limits requests are never delayed, only coalesced.
+    """
+
+    def __init__(self, limits=None, reserve=2, reserve_from=MONITOR):
+        """
+        limits maps limit classes to TokenBucket arguments, e.g. IG_LIMITS.
+        """
+        self._buckets = {
+            name: TokenBucket(**spec) for name, spec in (limits or {}).items()
+        }
+        self._reserve = reserve
+        self._reserve_from = reserve_from
+        self._cond = threading.Condition()
+        self._waiting = {name: [] for name in self._buckets}
+        self._seq = itertools.count()
+        self._inflight = {}
+        self.admitted = {}
+        self.coalesced = 0
+
+    def _admit(self, name, entry):
+        """
+        Blocks until entry ([priority, seq]) is first in line for the
+        bucket of name and a token is available.
+        """
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            return
+        start = time.perf_counter_ns()
+        heap = self._waiting[name]
+        with self._cond:
+            heapq.heappush(heap, entry)
+            try:
+                while True:
+                    wait = None
+                    if heap[0] is entry:
+                        reserve = self._reserve if entry[0] >= self._reserve_from else 0
+                        wait = bucket.wait_time(reserve)
+                        if wait <= 0:
+                            heapq.heappop(heap)
+                            bucket.take()
+                            break
+                    self._cond.wait(wait)
+            except BaseException:
+                if entry in heap:
+                    heap.remove(entry)
+                    heapq.heapify(heap)
+                raise
+            finally:
+                self._cond.notify_all()
+        RECORDER.record(f"scheduler.wait.{name}", time.perf_counter_ns() - start)
+
+    def _promote(self, name, entry, priority):
+        """
+        Raises a queued request to priority when a more urgent caller
+        joins it.
+        """
+        with self._cond:
+            if priority < entry[0]:
+                entry[0] = priority
+                if name in self._waiting:
+                    heapq.heapify(self._waiting[name])
+                self._cond.notify_all()
+
+    def run(self, method, url, send, params=None, version=None, priority=None):
+        """
+        Calls send() once the request may go out and returns its result.
+        priority defaults to ORDER for deal requests and to the priority
+        of the current request_priority block otherwise.
+
+        A GET identical to one still queued is served by that request's
+        response. Monitoring and refresh reads also join a duplicate that is
+        already on the wire. Order-path reads never do, because its response
+        could predate their deal.
+        """
+        name = limit_class(method, url)
+        if priority is None:
+            priority = ORDER if name == "trading" else _priority.get()
+        entry = [priority, next(self._seq)]
+        key = record = None
+        if method == "GET":
+            key = (url, version, tuple(sorted((params or {}).items())))
+            with self._cond:
+                inflight = self._inflight.get(key)
+                if inflight is not None and (not inflight["sent"] or priority >= MONITOR):
+                    self.coalesced += 1
+                else:
+                    inflight = None
+                    record = {"future": Future(), "entry": entry, "sent": False}
+                    self._inflight[key] = record
+            if inflight is not None:
+                self._promote(name, inflight["entry"], priority)
+                return inflight["future"].result()
+        try:
+            self._admit(name, entry)
+            if record is not None:
+                record["sent"] = True
+            result = send()
+        except BaseException as exc:
+            if record is not None:
+                self._finish(key, record, exception=exc)
+            raise
+        if record is not None:
+            self._finish(key, record, result=result)
+        with self._cond:
+            label = f"{name}.{PRIORITY_NAMES.get(entry[0], entry[0])}"
+            self.admitted[label] = self.admitted.get(label, 0) + 1
+        return result
+
+    def try_admit(self, method, url, priority=None):
+        """
+        Takes a token for an extra copy of a request already admitted by
+        run(), e.g. a hedged read, without waiting: returns False when
+        the bucket is empty (down to its reserve) or requests are queued.
+        """
+        name = limit_class(method, url)
+        bucket = self._buckets.get(name)
+        priority = _priority.get() if priority is None else priority
+        with self._cond:
+            if bucket is not None:
+                if self._waiting[name]:
+                    return False
+                reserve = self._reserve if priority >= self._reserve_from else 0
+                if bucket.wait_time(reserve) > 0:
+                    return False
+                bucket.take()
+            label = f"{name}.hedge"
+            self.admitted[label] = self.admitted.get(label, 0) + 1
+        return True
+
+    def _finish(self, key, record, result=None, exception=None):
+        with self._cond:
+            if self._inflight.get(key) is record:
+                self._inflight.pop(key)
+        if exception is not None:
+            record["future"].set_exception(exception)
+        else:
+            record["future"].set_result(result)
+
+    def stats(self):
+        """
+        Returns queue depth per limit class and priority, available tokens,
+        admitted requests per class and priority and the coalesced count.
+        """
+        with self._cond:
+            depth = {}
+            for name, heap in self._waiting.items():
+                depth[name] = {}
+                for priority, _ in heap:
+                    label = PRIORITY_NAMES.get(priority, priority)
+                    depth[name][label] = depth[name].get(label, 0) + 1
+            return {
+                "depth": depth,
+                "tokens": {name: bucket.tokens for name, bucket in self._buckets.items()},
+                "admitted": dict(self.admitted),
+                "coalesced": self.coalesced
+            }
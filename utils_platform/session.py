@@ -0,0 +1,162 @@
+#
+import threading
+import json
+import time
+import os
+
+# IG session tokens expire after 6 hours (extended by activity, up to 72h)
+SESSION_LIFETIME = 6 * 3600.0
+RETRY_INTERVAL = 5.0
+
+
+class TokenCache():
+    """
+    On-disk cache of session tokens shared across processes and restarts,
+    keyed by account. The file is readable by its owner only (0600) and
+    replaced atomically, so a concurrent reader sees either the old or the
+    new version.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self._path, "r") as src:
+                return json.load(src)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write(self, entries):
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(tmp_path, 0o600)
+        with os.fdopen(fd, "w") as out:
+            json.dump(entries, out)
+        os.replace(tmp_path, self._path)
+
+    def get(self, key):
+        """
+        Returns the cached {"headers", "issued_at"} entry or None.
+        """
+        return self._read().get(key)
+
+    def put(self, key, entry):
+        with self._lock:
+            entries = self._read()
+            entries[key] = entry
+            self._write(entries)
+
+    def evict(self, key):
+        with self._lock:
+            entries = self._read()
+            if entries.pop(key, None) is not None:
+                self._write(entries)
+
+
+class SessionTokens():
+    """
+    Holds the CST and X-SECURITY-TOKEN headers of an IG session. The pair
+    is replaced as a single dict, so requests sent by the client or by any
+    DraftPosition/OpenPosition derived from it read either the old or the
+    new pair, never a mix, and pick up a refresh immediately.
+    """
+
+    def __init__(
+        self, mclient, cache=None, lifetime=SESSION_LIFETIME,
+        refresh_margin=300.0, validate=False
+    ):
+        """
+        cache is an optional TokenCache. Tokens are considered valid for
+        lifetime seconds after login and refreshed refresh_margin seconds
+        before that. With validate, cached tokens are checked against the
+        service before use; otherwise a rejected token is only detected by
+        the first request, which then logs in again and retries.
+        """
+        self._mcl = mclient
+        self._cache = cache
+        self._key = f"{mclient._root_endpoint}|{mclient._user_login}|{mclient._accid}"
+        self._lifetime = lifetime
+        self._refresh_margin = refresh_margin
+        self._validate = validate
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.headers = None
+        self.issued_at = None
+        self.logins = 0
+
+    def _set(self, headers, issued_at):
+        self.issued_at = issued_at
+        self.headers = headers
+
+    def _fresh(self, issued_at):
+        return time.time() - issued_at < self._lifetime - self._refresh_margin
+
+    def age(self):
+        """
+        Returns the age of the current tokens in seconds, None if unset.
+        """
+        issued_at = self.issued_at
+        if issued_at is None:
+            return None
+        return time.time() - issued_at
+
+    def obtain(self):
+        """
+        Reuses fresh cached tokens (checked against the service if
+        validate), otherwise logs in. Returns the token headers.
+        """
+        if self._cache is not None:
+            entry = self._cache.get(self._key)
+            if entry is not None and self._fresh(entry["issued_at"]):
+                self._set(entry["headers"], entry["issued_at"])
+                if not self._validate or self._mcl._check_session():
+                    return self.headers
+        return self.refresh()
+
+    def refresh(self, stale=None):
+        """
+        Logs in and swaps the new tokens in. stale is the token dict a
+        request was rejected with: if another thread already replaced it,
+        no second login is made.
+        """
+        with self._lock:
+            if stale is not None and self.headers is not stale:
+                return self.headers
+            headers = self._mcl._login()
+            self._set(headers, time.time())
+            self.logins += 1
+            if self._cache is not None:
+                self._cache.put(self._key, {"headers": headers, "issued_at": self.issued_at})
+        return headers
+
+    def invalidate(self):
+        """
+        Drops the cached tokens, e.g. after a logout.
+        """
+        if self._cache is not None:
+            self._cache.evict(self._key)
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self.issued_at + self._lifetime - self._refresh_margin - time.time()
+            if self._stop.wait(max(wait, 0.0)):
+                return
+            try:
+                self.refresh()
+            except Exception:
+                self._stop.wait(RETRY_INTERVAL)
+
+    def start(self):
+        """
+        Starts the background refresher, which logs in again
+        refresh_margin seconds before the tokens expire.
+        """
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
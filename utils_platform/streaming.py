@@ -0,0 +1,450 @@
+#
+from .scheduler import request_priority, MONITOR
+from urllib.parse import unquote
+import threading
+import requests
+import random
+import json
+
+TLCP_VERSION = "TLCP-2.1.0"
+LS_CID = "mgQkwtwdysogQz2BJ4Ji kOj2Bg"
+MARKET_FIELDS = ["BID", "OFFER", "HIGH", "LOW", "MARKET_STATE", "UPDATE_TIME"]
+TRADE_FIELDS = ["CONFIRMS", "OPU"]
+
+
+def decode_values(raw, previous):
+    """
+    Decodes the value list of a TLCP update ("U") line against the
+    previous values of the item: an empty value means unchanged, "^N"
+    means N unchanged values, "#" is null and "$" the empty string.
+    Returns the new values and the indices of the changed ones.
+    """
+    values = list(previous)
+    changed = []
+    i = 0
+    for token in raw.split("|"):
+        if token.startswith("^") and token[1:].isdigit():
+            i += int(token[1:])
+            continue
+        if token == "":
+            i += 1
+            continue
+        if token == "#":
+            values[i] = None
+        elif token == "$":
+            values[i] = ""
+        else:
+            values[i] = unquote(token)
+        changed.append(i)
+        i += 1
+    return values, changed
+
+
+class Subscriber():
+    """
+    Receives the updates of the topics it subscribed to. Inline
+    subscribers are called from the streaming thread and must be quick.
+    Others get their own delivery thread; with conflate, updates of a
+    topic that arrive while the callback is busy are merged and only the
+    latest values are delivered.
+    """
+
+    def __init__(self, callback, conflate=True, inline=False):
+        self._callback = callback
+        self._conflate = conflate
+        self._inline = inline
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._backlog = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.delivered = 0
+        self.conflated = 0
+        if not inline:
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def deliver(self, topic, values, changed):
+        if self._inline:
+            self._call(topic, values, changed)
+            return
+        with self._lock:
+            if not self._conflate:
+                self._backlog.append((topic, values, changed))
+            elif topic in self._pending:
+                self._pending[topic] = (values, self._pending[topic][1] | set(changed))
+                self.conflated += 1
+            else:
+                self._pending[topic] = (values, set(changed))
+        self._wake.set()
+
+    def _call(self, topic, values, changed):
+        self.delivered += 1
+        try:
+            self._callback(topic, values, changed)
+        except Exception as exc:
+            print(f"Subscriber callback failed on {topic}: {exc}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                backlog, self._backlog = self._backlog, []
+                pending, self._pending = self._pending, {}
+            for topic, values, changed in backlog:
+                self._call(topic, values, changed)
+            for topic, (values, changed) in pending.items():
+                self._call(topic, values, changed)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+class UpdateBus():
+    """
+    In-process publish/subscribe of streamed updates by topic (the
+    Lightstreamer item name, e.g. "MARKET:{epic}" or "TRADE:{accid}").
+    Values are delivered as {field: value} dicts along with the set of
+    fields changed by the update.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, topic, callback, conflate=True, inline=False):
+        subscriber = Subscriber(callback, conflate=conflate, inline=inline)
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, topic, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers.get(topic, []):
+                self._subscribers[topic].remove(subscriber)
+        subscriber.stop()
+
+    def publish(self, topic, values, changed):
+        for subscriber in list(self._subscribers.get(topic, [])):
+            subscriber.deliver(topic, values, changed)
+
+
+class LightstreamerClient():
+    """
+    Minimal client for the text protocol (TLCP) of a Lightstreamer server
+    such as IG's streaming endpoint: creates a session over a streamed
+    HTTP response, adds and removes subscriptions through control requests
+    and decodes updates. Broken sessions are recreated with jittered
+    exponential backoff and every subscription is added again.
+    Updates sent while disconnected are lost; on_reconnect() is called
+    from its own thread once a new session is up, so the caller can
+    catch up over REST.
+    """
+
+    def __init__(
+        self, endpoint, user, password, adapter_set="DEFAULT",
+        keepalive=5.0, stall_timeout=15.0, connect_timeout=3.05,
+        backoff_base=0.05, backoff_cap=16.0, on_reconnect=None
+    ):
+        """
+        password is either a string or a callable returning it, so that
+        reconnects use the current session tokens.
+        """
+        self._endpoint = endpoint.rstrip("/") + "/lightstreamer/"
+        self._user = user
+        self._password = password
+        self._adapter_set = adapter_set
+        self._keepalive = keepalive
+        self._timeout = (connect_timeout, stall_timeout)
+        self._backoff_base = backoff_base
+        self._backoff_cap = backoff_cap
+        self._on_reconnect = on_reconnect
+        self._http = requests.Session()
+        self._lock = threading.Lock()
+        self._add_lock = threading.Lock()
+        self._subscriptions = {}
+        self._next_id = 0
+        self._session_id = None
+        self._response = None
+        self._connected = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+        self.sessions = 0
+        self.reconnects = 0
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    def connect(self, timeout=10.0):
+        """
+        Starts the streaming thread and waits for the first session.
+        """
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        if not self._connected.wait(timeout):
+            err_msg = f"Error(): no streaming session within {timeout}s."
+            raise Exception(err_msg)
+        return self
+
+    def subscribe(self, items, fields, mode, callback, snapshot=True):
+        """
+        Subscribes to items (list of item names) with the given fields and
+        mode (MERGE, DISTINCT). callback(item, values, changed) receives
+        the current {field: value} of the item and the changed fields.
+        Returns the subscription id.
+        """
+        with self._lock:
+            self._next_id += 1
+            sub_id = self._next_id
+            self._subscriptions[sub_id] = {
+                "items": list(items), "fields": list(fields), "mode": mode,
+                "snapshot": snapshot, "callback": callback,
+                "values": [[None] * len(fields) for _ in items],
+                "session_id": None
+            }
+        with self._add_lock:
+            if self.connected:
+                self._add(sub_id)
+        return sub_id
+
+    def unsubscribe(self, sub_id):
+        with self._lock:
+            self._subscriptions.pop(sub_id, None)
+        if self.connected:
+            self._control({"LS_op": "delete", "LS_subId": sub_id})
+
+    def _control(self, params):
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+        response = self._http.post(
+            self._endpoint + "control.txt",
+            params={"LS_protocol": TLCP_VERSION, "LS_session": self._session_id},
+            data={"LS_reqId": request_id, **params},
+            timeout=self._timeout
+        )
+        reply = response.text.strip()
+        if response.status_code != 200 or not reply.startswith("REQOK"):
+            err_msg = f"Error({response.status_code}): control request failed: {reply}"
+            raise Exception(err_msg)
+
+    def _add(self, sub_id):
+        subscription = self._subscriptions.get(sub_id)
+        if subscription is None or subscription["session_id"] == self._session_id:
+            return
+        subscription["session_id"] = self._session_id
+        self._control({
+            "LS_op": "add", "LS_subId": sub_id, "LS_mode": subscription["mode"],
+            "LS_group": " ".join(subscription["items"]),
+            "LS_schema": " ".join(subscription["fields"]),
+            "LS_snapshot": "true" if subscription["snapshot"] else "false"
+        })
+
+    def _on_update(self, line):
+        _, sub_id, item_index, raw = line.split(",", 3)
+        subscription = self._subscriptions.get(int(sub_id))
+        if subscription is None:
+            return
+        item = int(item_index) - 1
+        values, changed = decode_values(raw, subscription["values"][item])
+        subscription["values"][item] = values
+        fields = subscription["fields"]
+        subscription["callback"](
+            subscription["items"][item],
+            dict(zip(fields, values)),
+            {fields[i] for i in changed}
+        )
+
+    def _create_session(self):
+        password = self._password() if callable(self._password) else self._password
+        response = self._http.post(
+            self._endpoint + "create_session.txt",
+            params={"LS_protocol": TLCP_VERSION},
+            data={
+                "LS_user": self._user, "LS_password": password,
+                "LS_adapter_set": self._adapter_set, "LS_cid": LS_CID,
+                "LS_keepalive_millis": int(self._keepalive * 1000)
+            },
+            stream=True, timeout=self._timeout
+        )
+        if response.status_code != 200:
+            err_msg = f"Error({response.status_code}): cannot create streaming session."
+            raise Exception(err_msg)
+        return response
+
+    def _read(self, response):
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line:
+                continue
+            if line.startswith("U,"):
+                self._on_update(line)
+            elif line.startswith("CONOK"):
+                with self._add_lock:
+                    self._session_id = line.split(",")[1]
+                    for sub_id in list(self._subscriptions):
+                        self._add(sub_id)
+                    self._connected.set()
+                    self.sessions += 1
+                if self.sessions > 1 and self._on_reconnect is not None:
+                    threading.Thread(target=self._on_reconnect, daemon=True).start()
+            elif line.startswith("CONERR"):
+                err_msg = f"Error(): streaming session refused: {line}"
+                raise Exception(err_msg)
+            elif line.startswith(("LOOP", "END")):
+                return
+
+    def _run(self):
+        failures = 0
+        while not self._closed.is_set():
+            try:
+                self._response = self._create_session()
+                failures = 0
+                self._read(self._response)
+            except Exception as exc:
+                if self._closed.is_set():
+                    return
+                failures += 1
+                print(f"Streaming session lost: {exc}")
+            finally:
+                self._connected.clear()
+            if self._closed.is_set():
+                return
+            self.reconnects += 1
+            backoff = min(self._backoff_cap, self._backoff_base * 2 ** failures)
+            self._closed.wait(random.uniform(0, backoff))
+
+    def close(self):
+        self._closed.set()
+        if self.connected:
+            try:
+                self._control({"LS_op": "destroy"})
+            except Exception:
+                pass
+        if self._response is not None:
+            self._response.close()
+
+
+class IGStream():
+    """
+    Push-based price and trade updates for one MKTClient, replacing REST
+    polling of /positions. MARKET:{epic} prices and TRADE:{accid} position
+    updates (OPU) are applied to the shared PositionBook, so OpenPosition
+    objects and PortfolioMonitor read current state without requests, and
+    are republished on an UpdateBus for any other consumer. Position
+    updates missed while reconnecting are caught up with a /positions
+    refresh once the new session is up.
+    """
+
+    def __init__(self, mclient, endpoint=None, market_fields=MARKET_FIELDS, **client_kwargs):
+        """
+        endpoint defaults to the lightstreamerEndpoint of the session.
+        client_kwargs are passed to LightstreamerClient.
+        """
+        self._mcl = mclient
+        self._endpoint = endpoint
+        self._market_fields = market_fields
+        self._client_kwargs = client_kwargs
+        self._position_book = mclient._position_book
+        self._lock = threading.Lock()
+        self._market_subscriptions = {}
+        self._prices = {}
+        self._updated = threading.Event()
+        self.bus = UpdateBus()
+        self.client = None
+
+    @property
+    def connected(self):
+        return self.client is not None and self.client.connected
+
+    def _password(self):
+        tokens = self._mcl._session_tokens.headers
+        return f"CST-{tokens['CST']}|XST-{tokens['X-SECURITY-TOKEN']}"
+
+    def start(self, timeout=10.0):
+        """
+        Connects and subscribes to the trade updates of the account.
+        """
+        endpoint = self._endpoint or self._mcl._get_session_details()["lightstreamerEndpoint"]
+        self.client = LightstreamerClient(
+            endpoint, self._mcl._accid, self._password,
+            on_reconnect=self._reconcile, **self._client_kwargs
+        )
+        self.client.subscribe(
+            [f"TRADE:{self._mcl._accid}"], TRADE_FIELDS, "DISTINCT", self._on_trade, snapshot=False
+        )
+        self.client.connect(timeout)
+        return self
+
+    def _reconcile(self):
+        """
+        Refreshes the position book after a reconnect, dropping positions
+        whose closing update was lost during the gap.
+        """
+        try:
+            with request_priority(MONITOR):
+                self._position_book.refresh()
+        except Exception as exc:
+            print(f"Position book refresh after reconnect failed: {exc}")
+            return
+        self._updated.set()
+
+    def _on_market(self, item, values, changed):
+        epic = item.split(":", 1)[1]
+        self._prices[epic] = values
+        self._position_book.apply_price(epic, values)
+        self._updated.set()
+        self.bus.publish(item, values, changed)
+
+    def _on_trade(self, item, values, changed):
+        if "OPU" in changed and values["OPU"]:
+            self._position_book.apply_update(json.loads(values["OPU"]))
+            self._updated.set()
+        self.bus.publish(item, values, changed)
+
+    def subscribe_market(self, epic, callback=None, conflate=True):
+        """
+        Streams the prices of epic (once per epic, however many callers)
+        and optionally registers callback(topic, values, changed) on the bus.
+        """
+        topic = f"MARKET:{epic}"
+        with self._lock:
+            if epic not in self._market_subscriptions:
+                self._market_subscriptions[epic] = self.client.subscribe(
+                    [topic], self._market_fields, "MERGE", self._on_market
+                )
+        if callback is not None:
+            return self.bus.subscribe(topic, callback, conflate=conflate)
+
+    def subscribe_trades(self, callback, conflate=False):
+        """
+        Registers callback(topic, values, changed) for trade updates.
+        Trade updates are not conflated by default, so no OPU is lost.
+        """
+        return self.bus.subscribe(f"TRADE:{self._mcl._accid}", callback, conflate=conflate)
+
+    def track(self, open_position):
+        """
+        Keeps an OpenPosition up to date from the stream instead of polling.
+        """
+        self.subscribe_market(open_position._market["instrument"]["epic"])
+        open_position._stream = self
+
+    def price(self, epic):
+        """
+        Returns the latest streamed {field: value} of epic, or None.
+        """
+        return self._prices.get(epic)
+
+    def wait_update(self, timeout):
+        """
+        Waits until a price or position update arrives (or timeout).
+        """
+        updated = self._updated.wait(timeout)
+        self._updated.clear()
+        return updated
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
@@ -0,0 +1,78 @@
+#
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (3.05, 10.0)
+
+
+class Transport():
+    """
+    Keep-alive HTTP transport shared by MKTClient and the positions
+    derived from it. Wraps a single requests.Session so that every call
+    to the API service reuses an already established TCP+TLS connection.
+    """
+
+    def __init__(
+        self, root_endpoint, pool_size=DEFAULT_POOL_SIZE,
+        timeout=DEFAULT_TIMEOUT, prewarm=0
+    ):
+        """
+        pool_size sets the number of connections kept alive per host,
+        timeout is a (connect, read) tuple applied to every request and
+        prewarm is the number of connections opened right away.
+        """
+        self._root_endpoint = root_endpoint
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=False
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        if prewarm:
+            self.prewarm(prewarm)
+
+    def prewarm(self, n_connections=None):
+        """
+        Opens n_connections concurrently so that the first calls on the
+        signal path do not pay the handshake. Failures are ignored, the
+        connection will simply be opened on first use.
+        """
+        n_connections = min(n_connections or self._pool_size, self._pool_size)
+
+        def _touch(_):
+            try:
+                self._session.head(self._root_endpoint, timeout=self._timeout)
+            except requests.RequestException:
+                pass
+
+        with ThreadPoolExecutor(max_workers=n_connections) as pool:
+            list(pool.map(_touch, range(n_connections)))
+
+    def request(self, method, url, headers=None, params=None, payload=None, timeout=None):
+        """
+        Sends a request relative to the root endpoint over the pooled session.
+        timeout (seconds) caps both the connect and the read timeout of this
+        request, the transport timeout applies otherwise.
+        """
+        if timeout is not None:
+            timeout = (min(self._timeout[0], timeout), min(self._timeout[1], timeout))
+        return self._session.request(
+            method=method,
+            url=urljoin(self._root_endpoint, url),
+            headers=headers,
+            params=params,
+            json=payload,
+            timeout=timeout or self._timeout
+        )
+
+    def close(self):
+        """
+        Closes all pooled connections.
+        """
+        self._session.close()
@@ -0,0 +1,174 @@
+#
+from utils_platform.rules import min_trailing_distances
+from .event_study import _ns
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import itertools
+import os
+
+FIELDS = ["open", "high", "low", "close"]
+
+
+def make_grid(trailing_stop_distances, trailing_steps, stop_levels):
+    """
+    Cartesian grid of trailing_stop_rules, as in run_platform.py:
+    trailingStopDistance and trailingStep are fractions of the opening
+    level, stopLevel is a multiple of it (only used by simulate with
+    attach_stops=False). Returns a dict of arrays.
+    """
+    combos = np.array(list(itertools.product(
+        trailing_stop_distances, trailing_steps, stop_levels
+    )), dtype=np.float64)
+    return {
+        "trailingStopDistance": combos[:, 0],
+        "trailingStep": combos[:, 1],
+        "stopLevel": combos[:, 2]
+    }
+
+
+def load_paths(events, price_path, n_bars, bar="1min"):
+    """
+    Builds (E x n_bars) open/high/low/close arrays of the bars following
+    each event from {price_path}/{ticker}.parquet, NaN-padded, and the
+    entry level. Timestamps are bar-open times as in PriceStore, so the
+    entry is the close of the last bar that ended at or before the event
+    and the paths start with the bar in progress at the event.
+    """
+    paths = {field: np.full((len(events), n_bars), np.nan) for field in FIELDS}
+    entry = np.full(len(events), np.nan)
+    event_ns = _ns(events["created_at"].to_numpy()) - (0 if bar is None else pd.Timedelta(bar).value)
+    tickers = events["ticker"].to_numpy()
+    for ticker in pd.unique(tickers):
+        path = os.path.join(price_path, f"{ticker}.parquet")
+        if pd.isna(ticker) or not os.path.exists(path):
+            continue
+        table = pq.read_table(path, columns=["timestamp"] + FIELDS)
+        ts = _ns(table.column("timestamp").to_numpy())
+        bars = {field: table.column(field).to_numpy() for field in FIELDS}
+        for row in np.flatnonzero(tickers == ticker):
+            idx = np.searchsorted(ts, event_ns[row], side="right") - 1
+            if idx < 0:
+                continue
+            entry[row] = bars["close"][idx]
+            window = slice(idx + 1, min(idx + 1 + n_bars, len(ts)))
+            for field in FIELDS:
+                chunk = bars[field][window]
+                paths[field][row, :len(chunk)] = chunk
+    return paths, entry
+
+
+def simulate(paths, entry, grid, dealing_rules, attach_stops=True):
+    """
+    Replays short CFD positions opened at entry under every rule of the
+    grid at once, with the same minimum-distance clamps as
+    rules.trailing_stop_distances. As in DraftPosition.open_position, the
+    initial stop is entry + stop distance when the stop is attached to the
+    opening order, and stopLevel * entry with attach_stops=False (stop
+    amended after the open). Per bar the stop is checked
+    against the high first (exit at the stop, or at the open on a gap),
+    then trailed down to low + distance once the market has moved by at
+    least the trailing step. Open positions are closed at the last close.
+
+    Returns the (E x G) matrix of short P/L as a fraction of entry.
+    """
+    n_events, n_bars = paths["close"].shape
+    pnl = np.full((n_events, len(grid["stopLevel"])), np.nan, dtype=np.float32)
+    for e in range(n_events):
+        level = entry[e]
+        if np.isnan(level):
+            continue
+        rules = dealing_rules[e] if isinstance(dealing_rules, list) else dealing_rules
+        min_stop_distance_p, min_step_distance_p = min_trailing_distances(level, rules)
+        distance = np.maximum(grid["trailingStopDistance"] * level, min_stop_distance_p)
+        step = np.maximum(grid["trailingStep"] * level, min_step_distance_p)
+        stop = level + distance if attach_stops else grid["stopLevel"] * level
+        exit_level = np.full(stop.shape, np.nan)
+        alive = np.ones(stop.shape, dtype=bool)
+        last_close = level
+        for t in range(n_bars):
+            high = paths["high"][e, t]
+            if np.isnan(high):
+                break
+            hit = alive & (high >= stop)
+            if hit.any():
+                exit_level[hit] = np.maximum(stop[hit], paths["open"][e, t])
+                alive &= ~hit
+                if not alive.any():
+                    break
+            candidate = paths["low"][e, t] + distance
+            trail = alive & (stop - candidate >= step)
+            stop = np.where(trail, candidate, stop)
+            last_close = paths["close"][e, t]
+        exit_level[alive] = last_close
+        pnl[e] = (level - exit_level) / level
+    return pnl
+
+
+def _attach(shm_spec):
+    handles, arrays = [], {}
+    for key, (name, shape) in shm_spec.items():
+        shm = shared_memory.SharedMemory(name=name)
+        handles.append(shm)
+        arrays[key] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    return handles, arrays
+
+
+def _simulate_slice(shm_spec, rows, grid, dealing_rules, attach_stops):
+    handles, arrays = _attach(shm_spec)
+    try:
+        paths = {field: arrays[field][rows[0]:rows[1]] for field in FIELDS}
+        rules = dealing_rules[rows[0]:rows[1]] if isinstance(dealing_rules, list) else dealing_rules
+        return rows, simulate(paths, arrays["entry"][rows[0]:rows[1]], grid, rules, attach_stops)
+    finally:
+        for shm in handles:
+            shm.close()
+
+
+def sweep(paths, entry, grid, dealing_rules, n_workers=None, events_per_task=8, attach_stops=True):
+    """
+    Runs simulate over a process pool. Price paths are placed in shared
+    memory once and every worker reads its slice of events from there,
+    so only the grid and the resulting P/L rows are pickled.
+    """
+    n_events = len(entry)
+    arrays = {**paths, "entry": entry}
+    segments, shm_spec = [], {}
+    try:
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array, dtype=np.float64)
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=np.float64, buffer=shm.buf)[...] = array
+            segments.append(shm)
+            shm_spec[key] = (shm.name, array.shape)
+        pnl = np.full((n_events, len(grid["stopLevel"])), np.nan, dtype=np.float32)
+        tasks = [
+            (start, min(start + events_per_task, n_events))
+            for start in range(0, n_events, events_per_task)
+        ]
+        with ProcessPoolExecutor(max_workers=n_workers or os.cpu_count()) as pool:
+            futures = [
+                pool.submit(_simulate_slice, shm_spec, rows, grid, dealing_rules, attach_stops)
+                for rows in tasks
+            ]
+            for future in futures:
+                rows, result = future.result()
+                pnl[rows[0]:rows[1]] = result
+        return pnl
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+
+def summarize_grid(pnl, grid):
+    """
+    Mean, median and hit rate of P/L per rule combination, best first.
+    """
+    summary = pd.DataFrame(grid)
+    summary["mean"] = np.nanmean(pnl, axis=0)
+    summary["median"] = np.nanmedian(pnl, axis=0)
+    summary["hit_rate"] = (pnl > 0).sum(axis=0) / (~np.isnan(pnl)).sum(axis=0)
+    return summary.sort_values("mean", ascending=False)
@@ -0,0 +1,123 @@
+#
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import os
+
+
+class PriceStore():
+    """
+    Local OHLC store with one Parquet file per ticker
+    ({path}/{ticker}.parquet, columns timestamp, open, high, low, close),
+    sorted by UTC timestamp. Timestamps are bar-open times, as delivered
+    by most data vendors, so the close of a bar is only known one bar
+    after its timestamp; bar=None is for series stamped at the close.
+    """
+
+    def __init__(self, path, bar="1min"):
+        self._path = path
+        self.bar_ns = 0 if bar is None else pd.Timedelta(bar).value
+
+    def _file(self, ticker):
+        return os.path.join(self._path, f"{ticker}.parquet")
+
+    def __contains__(self, ticker):
+        return os.path.exists(self._file(ticker))
+
+    def iter_chunks(self, ticker, chunk_rows=None, column="close"):
+        """
+        Yields (timestamps as int64 ns, values) arrays, chunk_rows bars at a
+        time, or the whole series at once if chunk_rows is None.
+        """
+        columns = ["timestamp", column]
+        if chunk_rows is None:
+            table = pq.read_table(self._file(ticker), columns=columns)
+            yield _ns(table.column("timestamp").to_numpy()), table.column(column).to_numpy()
+            return
+        for batch in pq.ParquetFile(self._file(ticker)).iter_batches(chunk_rows, columns=columns):
+            yield _ns(batch.column(0).to_numpy()), batch.column(1).to_numpy()
+
+
+def _ns(timestamps):
+    """
+    Converts timestamps to int64 UTC nanoseconds.
+    """
+    return pd.to_datetime(timestamps, utc=True).values.astype("datetime64[ns]").astype(np.int64)
+
+
+def asof(store, ticker, query_ns, chunk_rows=None):
+    """
+    Sorted, vectorized as-of join: for each query timestamp returns the
+    close of the last bar that ended at or before it (NaN before the first
+    bar and after the last one), so the bar in progress at the query is
+    never used. Chunks are visited in time order and later chunks
+    overwrite the queries they cover, so only one chunk is held in memory.
+    """
+    # A bar opened at ts has closed by the query when ts <= query - bar
+    flat_query = query_ns.ravel() - store.bar_ns
+    flat_values = np.full(flat_query.shape, np.nan)
+    last_ns = None
+    for ts, close in store.iter_chunks(ticker, chunk_rows):
+        if not len(ts):
+            continue
+        covered = flat_query >= ts[0]
+        idx = np.searchsorted(ts, flat_query[covered], side="right") - 1
+        flat_values[covered] = close[idx]
+        last_ns = ts[-1]
+    if last_ns is not None:
+        flat_values[flat_query > last_ns] = np.nan
+    return flat_values.reshape(query_ns.shape)
+
+
+def event_study(events, store, horizons, benchmark=None, chunk_rows=None):
+    """
+    Computes return paths after each event.
+
+    events: DataFrame with "created_at" and "ticker" columns, e.g. the
+        fetch_timelines output after extract_ticker.
+    horizons: list of pandas Timedeltas (or strings like "15min", "1D").
+    benchmark: ticker of the market series used for abnormal returns
+        (market-adjusted model); raw returns if None.
+
+    Returns a DataFrame aligned with events holding the entry price (close
+    of the last bar completed before the event, see asof) and one
+    "ar_<horizon>" column per horizon (NaN where prices are missing).
+    """
+    horizons_ns = np.array([pd.Timedelta(h).value for h in horizons], dtype=np.int64)
+    event_ns = _ns(events["created_at"].to_numpy())
+    tickers = events["ticker"].to_numpy()
+    query_ns = event_ns[:, None] + np.concatenate([[0], horizons_ns])[None, :]
+
+    prices = np.full(query_ns.shape, np.nan)
+    for ticker in pd.unique(tickers):
+        if pd.isna(ticker) or ticker not in store:
+            continue
+        rows = tickers == ticker
+        prices[rows] = asof(store, ticker, query_ns[rows], chunk_rows)
+    returns = prices[:, 1:] / prices[:, :1] - 1.0
+
+    if benchmark is not None:
+        bench_prices = asof(store, benchmark, query_ns, chunk_rows)
+        returns = returns - (bench_prices[:, 1:] / bench_prices[:, :1] - 1.0)
+
+    result = pd.DataFrame(
+        returns, index=events.index,
+        columns=[f"ar_{h}" for h in horizons]
+    )
+    result.insert(0, "entry", prices[:, 0])
+    return result
+
+
+def summarize(result):
+    """
+    Mean (CAAR), median, t-statistic and count of abnormal returns per horizon.
+    """
+    ar = result.filter(like="ar_")
+    n = ar.count()
+    mean = ar.mean()
+    return pd.DataFrame({
+        "mean": mean,
+        "median": ar.median(),
+        "t": mean / (ar.std(ddof=1) / np.sqrt(n)),
+        "n": n
+    })
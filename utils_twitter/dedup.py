@@ -0,0 +1,218 @@
+#
+from collections import OrderedDict
+import threading
+import hashlib
+import struct
+import time
+import re
+import os
+
+RETWEET_REGEX = re.compile(r"^(rt\s+)?(@\w+:?\s+)+")
+NON_WORD_REGEX = re.compile(r"[^\w$]+")
+MAGIC = b"SGF1"
+RECORD = struct.Struct("<Qd")
+
+
+def fingerprint(text):
+    """
+    64-bit fingerprint of a tweet text normalized for reposts: lowercase,
+    without leading "RT @user:" or reply mentions, punctuation and
+    repeated whitespace. Links are kept, so two short tweets pointing to
+    different reports differ. None if nothing is left to compare.
+    """
+    text = RETWEET_REGEX.sub("", (text or "").lower().strip())
+    text = NON_WORD_REGEX.sub(" ", text).strip()
+    return _hash(text) if text else None
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+class ExpiringSet():
+    """
+    Bounded set of 64-bit keys expiring window seconds after they were
+    last seen. Keys are kept in insertion order, so expired and surplus
+    keys are evicted from the front in amortized constant time.
+    """
+
+    def __init__(self, window, max_size):
+        self._window = window
+        self._max_size = max_size
+        self._entries = OrderedDict()
+
+    def _evict(self, now):
+        while self._entries:
+            key, seen_at = next(iter(self._entries.items()))
+            if now - seen_at <= self._window and len(self._entries) <= self._max_size:
+                return
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        seen_at = self._entries.get(key)
+        return seen_at is not None and time.time() - seen_at <= self._window
+
+    def add(self, key, now=None):
+        now = time.time() if now is None else now
+        self._entries[key] = now
+        self._entries.move_to_end(key)
+        self._evict(now)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def items(self):
+        return list(self._entries.items())
+
+
+class SignalFilter():
+    """
+    Hot-path filter in front of the trading callback. A record is rejected
+    if its tweet id or the fingerprint of its text was seen within window
+    seconds (reposts, thread replies, reconnect replays), or if every one
+    of its tickers signalled less than cooldown seconds ago, globally or
+    on the same timeline. Tickers enter their cooldown once the signal of
+    an accepted record was handled (confirm), so a failed trade does not
+    block them. Lookups are in memory; the state is saved
+    compactly to path from a background thread and reloaded on start,
+    never per tweet. Without a path nothing is persisted.
+    """
+
+    def __init__(
+        self, path=None, window=24 * 3600, cooldown=3600,
+        timeline_cooldown=None, max_size=100000
+    ):
+        """
+        timeline_cooldown applies per (timeline, ticker) and defaults to
+        cooldown. max_size bounds each of the id, text and cooldown sets.
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._ids = ExpiringSet(window, max_size)
+        self._texts = ExpiringSet(window, max_size)
+        self._tickers = ExpiringSet(cooldown, max_size)
+        self._timeline_tickers = ExpiringSet(
+            cooldown if timeline_cooldown is None else timeline_cooldown, max_size
+        )
+        self._stop = threading.Event()
+        self._thread = None
+        self.rejected = {"duplicate_id": 0, "duplicate_text": 0, "cooldown": 0}
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def _keys(self, record):
+        """
+        Returns the tweet id and text keys of record and the (ticker,
+        timeline|ticker) keys of each of its tickers, by ticker.
+        """
+        tickers = record.get("tickers") or [record.get("ticker")]
+        ticker_keys = {}
+        for ticker in tickers:
+            if ticker is not None and ticker not in ticker_keys:
+                ticker_keys[ticker] = (
+                    _hash(ticker.upper()),
+                    _hash(f"{record.get('timeline')}|{ticker.upper()}")
+                )
+        return _hash(str(record["tid"])), fingerprint(record.get("text")), ticker_keys
+
+    def check(self, record):
+        """
+        Returns the rejection reason of record ("duplicate_id",
+        "duplicate_text" or "cooldown"), or None if it should go through.
+        The id and text of accepted records are remembered; their tickers
+        only after confirm(record). When only some tickers of a
+        multi-name record are in cooldown, the record goes through with
+        the others in "ticker" and "tickers" and the cooling ones moved to
+        "cooldown_tickers".
+        """
+        tid, text, ticker_keys = self._keys(record)
+        with self._lock:
+            cooling = [
+                ticker for ticker, (key, timeline_key) in ticker_keys.items()
+                if key in self._tickers or timeline_key in self._timeline_tickers
+            ]
+            reason = None
+            if tid in self._ids:
+                reason = "duplicate_id"
+            elif text is not None and text in self._texts:
+                reason = "duplicate_text"
+            elif ticker_keys and len(cooling) == len(ticker_keys):
+                reason = "cooldown"
+            now = time.time()
+            self._ids.add(tid, now)
+            if reason is not None:
+                self.rejected[reason] += 1
+                return reason
+            if text is not None:
+                self._texts.add(text, now)
+        if cooling:
+            tickers = [ticker for ticker in ticker_keys if ticker not in cooling]
+            record["ticker"], record["tickers"] = tickers[0], tickers
+            record["cooldown_tickers"] = cooling
+        return None
+
+    def confirm(self, record):
+        """
+        Starts the cooldown of the tickers of a record accepted by check,
+        once its signal was handled.
+        """
+        _, _, ticker_keys = self._keys(record)
+        now = time.time()
+        with self._lock:
+            for key, timeline_key in ticker_keys.values():
+                self._tickers.add(key, now)
+                self._timeline_tickers.add(timeline_key, now)
+
+    def save(self):
+        """
+        Atomically writes every set as packed (key, timestamp) records.
+        """
+        if self._path is None:
+            return
+        with self._lock:
+            sections = [
+                entries.items()
+                for entries in [self._ids, self._texts, self._tickers, self._timeline_tickers]
+            ]
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(MAGIC + struct.pack("<4I", *[len(section) for section in sections]))
+            for section in sections:
+                out.write(b"".join(RECORD.pack(key, seen_at) for key, seen_at in section))
+        os.replace(tmp_path, self._path)
+
+    def load(self):
+        with open(self._path, "rb") as src:
+            data = src.read()
+        if data[:4] != MAGIC:
+            err_msg = f"Error(): {self._path} is not a signal filter file."
+            raise Exception(err_msg)
+        counts = struct.unpack_from("<4I", data, 4)
+        offset = 4 + 16
+        with self._lock:
+            for entries, count in zip(
+                [self._ids, self._texts, self._tickers, self._timeline_tickers], counts
+            ):
+                for key, seen_at in RECORD.iter_unpack(data[offset:offset + count * RECORD.size]):
+                    entries.add(key, seen_at)
+                offset += count * RECORD.size
+
+    def start(self, interval=10.0):
+        """
+        Saves the state every interval seconds from a daemon thread, if
+        the filter has a path.
+        """
+        if self._path is None:
+            return None
+
+        def _run():
+            while not self._stop.wait(interval):
+                self.save()
+
+        self._thread = threading.Thread(target=_run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        self.save()
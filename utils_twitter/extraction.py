@@ -0,0 +1,226 @@
+#
+from .processing import TICKER_REGEX, SUFFIX_REGEX
+from collections import namedtuple, deque
+import csv
+import re
+
+Candidate = namedtuple("Candidate", ["symbol", "score", "sources"])
+
+# Confidence of a single mention, per source
+SOURCE_SCORES = {
+    "cashtag": 0.95, "name": 0.8, "alias": 0.6,
+    "common_word": 0.3, "unlisted_cashtag": 0.3
+}
+# Company names and aliases that are also everyday words; alone they only
+# count as "common_word", below the default min_score, unless corroborated
+COMMON_WORDS = frozenset("""
+    american apple amazon best block box chase coin compass digital energy first
+    ford fossil gap general global gold health kind live lemonade match meta
+    national oracle power progressive root shell shift snap square target
+    united unity visa wish zoom
+""".split())
+# Words next to a common-word name showing that the company is meant
+CONTEXT_WORDS = frozenset("""
+    ceo cfo company corp earnings inc investors ltd nasdaq nyse plc report
+    shares short shorting shorts stock stocks
+""".split())
+CONTEXT_CHARS = 40
+WORD_REGEX = re.compile(r"[a-z]+")
+SENTENCE_ENDS = ".!?:\n"
+COMPANY_SUFFIXES = [
+    " inc", " inc.", " corp", " corp.", " corporation", " co", " co.",
+    " ltd", " ltd.", " plc", " holdings", " group", " sa", " ag", " nv"
+]
+MIN_NAME_LENGTH = 4
+
+
+def load_universe(path):
+    """
+    Loads tradeable symbols from a CSV with columns symbol, name and
+    aliases (pipe-separated). Returns {symbol: {"name":..., "aliases": [...]}}.
+    """
+    universe = {}
+    with open(path, "r", newline="") as src:
+        for row in csv.DictReader(src):
+            aliases = [a.strip() for a in (row.get("aliases") or "").split("|") if a.strip()]
+            universe[row["symbol"].upper()] = {"name": row.get("name") or "", "aliases": aliases}
+    return universe
+
+
+class AhoCorasick():
+    """
+    Multi-pattern automaton matching every pattern in a single pass
+    over the text.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+    def add(self, pattern, value):
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), value))
+
+    def build(self):
+        """
+        Computes failure links breadth-first and merges outputs.
+        """
+        todo = deque(self._goto[0].values())
+        while todo:
+            node = todo.popleft()
+            for char, nxt in self._goto[node].items():
+                todo.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        return self
+
+    def iter_matches(self, text):
+        """
+        Yields (start, end, value) for every pattern occurrence.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, value in out[node]:
+                yield i + 1 - length, i + 1, value
+
+
+def _lower(text):
+    """
+    Lowercases text keeping every character at its position: characters
+    whose lowercase is longer (e.g. "İ") are left as they are, so offsets
+    in the result index the original text.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(char if len(char.lower()) != 1 else char.lower() for char in text)
+
+
+def _strip_suffix(name):
+    for suffix in COMPANY_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)].rstrip(" ,")
+    return name
+
+
+class TickerExtractor():
+    """
+    Extracts ranked ticker candidates from a tweet by matching cashtags,
+    company names and aliases of a tradeable universe in one automaton pass.
+    Names and aliases that are common words (e.g. "target") only count as
+    a name when the tweet corroborates them.
+    """
+
+    def __init__(self, universe, common_words=COMMON_WORDS):
+        """
+        common_words is the set of lowercase words treated as ambiguous
+        when a name or alias matches exactly one of them.
+        """
+        self._universe = universe
+        self._common_words = frozenset(common_words)
+        self._automaton = AhoCorasick()
+        for symbol, details in universe.items():
+            self._automaton.add("$" + _lower(symbol), (symbol, "cashtag"))
+            name = _lower(details.get("name", "")).strip()
+            for variant in {name, _strip_suffix(name)}:
+                if len(variant) >= MIN_NAME_LENGTH:
+                    self._automaton.add(variant, (symbol, "name"))
+            for alias in details.get("aliases", []):
+                if len(alias) >= MIN_NAME_LENGTH:
+                    self._automaton.add(_lower(alias), (symbol, "alias"))
+        self._automaton.build()
+
+    @staticmethod
+    def _is_word(text, start, end, tweet):
+        """
+        Whether text[start:end] (text is the tweet through _lower) is a whole
+        word. A cashtag must not be followed by a class or exchange suffix
+        in the original tweet, e.g. $BRK.B is not $BRK.
+        """
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        if text[start] == "$":
+            return not (after.isalnum() or SUFFIX_REGEX.match(tweet, end))
+        return not before.isalnum() and not after.isalnum()
+
+    @staticmethod
+    def _corroborated(text, start, end, tweet):
+        """
+        Whether a common-word match at text[start:end] names a company:
+        capitalized in the tweet other than at the start of a sentence,
+        or next to a word such as "shares", "short" or "ceo".
+        """
+        preceding = tweet[:start].rstrip()
+        if tweet[start].isupper() and preceding and preceding[-1] not in SENTENCE_ENDS:
+            return True
+        context = text[max(start - CONTEXT_CHARS, 0):start] + " " + text[end:end + CONTEXT_CHARS]
+        return any(word in CONTEXT_WORDS for word in WORD_REGEX.findall(context))
+
+    def extract(self, tweet):
+        """
+        Returns Candidates sorted by decreasing confidence. Scores of
+        repeated mentions of a symbol are combined as 1 - prod(1 - s).
+        """
+        tweet = tweet or ""
+        text = _lower(tweet)
+        mentions = {}
+        for start, end, (symbol, source) in self._automaton.iter_matches(text):
+            if not self._is_word(text, start, end, tweet):
+                continue
+            if (
+                source in ("name", "alias") and text[start:end] in self._common_words
+                and not self._corroborated(text, start, end, tweet)
+            ):
+                source = "common_word"
+            mentions.setdefault(symbol, []).append((start, source))
+        for match in TICKER_REGEX.finditer(tweet):
+            symbol = match.group(1).upper()
+            if symbol not in self._universe:
+                mentions.setdefault(symbol, []).append((match.start(), "unlisted_cashtag"))
+
+        candidates = []
+        for symbol, found in mentions.items():
+            miss = 1.0
+            for _, source in found:
+                miss *= 1.0 - SOURCE_SCORES[source]
+            first = min(start for start, _ in found)
+            sources = sorted({source for _, source in found})
+            candidates.append((-(1.0 - miss), first, Candidate(symbol, 1.0 - miss, sources)))
+        candidates.sort(key=lambda c: (c[0], c[1]))
+        return [candidate for _, _, candidate in candidates]
+
+    def extract_ticker(self, tweet, min_score=0.5):
+        """
+        Returns the best candidate symbol above min_score, or None.
+        """
+        candidates = self.extract(tweet)
+        if candidates and candidates[0].score >= min_score:
+            return candidates[0].symbol
+        return None
+
+    def extract_tickers(self, tweet, min_score=0.5):
+        """
+        Returns every candidate symbol above min_score, most confident
+        first, for reports naming several targets.
+        """
+        return [
+            candidate.symbol for candidate in self.extract(tweet)
+            if candidate.score >= min_score
+        ]
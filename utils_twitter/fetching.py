@@ -1,32 +1,130 @@
 #
-from .rest import tw_handle
-
-import tweepy
-import pandas as pd
+# pandas, pyarrow and tweepy (and the REST handle) are imported on first
+# use, so importing this module stays cheap
+from concurrent.futures import ThreadPoolExecutor
+from . import rest
+import threading
+import json
+import os
 
 attributes = [
     "created_at", "full_text", "id", 
     "retweet_count", "favorite_count"
 ]
 
-def fetch_timeline(timeline):
-    fetched = tweepy.Cursor(
-        method=tw_handle.user_timeline, id=timeline, 
-        tweet_mode='extended', include_rts=False, trim_user=True
-    )
+def _to_frame(tweets, timeline):
     tweet_dicts = []
-    for tweet in fetched.items():
+    for tweet in tweets:
         tweet_dict = {}
         for attribute in attributes:
             tweet_dict[attribute] = getattr(tweet, attribute)
         tweet_dicts.append(tweet_dict)
+    import pandas as pd
     tweet_df = pd.DataFrame(tweet_dicts, columns=attributes)
     tweet_df["timeline"] = timeline
     return tweet_df
 
-def fetch_timelines(timelines):
-    tweet_dfs = []
-    for timeline in timelines:
-        tweet_df = fetch_timeline(timeline)
-        tweet_dfs.append(tweet_df)
-    return pd.concat(tweet_dfs)
\ No newline at end of file
+def _cursor(timeline, since_id=None):
+    import tweepy
+    return tweepy.Cursor(
+        method=rest.tw_handle.user_timeline, id=timeline, 
+        tweet_mode='extended', include_rts=False, trim_user=True,
+        since_id=since_id
+    )
+
+def iter_timeline_pages(timeline, since_id=None):
+    """
+    Yields one DataFrame per fetched page (newest first), so a timeline
+    never has to be held in memory as a whole.
+    """
+    for page in _cursor(timeline, since_id).pages():
+        yield _to_frame(page, timeline)
+
+def fetch_timeline(timeline, since_id=None):
+    fetched = _cursor(timeline, since_id)
+    return _to_frame(fetched.items(), timeline)
+
+def fetch_timelines(timelines, max_workers=8):
+    """
+    Fetches timelines concurrently. The tweepy handle waits on rate
+    limits, so workers pause instead of failing when the limit is hit.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        tweet_dfs = list(pool.map(fetch_timeline, timelines))
+    import pandas as pd
+    return pd.concat(tweet_dfs)
+
+
+class TimelineStore():
+    """
+    Parquet store of fetched timelines, partitioned by timeline
+    ({path}/timeline={name}/part-*.parquet). The newest fetched id of each
+    timeline is persisted in {path}/_state.json, so updates only fetch
+    tweets posted since the previous run.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._state_path = os.path.join(path, "_state.json")
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._state = {}
+        if os.path.exists(self._state_path):
+            with open(self._state_path, "r") as src:
+                self._state = json.load(src)
+
+    def _save_state(self):
+        tmp_path = f"{self._state_path}.tmp"
+        with open(tmp_path, "w") as out:
+            json.dump(self._state, out)
+        os.replace(tmp_path, self._state_path)
+
+    def since_id(self, timeline):
+        return self._state.get(timeline)
+
+    def update(self, timeline):
+        """
+        Appends the tweets posted since the stored since_id, one Parquet
+        file per page. Returns the number of new tweets.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        partition = os.path.join(self._path, f"timeline={timeline}")
+        os.makedirs(partition, exist_ok=True)
+        newest_id = self.since_id(timeline)
+        n_tweets = 0
+        for page_df in iter_timeline_pages(timeline, since_id=newest_id):
+            if page_df.empty:
+                continue
+            page_df = page_df.drop(columns=["timeline"])
+            first_id, last_id = page_df["id"].min(), page_df["id"].max()
+            table = pa.Table.from_pandas(page_df, preserve_index=False)
+            pq.write_table(table, os.path.join(partition, f"part-{first_id}-{last_id}.parquet"))
+            n_tweets += len(page_df)
+            if newest_id is None or last_id > newest_id:
+                newest_id = int(last_id)
+        with self._lock:
+            if newest_id is not None:
+                self._state[timeline] = newest_id
+            self._save_state()
+        return n_tweets
+
+    def update_all(self, timelines, max_workers=8):
+        """
+        Updates all timelines concurrently. Returns {timeline: n_new_tweets}.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            counts = list(pool.map(self.update, timelines))
+        return dict(zip(timelines, counts))
+
+    def load(self, timelines=None, columns=None):
+        """
+        Reads the store (optionally a subset of timelines and columns)
+        into a DataFrame, dropping tweets written twice by interrupted runs.
+        """
+        import pandas as pd
+        filters = [("timeline", "in", list(timelines))] if timelines else None
+        tweet_df = pd.read_parquet(self._path, columns=columns, filters=filters)
+        if "id" in tweet_df.columns:
+            tweet_df = tweet_df.drop_duplicates(subset="id")
+        return tweet_df
@@ -1,33 +1,68 @@
 #
 from .processing import extract_ticker
+from .pipeline import StreamPipeline, write_txt_batch
+from utils_metrics.latency import RECORDER
 import json
+import time
 from datetime import datetime
 
 
-def extract_basics(line):
-    response_json = json.loads(line)
+def extract_basics(line, ticker_extractor=None):
+    """
+    Parses a stream line into a record. Tickers are the cashtags of the
+    tweet, or the symbols found by ticker_extractor (a TickerExtractor)
+    if given.
+    """
+    received_ns = time.time_ns()
+    with RECORDER.stage("json_parse"):
+        response_json = json.loads(line)
     tid = response_json["data"]["id"]
     text = response_json["data"]["text"]
-    ticker = extract_ticker(text)
+    with RECORDER.stage("ticker_extraction"):
+        if ticker_extractor is not None:
+            tickers = ticker_extractor.extract_tickers(text)
+        else:
+            tickers = extract_ticker(text, all_tickers=True)
+    ticker = tickers[0] if tickers else None
+    created_at = response_json["data"].get("created_at")
+    if created_at is not None:
+        created_ns = int(datetime.fromisoformat(created_at.replace("Z", "+00:00")).timestamp() * 1e9)
+        RECORDER.record("tweet_to_receipt", received_ns - created_ns)
     timeline = response_json["matching_rules"][0]["tag"]
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")  
     response_dict = {
-        "tid": tid, "text": text, "ticker": ticker,
+        "tid": tid, "text": text, "ticker": ticker, "tickers": tickers,
         "timeline": timeline, "timestamp": timestamp
     }
     return response_dict
 
 
 def listener_a(response, kwargs):
-    for response_line in response.iter_lines():
-        if response_line:
-            response_dict = extract_basics(response_line)
-            outpath = (
-                kwargs["local_path"] 
-                + response_dict["timeline"] 
-                + "___"
-                + response_dict["tid"]
-            )
-            print(response_dict)
-            with open(f"{outpath}.txt", "w") as out:
-                json.dump(response_dict, out)
\ No newline at end of file
+    """
+    Handles the stream through a StreamPipeline: the signal reaches
+    kwargs["on_signal"] (if any) before the tweet is written by the
+    batched persistence stage, to kwargs["tweet_log"] (a TweetLog) if
+    given and as files in kwargs["local_path"] otherwise.
+    Optional kwargs: queue_size, policies, batch_size, flush_interval,
+    verbose, signal_filter, ticker_extractor.
+    """
+    tweet_log = kwargs.get("tweet_log")
+    if tweet_log is not None:
+        persist = tweet_log.append
+    else:
+        local_path = kwargs["local_path"]
+        persist = lambda records: write_txt_batch(records, local_path)
+    ticker_extractor = kwargs.get("ticker_extractor")
+    pipeline = StreamPipeline(
+        parse=lambda line: extract_basics(line, ticker_extractor),
+        on_signal=kwargs.get("on_signal"),
+        persist=persist,
+        queue_size=kwargs.get("queue_size", 1000),
+        policies=kwargs.get("policies"),
+        batch_size=kwargs.get("batch_size", 100),
+        flush_interval=kwargs.get("flush_interval", 1.0),
+        verbose=kwargs.get("verbose", True),
+        signal_filter=kwargs.get("signal_filter")
+    )
+    pipeline.run(response)
+    return pipeline
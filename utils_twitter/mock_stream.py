@@ -0,0 +1,156 @@
+#
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import threading
+import queue
+import json
+import time
+
+STREAM_PATH = "/2/tweets/search/stream"
+RECENT_SEARCH_PATH = "/2/tweets/search/recent"
+
+
+class MockStreamHandler(BaseHTTPRequestHandler):
+    """
+    Serves the filtered stream (chunked, one line per chunk) and the
+    recent-search endpoint.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == STREAM_PATH:
+            return self._stream()
+        if url.path == RECENT_SEARCH_PATH:
+            return self._recent(parse_qs(url.query))
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _stream(self):
+        server = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.close_connection = True
+        lines, generation = server._register()
+        try:
+            while generation == server._generation:
+                try:
+                    line = lines.get(timeout=server.keepalive_interval)
+                except queue.Empty:
+                    line = b""
+                if generation != server._generation:
+                    break
+                if time.monotonic() < server._stalled_until:
+                    continue
+                chunk = line + b"\r\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            server._unregister(lines)
+
+    def _recent(self, query):
+        server = self.server
+        rule_value = query.get("query", [""])[0]
+        since_id = int(query.get("since_id", ["0"])[0])
+        with server._lock:
+            found = [
+                tweet for tweet, value in server.recent
+                if value == rule_value and int(tweet["id"]) > since_id
+            ]
+        found.sort(key=lambda tweet: -int(tweet["id"]))
+        body = json.dumps({"data": found, "meta": {"result_count": len(found)}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockStreamServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Twitter filtered stream. Tweets are fed with
+    feed(); stall() silences the connection (no tweets, no keep-alives)
+    and drop() closes it. Every fed tweet is also kept for recent search,
+    so tweets lost during a stall or drop can be backfilled.
+    """
+
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, host="127.0.0.1", port=0, keepalive_interval=1.0):
+        super().__init__((host, port), MockStreamHandler)
+        self.keepalive_interval = keepalive_interval
+        self.recent = []
+        self._lock = threading.Lock()
+        self._connections = []
+        self._generation = 0
+        self._stalled_until = 0.0
+        self._next_id = 1000
+
+    @property
+    def base_uri(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def supervisor_kwargs(self):
+        """
+        Returns the SupervisedStream endpoints pointing at this server.
+        """
+        return {
+            "streaming_uri": self.base_uri + STREAM_PATH,
+            "recent_search_uri": self.base_uri + RECENT_SEARCH_PATH
+        }
+
+    def _register(self):
+        lines = queue.Queue()
+        with self._lock:
+            self._connections.append(lines)
+            return lines, self._generation
+
+    def _unregister(self, lines):
+        with self._lock:
+            if lines in self._connections:
+                self._connections.remove(lines)
+
+    def feed(self, text, rule):
+        """
+        Publishes a tweet matching rule ({"value", "tag"}) and returns its id.
+        """
+        with self._lock:
+            self._next_id += 1
+            tweet = {
+                "id": str(self._next_id), "text": text,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+            }
+            self.recent.append((tweet, rule["value"]))
+            connections = list(self._connections)
+        if time.monotonic() >= self._stalled_until:
+            line = json.dumps({"data": tweet, "matching_rules": [{"tag": rule["tag"]}]})
+            for lines in connections:
+                lines.put(line.encode())
+        return tweet["id"]
+
+    def stall(self, seconds):
+        self._stalled_until = time.monotonic() + seconds
+
+    def drop(self):
+        with self._lock:
+            self._generation += 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.drop()
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,229 @@
+#
+from utils_metrics.latency import RECORDER
+import threading
+import queue
+import json
+import time
+
+STAGES = ["parse", "dispatch", "persist"]
+POLICIES = ["block", "drop_new", "drop_oldest"]
+_STOP = object()
+
+
+class StageQueue():
+    """
+    Bounded queue between two pipeline stages. When full, "block" waits
+    for the consumer (backpressure), "drop_new" discards the incoming item
+    and "drop_oldest" discards the oldest queued item.
+    """
+
+    def __init__(self, maxsize=1000, policy="block"):
+        if policy not in POLICIES:
+            err_msg = f"Error(): unknown policy {policy}, expected one of {POLICIES}."
+            raise Exception(err_msg)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._policy = policy
+        self.dropped = 0
+
+    def put(self, item):
+        if item is _STOP or self._policy == "block":
+            self._queue.put(item)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                if self._policy == "drop_new":
+                    self.dropped += 1
+                    return
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+def write_txt_batch(records, local_path):
+    """
+    Default persistence: one {timeline}___{tid}.txt JSON file per record.
+    """
+    for record in records:
+        outpath = local_path + record["timeline"] + "___" + record["tid"]
+        with open(f"{outpath}.txt", "w") as out:
+            json.dump(record, out)
+
+
+class StreamPipeline():
+    """
+    Staged stream handling: a reader thread pulls lines off the response,
+    a parse stage extracts the signal, a dispatch stage hands it to the
+    trading callback and a persistence stage writes records in batches.
+    Stages are connected by bounded StageQueues, so a slow disk never
+    delays reading the stream or dispatching the signal.
+    """
+
+    def __init__(
+        self, parse, on_signal=None, persist=None, queue_size=1000,
+        policies=None, batch_size=100, flush_interval=1.0, verbose=True,
+        signal_filter=None
+    ):
+        """
+        parse turns a raw line into a record dict, on_signal(record) is
+        called before any disk I/O and persist(records) receives batches of
+        at most batch_size records, flushed at least every flush_interval
+        seconds. policies maps stage names to a full-queue policy.
+        signal_filter (a SignalFilter) keeps duplicates and tickers in
+        cooldown away from on_signal; they are still persisted, with the
+        reason in record["filtered"]. Tickers enter their cooldown only
+        when on_signal returned without raising. A record the filter fails
+        on is reported and persisted as "filter_error", not signalled.
+        """
+        policies = {**{stage: "block" for stage in STAGES}, **(policies or {})}
+        self._parse = parse
+        self._on_signal = on_signal
+        self._persist = persist
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._verbose = verbose
+        self._signal_filter = signal_filter
+        self.filtered = 0
+        self.queues = {
+            stage: StageQueue(queue_size, policies[stage]) for stage in STAGES
+        }
+        self.errors = {stage: 0 for stage in STAGES}
+        self._threads = []
+
+    def _report(self, stage, exc):
+        self.errors[stage] += 1
+        if self._verbose:
+            print(f"Pipeline stage {stage} failed: {exc}")
+
+    def _read(self, response):
+        try:
+            for line in response.iter_lines():
+                if line:
+                    self.queues["parse"].put((time.perf_counter_ns(), line))
+        finally:
+            self.queues["parse"].put(_STOP)
+
+    def _parse_stage(self):
+        while True:
+            item = self.queues["parse"].get()
+            if item is _STOP:
+                self.queues["dispatch"].put(_STOP)
+                return
+            received_ns, line = item
+            RECORDER.record("queue_wait.parse", time.perf_counter_ns() - received_ns)
+            try:
+                self.queues["dispatch"].put((received_ns, self._parse(line)))
+            except Exception as exc:
+                self._report("parse", exc)
+
+    def _dispatch_stage(self):
+        while True:
+            item = self.queues["dispatch"].get()
+            if item is _STOP:
+                self.queues["persist"].put(_STOP)
+                return
+            received_ns, record = item
+            RECORDER.record("receipt_to_dispatch", time.perf_counter_ns() - received_ns)
+            if self._signal_filter is not None:
+                try:
+                    with RECORDER.stage("signal_filter"):
+                        reason = self._signal_filter.check(record)
+                    if reason is not None:
+                        self.filtered += 1
+                except Exception as exc:
+                    reason = "filter_error"
+                    self._report("dispatch", exc)
+                if reason is not None:
+                    record["filtered"] = reason
+                    self.queues["persist"].put(record)
+                    continue
+            handled = True
+            if self._on_signal is not None:
+                try:
+                    with RECORDER.stage("signal_callback"):
+                        self._on_signal(record)
+                except Exception as exc:
+                    handled = False
+                    self._report("dispatch", exc)
+                RECORDER.record("receipt_to_signal_done", time.perf_counter_ns() - received_ns)
+            if handled and self._signal_filter is not None:
+                self._signal_filter.confirm(record)
+            self.queues["persist"].put(record)
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        if self._verbose:
+            for record in batch:
+                print(record)
+        if self._persist is not None:
+            try:
+                self._persist(batch)
+            except Exception as exc:
+                self._report("persist", exc)
+
+    def _persist_stage(self):
+        batch = []
+        deadline = time.monotonic() + self._flush_interval
+        while True:
+            try:
+                record = self.queues["persist"].get(
+                    timeout=max(deadline - time.monotonic(), 0.0)
+                )
+            except queue.Empty:
+                record = None
+            if record is _STOP:
+                self._flush(batch)
+                return
+            if record is not None:
+                batch.append(record)
+            if len(batch) >= self._batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self._flush_interval
+
+    def start(self, response):
+        """
+        Starts all stages on the given streamed response.
+        """
+        self._threads = [
+            threading.Thread(target=self._read, args=(response,), daemon=True),
+            threading.Thread(target=self._parse_stage, daemon=True),
+            threading.Thread(target=self._dispatch_stage, daemon=True),
+            threading.Thread(target=self._persist_stage, daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def join(self):
+        """
+        Waits until the stream ends and every stage has drained.
+        """
+        for thread in self._threads:
+            thread.join()
+
+    def run(self, response):
+        self.start(response)
+        self.join()
+
+    def stats(self):
+        stats = {
+            stage: {
+                "depth": self.queues[stage].qsize(),
+                "dropped": self.queues[stage].dropped,
+                "errors": self.errors[stage]
+            }
+            for stage in STAGES
+        }
+        stats["dispatch"]["filtered"] = self.filtered
+        return stats
@@ -1,21 +1,33 @@
 #
 import re
 
-TICKER_REPATTERN = r"\$[a-zA-Z]*"
-
-def extract_ticker(tweet, take_first_ticker=True):
-    try:
-        matched = re.findall(TICKER_REPATTERN, tweet)
-        tickers = [tckr.replace("$", "") for tckr in matched if tckr != "$"]
-    except:
-        tickers = None
-    if len(tickers) > 1:
-        if take_first_ticker:
-            ticker = tickers[0]
-        else:
-            raise Exception("Multiple tickers")
-    else:
-        ticker = tickers[0]
-    return ticker
+# Class or exchange suffix of a cashtag: short and uppercase, so "$NKLA.The" is $NKLA
+SUFFIX_REPATTERN = r"[.\-][A-Z]{1,3}(?![a-zA-Z])"
+SUFFIX_REGEX = re.compile(SUFFIX_REPATTERN)
+# Cashtags with an optional class or exchange suffix: $NKLA, $BRK.B, $RIO.L, $BRK-B
+TICKER_REPATTERN = r"\$([a-zA-Z]{1,6}(?:" + SUFFIX_REPATTERN + r")?)(?![a-zA-Z])"
+TICKER_REGEX = re.compile(TICKER_REPATTERN)
 
+def extract_tickers(tweet):
+    """
+    Returns all cashtags of the tweet in order of appearance, without "$".
+    """
+    return TICKER_REGEX.findall(tweet or "")
 
+def extract_ticker(tweet, take_first_ticker=True, all_tickers=False):
+    """
+    Returns the first cashtag of the tweet, or None. With all_tickers,
+    returns every distinct cashtag (case-insensitive) in order of
+    appearance instead, for reports naming several targets.
+    """
+    tickers = extract_tickers(tweet)
+    if all_tickers:
+        distinct = {}
+        for ticker in tickers:
+            distinct.setdefault(ticker.upper(), ticker)
+        return list(distinct.values())
+    if not tickers:
+        return None
+    if len(tickers) > 1 and not take_first_ticker:
+        raise Exception("Multiple tickers")
+    return tickers[0]
@@ -0,0 +1,117 @@
+#
+from .listeners import listener_a
+from .tweet_log import TweetLogReader, list_segments
+import random
+import json
+import time
+import os
+
+PATTERNS = ["constant", "burst", "poisson"]
+
+
+def load_recorded(log_dir):
+    """
+    Rebuilds filtered-stream lines from the records written by listener_a,
+    either a TweetLog directory or {timeline}___{tid}.txt files, in tweet
+    id order.
+    """
+    if list_segments(log_dir):
+        records = list(TweetLogReader(log_dir).scan())
+    else:
+        records = []
+        for filename in os.listdir(log_dir):
+            if filename.endswith(".txt"):
+                with open(os.path.join(log_dir, filename), "r") as src:
+                    records.append(json.load(src))
+    tweets = []
+    for record in records:
+        tweets.append({
+            "data": {"id": record["tid"], "text": record["text"]},
+            "matching_rules": [{"tag": record["timeline"]}]
+        })
+    tweets.sort(key=lambda tweet: int(tweet["data"]["id"]))
+    return tweets
+
+
+def synthetic_lines(n_tweets, tickers, tags=("replay",), seed=0):
+    """
+    Generates n_tweets filtered-stream lines mentioning a random ticker.
+    """
+    rng = random.Random(seed)
+    templates = [
+        "New report: we are short ${ticker}, full thread below",
+        "${ticker} accounting irregularities, our research is out",
+        "Why ${ticker} is worth a fraction of its market cap",
+    ]
+    return [
+        {
+            "data": {
+                "id": str(10 ** 18 + i),
+                "text": rng.choice(templates).format(ticker=rng.choice(tickers))
+            },
+            "matching_rules": [{"tag": rng.choice(tags)}]
+        }
+        for i in range(n_tweets)
+    ]
+
+
+class ReplayResponse():
+    """
+    Response-like object serving tweets through iter_lines() at rate tweets
+    per second, so it can be handed to any stream listener.
+
+    "constant" spaces tweets evenly, "burst" sends burst_size tweets back to
+    back every burst_size / rate seconds and "poisson" draws exponential
+    inter-arrival times. created_at is stamped at emission time so that
+    tweet_to_receipt measures the replayed path only.
+    """
+
+    def __init__(self, tweets, rate=10.0, pattern="constant", burst_size=10, seed=0):
+        if pattern not in PATTERNS:
+            err_msg = f"Error(ReplayResponse): unknown pattern {pattern}, expected one of {PATTERNS}."
+            raise Exception(err_msg)
+        self._tweets = tweets
+        self._rate = rate
+        self._pattern = pattern
+        self._burst_size = burst_size
+        self._rng = random.Random(seed)
+        self.sent = 0
+
+    def _gaps(self):
+        for i in range(len(self._tweets)):
+            if not self._rate:
+                yield 0.0
+            elif self._pattern == "constant":
+                yield 1.0 / self._rate
+            elif self._pattern == "burst":
+                yield self._burst_size / self._rate if i % self._burst_size == 0 else 0.0
+            else:
+                yield self._rng.expovariate(self._rate)
+
+    def iter_lines(self, chunk_size=None):
+        next_at = time.monotonic()
+        for tweet, gap in zip(self._tweets, self._gaps()):
+            if self.sent:
+                next_at += gap
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            now = time.time()
+            created_at = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now))
+            created_at = f"{created_at}.{int(now % 1 * 1000):03d}Z"
+            tweet = {**tweet, "data": {**tweet["data"], "created_at": created_at}}
+            self.sent += 1
+            yield json.dumps(tweet).encode()
+
+    def close(self):
+        pass
+
+
+def replay(tweets, listener=listener_a, rate=10.0, pattern="constant", burst_size=10, **kwargs):
+    """
+    Feeds tweets into listener exactly like handle_stream does with the
+    live response and returns the listener result (the StreamPipeline for
+    listener_a). kwargs are passed through to the listener.
+    """
+    response = ReplayResponse(tweets, rate, pattern, burst_size)
+    return listener(response, kwargs)
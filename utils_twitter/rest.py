@@ -1,19 +1,27 @@
 #
-import tweepy
 
-def rest_handle(api_key, api_secret, access_token, access_secret):
+def rest_handle(api_key, api_secret, access_token, access_secret, wait_on_rate_limit=True):
     """
     Sets OAuth credentials in tweepy:
         (api_key, api_secret, access_token, access_secret)
-    Opens and returns a tweepy api handler
+    Opens and returns a tweepy api handler that sleeps through
+    rate limit windows instead of failing by default.
     """
+    import tweepy
     auth = tweepy.OAuthHandler(api_key, api_secret)
     auth.set_access_token(access_token, access_secret)
-    handle = tweepy.API(auth)
+    handle = tweepy.API(auth, wait_on_rate_limit=wait_on_rate_limit)
     return handle
 
-if "tw_handle" not in globals():
+def __getattr__(name):
+    """
+    Builds tw_handle from the config credentials on first access instead
+    of at import.
+    """
+    if name != "tw_handle":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
     from .config import API_KEY, API_SECRET
     from .config import ACCESS_TOKEN, ACCESS_SECRET
-    tw_handle = rest_handle(API_KEY, API_SECRET, ACCESS_TOKEN, ACCESS_SECRET)
-
+    handle = rest_handle(API_KEY, API_SECRET, ACCESS_TOKEN, ACCESS_SECRET)
+    globals()["tw_handle"] = handle
+    return handle
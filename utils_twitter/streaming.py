@@ -1,9 +1,15 @@
 #
+from collections import OrderedDict
 import requests
+import random
 import json
+import time
 
 RULES_URI = "https://api.twitter.com/2/tweets/search/stream/rules"
 STREAMING_URI = "https://api.twitter.com/2/tweets/search/stream"
+RECENT_SEARCH_URI = "https://api.twitter.com/2/tweets/search/recent"
+# created_at is requested so that receipt latency can be measured
+TWEET_FIELDS = {"tweet.fields": "created_at"}
 
 
 def create_headers(bearer_token):
@@ -41,9 +47,154 @@ def set_rules(headers, rules):
 
 
 def handle_stream(headers, listener, **kwargs):
-    response = requests.get(STREAMING_URI, headers=headers, stream=True)
+    response = requests.get(STREAMING_URI, headers=headers, params=TWEET_FIELDS, stream=True)
     if response.status_code != 200:
         err_msg = f"Cannot add rules (HTTP {response.status_code}): {response.text}"
         raise Exception(err_msg)
     print("Stream handling started...")
-    listener(response, kwargs)
\ No newline at end of file
+    listener(response, kwargs)
+
+
+class SupervisedStream():
+    """
+    Response-like wrapper whose iter_lines() survives stalls and dropped
+    connections. The stream is read with a read timeout of stall_timeout
+    (Twitter sends a keep-alive every 20s), reconnected with jittered
+    exponential backoff, and tweets missed during a gap are backfilled
+    from the recent-search endpoint. Tweets are de-duplicated by id.
+    on_connect, if given, is called every time the stream is (re)opened.
+    """
+
+    def __init__(
+        self, headers, rules, stall_timeout=30.0, connect_timeout=3.05,
+        backoff_base=0.05, backoff_cap=16.0, dedup_size=10000,
+        streaming_uri=STREAMING_URI, recent_search_uri=RECENT_SEARCH_URI,
+        on_connect=None
+    ):
+        self._headers = headers
+        self._rules = rules
+        self._timeout = (connect_timeout, stall_timeout)
+        self._backoff_base = backoff_base
+        self._backoff_cap = backoff_cap
+        self._dedup_size = dedup_size
+        self._streaming_uri = streaming_uri
+        self._recent_search_uri = recent_search_uri
+        self._on_connect = on_connect
+        self._seen = OrderedDict()
+        self._last_id = None
+        self._response = None
+        self._closed = False
+        self.reconnects = 0
+        self.backfilled = 0
+
+    def _connect(self):
+        response = requests.get(
+            self._streaming_uri, headers=self._headers, params=TWEET_FIELDS,
+            stream=True, timeout=self._timeout
+        )
+        if response.status_code != 200:
+            err_msg = f"Cannot open stream (HTTP {response.status_code}): {response.text}"
+            raise requests.exceptions.ConnectionError(err_msg)
+        self._response = response
+        if self._on_connect is not None:
+            self._on_connect()
+        return response
+
+    def _backoff(self, attempt):
+        """
+        Full-jitter exponential backoff. The first attempt waits at most
+        backoff_base, so a transient drop reconnects well under a second.
+        """
+        delay = min(self._backoff_cap, self._backoff_base * 2 ** attempt)
+        time.sleep(random.uniform(0, delay))
+
+    def _accept(self, tid):
+        """
+        Returns False for already seen tweet ids, records new ones.
+        """
+        if tid in self._seen:
+            return False
+        self._seen[tid] = None
+        if len(self._seen) > self._dedup_size:
+            self._seen.popitem(last=False)
+        if self._last_id is None or int(tid) > int(self._last_id):
+            self._last_id = tid
+        return True
+
+    def _backfill(self):
+        """
+        Fetches tweets newer than the last seen id for every rule, oldest
+        first, formatted like stream lines with the rule's tag.
+        """
+        lines = []
+        for rule in self._rules:
+            params = {
+                "query": rule["value"], "since_id": self._last_id,
+                "max_results": 100, **TWEET_FIELDS
+            }
+            while True:
+                response = requests.get(
+                    self._recent_search_uri, headers=self._headers,
+                    params=params, timeout=self._timeout
+                )
+                if response.status_code != 200:
+                    break
+                body = response.json()
+                for tweet in body.get("data", []):
+                    line = {"data": tweet, "matching_rules": [{"tag": rule["tag"]}]}
+                    lines.append((int(tweet["id"]), json.dumps(line).encode()))
+                next_token = body.get("meta", {}).get("next_token")
+                if next_token is None:
+                    break
+                params["next_token"] = next_token
+        lines.sort(key=lambda line: line[0])
+        return [line for _, line in lines]
+
+    def iter_lines(self):
+        attempt = 0
+        while not self._closed:
+            try:
+                response = self._connect()
+                if self._last_id is not None:
+                    for line in self._backfill():
+                        if self._accept(json.loads(line)["data"]["id"]):
+                            self.backfilled += 1
+                            yield line
+                attempt = 0
+                # chunk_size=None hands over every chunk as soon as it arrives
+                for line in response.iter_lines(chunk_size=None):
+                    if not line:
+                        continue
+                    try:
+                        tid = json.loads(line)["data"]["id"]
+                    except (ValueError, KeyError):
+                        yield line
+                        continue
+                    if self._accept(tid):
+                        yield line
+            except requests.exceptions.RequestException:
+                pass
+            except Exception:
+                # close() from another thread tears the response down mid-read
+                if not self._closed:
+                    raise
+            if self._closed:
+                return
+            self.reconnects += 1
+            self._backoff(attempt)
+            attempt += 1
+
+    def close(self):
+        self._closed = True
+        if self._response is not None:
+            self._response.close()
+
+
+def handle_supervised_stream(headers, rules, listener, supervisor_kwargs=None, **kwargs):
+    """
+    Like handle_stream, but the listener reads from a SupervisedStream
+    that reconnects and backfills on its own.
+    """
+    stream = SupervisedStream(headers, rules, **(supervisor_kwargs or {}))
+    print("Supervised stream handling started...")
+    return listener(stream, kwargs)
@@ -0,0 +1,325 @@
+#
+from datetime import datetime
+from functools import lru_cache
+import threading
+import hashlib
+import struct
+import mmap
+import json
+import sys
+import os
+
+SEGMENT_BYTES = 64 * 1024 * 1024
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Fixed-size sidecar entries: where a record is and what it is about, one
+# per ticker of the record (at least one), all with the record's offset
+INDEX_FIELDS = [
+    ("offset", "<u8"), ("length", "<u4"), ("ts", "<i8"),
+    ("tid", "<u8"), ("timeline", "<u8"), ("ticker", "<u8")
+]
+INDEX_ENTRY = struct.Struct("<QIqQQQ")
+
+
+@lru_cache(maxsize=None)
+def index_dtype():
+    """
+    NumPy dtype of a sidecar entry. NumPy is only needed to read, so the
+    writer in the stream process does not import it.
+    """
+    import numpy as np
+    return np.dtype(INDEX_FIELDS)
+
+
+def key_hash(value):
+    """
+    64-bit hash of a timeline or ticker, 0 for None.
+    """
+    if value is None:
+        return 0
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "little")
+
+
+def to_seconds(value):
+    """
+    Converts a record timestamp ("%Y-%m-%d %H:%M:%S", local time, as
+    written by extract_basics) or a datetime to epoch seconds.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        value = datetime.strptime(value, TIMESTAMP_FORMAT)
+    return int(value.timestamp())
+
+
+def _tid(record):
+    tid = str(record["tid"])
+    return int(tid) if tid.isdigit() and len(tid) < 20 else key_hash(tid)
+
+
+def _tickers(record):
+    """
+    Every ticker a record is about, in order and without repeats, or
+    [None] if there is none.
+    """
+    tickers = list(record.get("tickers") or [record.get("ticker")])
+    tickers += record.get("cooldown_tickers") or []
+    return list(dict.fromkeys(tickers)) or [None]
+
+
+def _segment_name(number):
+    return f"segment_{number:06d}"
+
+
+class TweetLog():
+    """
+    Segmented append-only log of stream records. Records are appended as
+    JSON lines to segment_NNNNNN.log, rotated after segment_bytes, and
+    every record gets fixed-size entries in the segment_NNNNNN.idx sidecar
+    (offset, length, timestamp, tid and timeline/ticker hashes), one per
+    ticker, so readers select records by any of their tickers without
+    parsing the others.
+
+    append(records) has the persist signature of StreamPipeline.
+    """
+
+    def __init__(self, path, segment_bytes=SEGMENT_BYTES, fsync=False):
+        self._path = path
+        self._segment_bytes = segment_bytes
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        segments = list_segments(path)
+        self._number = segments[-1] if segments else 0
+        self._open_segment()
+
+    def _open_segment(self):
+        base = os.path.join(self._path, _segment_name(self._number))
+        self._recover(base)
+        self._log = open(f"{base}.log", "ab")
+        self._idx = open(f"{base}.idx", "ab")
+
+    def _recover(self, base):
+        """
+        Makes the index of a segment match its log after a crash: drops a
+        partial trailing entry or record, re-indexes the last indexed
+        record (some of its ticker entries may be missing) and indexes
+        records appended to the log but missing from the index.
+        """
+        log_path, idx_path = f"{base}.log", f"{base}.idx"
+        if not os.path.exists(log_path):
+            return
+        last_offset = None
+        if os.path.exists(idx_path):
+            with open(idx_path, "r+b") as idx:
+                n_entries = os.path.getsize(idx_path) // INDEX_ENTRY.size
+                while n_entries:
+                    idx.seek((n_entries - 1) * INDEX_ENTRY.size)
+                    offset = INDEX_ENTRY.unpack(idx.read(INDEX_ENTRY.size))[0]
+                    if last_offset is not None and offset != last_offset:
+                        break
+                    last_offset = offset
+                    n_entries -= 1
+                idx.truncate(n_entries * INDEX_ENTRY.size)
+        indexed_end = last_offset or 0
+        with open(log_path, "r+b") as log:
+            log.seek(indexed_end)
+            tail = log.read()
+            complete = tail.rfind(b"\n") + 1
+            log.truncate(indexed_end + complete)
+        entries = []
+        offset = indexed_end
+        for line in tail[:complete].splitlines(keepends=True):
+            entries += self._entries(json.loads(line), offset, len(line))
+            offset += len(line)
+        if entries:
+            with open(idx_path, "ab") as idx:
+                idx.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in entries))
+
+    @staticmethod
+    def _entries(record, offset, length):
+        ts = to_seconds(record.get("timestamp"))
+        tid, timeline = _tid(record), key_hash(record.get("timeline"))
+        return [
+            (offset, length, ts, tid, timeline, key_hash(ticker))
+            for ticker in _tickers(record)
+        ]
+
+    def rotate(self):
+        """
+        Closes the current segment and starts the next one.
+        """
+        with self._lock:
+            self._close_files()
+            self._number += 1
+            self._open_segment()
+
+    def append(self, records):
+        """
+        Appends a batch of records with one write to the log and one to
+        the index.
+        """
+        with self._lock:
+            offset = self._log.tell()
+            lines, entries = [], []
+            for record in records:
+                line = (json.dumps(record) + "\n").encode()
+                entries += self._entries(record, offset, len(line))
+                lines.append(line)
+                offset += len(line)
+            self._log.write(b"".join(lines))
+            self._log.flush()
+            self._idx.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in entries))
+            self._idx.flush()
+            if self._fsync:
+                os.fsync(self._log.fileno())
+                os.fsync(self._idx.fileno())
+            rotate = offset >= self._segment_bytes
+        if rotate:
+            self.rotate()
+
+    def _close_files(self):
+        self._log.close()
+        self._idx.close()
+
+    def close(self):
+        with self._lock:
+            self._close_files()
+
+
+def list_segments(path):
+    return sorted(
+        int(name[len("segment_"):-len(".log")]) for name in os.listdir(path)
+        if name.startswith("segment_") and name.endswith(".log")
+    )
+
+
+def read_index(idx_path):
+    """
+    Loads the complete entries of a sidecar index.
+    """
+    import numpy as np
+    if not os.path.exists(idx_path):
+        return np.empty(0, dtype=index_dtype())
+    with open(idx_path, "rb") as idx:
+        data = idx.read()
+    return np.frombuffer(data[:len(data) - len(data) % INDEX_ENTRY.size], dtype=index_dtype())
+
+
+def first_entries(index):
+    """
+    Boolean mask of the first entry of each record in a sidecar index.
+    """
+    import numpy as np
+    first = np.ones(len(index), dtype=bool)
+    first[1:] = index["offset"][1:] != index["offset"][:-1]
+    return first
+
+
+class TweetLogReader():
+    """
+    Reads a TweetLog through memory-mapped segments. Queries filter the
+    sidecar indexes (NumPy arrays) by timeline, ticker, tid and time range
+    and only decode the matching records. A record matches a ticker filter
+    if any of its tickers is the given one.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._maps = {}
+        self.reload()
+
+    def reload(self):
+        """
+        Re-reads the indexes, e.g. to see records appended since opening.
+        """
+        self.close()
+        self._segments = [
+            (number, read_index(os.path.join(self._path, f"{_segment_name(number)}.idx")))
+            for number in list_segments(self._path)
+        ]
+
+    def __len__(self):
+        return sum(int(first_entries(index).sum()) for _, index in self._segments)
+
+    def _map(self, number):
+        if number not in self._maps:
+            with open(os.path.join(self._path, f"{_segment_name(number)}.log"), "rb") as log:
+                self._maps[number] = mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[number]
+
+    def _select(self, index, timeline, ticker, tid, start, end):
+        import numpy as np
+        mask = np.ones(len(index), dtype=bool)
+        if timeline is not None:
+            mask &= index["timeline"] == key_hash(timeline)
+        if ticker is not None:
+            mask &= index["ticker"] == key_hash(ticker)
+        else:
+            mask &= first_entries(index)
+        if tid is not None:
+            mask &= index["tid"] == _tid({"tid": tid})
+        if start is not None:
+            mask &= index["ts"] >= to_seconds(start)
+        if end is not None:
+            mask &= index["ts"] < to_seconds(end)
+        return index[mask]
+
+    def query(self, timeline=None, ticker=None, tid=None, start=None, end=None):
+        """
+        Yields the records matching every given filter in log order.
+        start and end are datetimes or "%Y-%m-%d %H:%M:%S" strings.
+        """
+        for number, index in self._segments:
+            selected = self._select(index, timeline, ticker, tid, start, end)
+            if not len(selected):
+                continue
+            segment = self._map(number)
+            for offset, length in zip(selected["offset"].tolist(), selected["length"].tolist()):
+                yield json.loads(segment[offset:offset + length])
+
+    def count(self, timeline=None, ticker=None, tid=None, start=None, end=None):
+        """
+        Counts matching records from the indexes alone.
+        """
+        return sum(
+            len(self._select(index, timeline, ticker, tid, start, end))
+            for _, index in self._segments
+        )
+
+    def get(self, tid):
+        return next(self.query(tid=tid), None)
+
+    def scan(self):
+        """
+        Yields every record in log order.
+        """
+        return self.query()
+
+    def close(self):
+        for segment in self._maps.values():
+            segment.close()
+        self._maps = {}
+
+
+def migrate(log_dir, path, batch_size=10000, segment_bytes=SEGMENT_BYTES):
+    """
+    One-shot conversion of a log_twitter/ directory of
+    {timeline}___{tid}.txt files into a TweetLog at path, in timestamp
+    and tid order. Returns the number of migrated records.
+    """
+    records = []
+    for entry in os.scandir(log_dir):
+        if entry.name.endswith(".txt"):
+            with open(entry.path, "r") as src:
+                records.append(json.load(src))
+    records.sort(key=lambda record: (record.get("timestamp") or "", _tid(record)))
+    tweet_log = TweetLog(path, segment_bytes=segment_bytes)
+    for i in range(0, len(records), batch_size):
+        tweet_log.append(records[i:i + batch_size])
+    tweet_log.close()
+    return len(records)
+
+
+if __name__ == "__main__":
+    # python -m utils_twitter.tweet_log log_twitter/ tweet_log/
+    print(f"Migrated {migrate(sys.argv[1], sys.argv[2])} records.")